@@ -1,17 +1,23 @@
 """LLM parser helpers for extracting structured patient information."""
 from __future__ import annotations
 
+import asyncio
+import copy
 import json
 import logging
 import os
+import re
 import textwrap
-import time
-from typing import Any, Callable, TypeVar
+import unicodedata
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Any
 
 from dotenv import load_dotenv
 import google.generativeai as genai
 
 from .exceptions import ProviderError
+from .resilience import DEFAULT_RETRY_POLICY, call_with_retries
 
 load_dotenv()
 
@@ -19,71 +25,115 @@ logger = logging.getLogger(__name__)
 
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Bump whenever the extraction prompt changes so memoized results are not reused.
+PROMPT_VERSION = "1"
 
 if not GEMINI_API_KEY:
     raise RuntimeError("Missing GEMINI_API_KEY in environment")
 
 genai.configure(api_key=GEMINI_API_KEY)
 
-T = TypeVar("T")
-
-
-def _retry_with_backoff(
-    fn: Callable[[], T],
-    *,
-    operation: str,
-    max_attempts: int = 3,
-    base_delay: float = 1.0,
-) -> T:
-    """Retry ``fn`` with exponential backoff."""
-    last_exc: Exception | None = None
-    for attempt in range(1, max_attempts + 1):
-        try:
-            return fn()
-        except Exception as exc:  # pragma: no cover - network heavy
-            last_exc = exc
-            wait = base_delay * (2 ** (attempt - 1))
-            log_fields: dict[str, Any] = {
-                "event": "ai_parser.retry",
-                "operation": operation,
-                "attempt": attempt,
-                "max_attempts": max_attempts,
-            }
-            if isinstance(exc, ProviderError):
-                log_fields.update(exc.to_log_fields())
-            else:
-                log_fields["exception"] = repr(exc)
-            log_method = logger.warning if attempt < max_attempts else logger.error
-            log_method("Retryable error when calling Gemini", extra=log_fields)
-            if attempt < max_attempts:
-                time.sleep(wait)
-    assert last_exc is not None
-    raise last_exc
-
-
 def _truncate(value: Any, limit: int = 1000) -> Any:  # pragma: no cover - formatting helper
     if isinstance(value, str) and len(value) > limit:
         return value[:limit] + "…"
     return value
 
 
-def parse_patient_details(transcribed_text: str) -> dict:
-    """Extract structured patient data from a speech transcript using Gemini."""
-    model = genai.GenerativeModel(
-        model_name=GEMINI_MODEL,
-        generation_config={"response_mime_type": "application/json"},
-    )
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_transcript(transcribed_text: str) -> str:
+    """Canonical form of a transcript: NFC, single spaces, no outer whitespace."""
+    normalized = unicodedata.normalize("NFC", transcribed_text)
+    return _WHITESPACE_RE.sub(" ", normalized).strip()
+
+
+class ExtractionMemo:
+    """Bounded LRU memo of parsed extraction results."""
+
+    def __init__(self, max_entries: int = 512) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str, str], dict] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(transcript: str, model: str = GEMINI_MODEL) -> tuple[str, str, str]:
+        return (model, PROMPT_VERSION, normalize_transcript(transcript))
+
+    def get(self, key: tuple[str, str, str]) -> dict | None:
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        # Callers mutate the parsed dict (clean_and_validate), so hand out copies.
+        return copy.deepcopy(result)
 
-    cleaned_transcript = transcribed_text.strip()
-    prompt = (
+    def put(self, key: tuple[str, str, str], result: dict) -> None:
+        self._entries[key] = copy.deepcopy(result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+extraction_memo = ExtractionMemo(int(os.getenv("GEMINI_MEMO_MAX_ENTRIES", "512")))
+
+
+async def parse_patient_details(transcribed_text: str) -> dict:
+    """Extract structured patient data from a speech transcript.
+
+    Results are memoized on (model, prompt version, normalized transcript), so
+    a repeated transcript skips the Gemini round trip. When micro-batching is
+    enabled, concurrent misses share one Gemini request.
+    """
+    memo_key = extraction_memo.key(transcribed_text)
+    cached = extraction_memo.get(memo_key)
+    if cached is not None:
+        logger.info(
+            "ai_parser.memo.hit",
+            extra={"event": "ai_parser.memo.hit", "provider": "gemini"},
+        )
+        return cached
+
+    if extraction_batcher.enabled:
+        parsed = await extraction_batcher.submit(memo_key[2])
+    else:
+        parsed = await _extract_with_gemini(memo_key[2])
+    if isinstance(parsed, dict):
+        extraction_memo.put(memo_key, parsed)
+    return parsed
+
+
+_FIELDS_SPEC = (
+    "Extract these fields:\n"
+    "- first_name\n"
+    "- last_name\n"
+    "- phone_number (digits only)\n"
+    "- address (string, full sentence)\n\n"
+    "If any field is missing or uncertain, leave it as null.\n\n"
+)
+
+
+def _build_prompt(cleaned_transcript: str) -> str:
+    return (
         "You are an API that extracts structured data from text.\n\n"
         "Given a transcription of a patient introducing themselves, return ONLY valid JSON (no prose).\n\n"
-        "Extract these fields:\n"
-        "- first_name\n"
-        "- last_name\n"
-        "- phone_number (digits only)\n"
-        "- address (string, full sentence)\n\n"
-        "If any field is missing or uncertain, leave it as null.\n\n"
+        f"{_FIELDS_SPEC}"
         f"Input text:\n\"\"\"{cleaned_transcript}\"\"\"\n\n"
         "Return JSON in this exact format (and nothing else):\n\n"
         "{\n"
@@ -94,14 +144,46 @@ def parse_patient_details(transcribed_text: str) -> dict:
         "}\n"
     )
 
-    def _generate() -> str:
+
+def _build_batch_prompt(items: list[tuple[str, str]]) -> str:
+    inputs = json.dumps([{"id": item_id, "text": text} for item_id, text in items], ensure_ascii=False)
+    return (
+        "You are an API that extracts structured data from text.\n\n"
+        "You are given a JSON array of transcriptions, each a patient introducing themselves. "
+        "Return ONLY a valid JSON array (no prose) with one object per input, in any order.\n\n"
+        f"{_FIELDS_SPEC}"
+        f"Inputs:\n{inputs}\n\n"
+        "Return JSON in this exact format (and nothing else):\n\n"
+        "[\n"
+        "  {\n"
+        '    "id": "the input id, unchanged",\n'
+        '    "first_name": "string or null",\n'
+        '    "last_name": "string or null",\n'
+        '    "phone_number": "string or null",\n'
+        '    "address": "string or null"\n'
+        "  }\n"
+        "]\n"
+    )
+
+
+async def _generate_json(prompt: str, *, operation: str, max_attempts: int | None = None) -> Any:
+    """Send ``prompt`` to Gemini and decode the JSON response."""
+    model = genai.GenerativeModel(
+        model_name=GEMINI_MODEL,
+        generation_config={"response_mime_type": "application/json"},
+    )
+
+    async def _generate() -> str:
         try:
-            resp = model.generate_content(prompt)
+            resp = await model.generate_content_async(prompt)
         except Exception as exc:
             payload = getattr(getattr(exc, "response", None), "text", None)
+            # google.api_core exceptions carry the HTTP status as ``code``.
+            code = getattr(exc, "code", None)
             raise ProviderError(
                 provider="gemini",
                 message="Gemini generate_content call failed",
+                status_code=code if isinstance(code, int) else None,
                 payload=_truncate(payload),
             ) from exc
 
@@ -114,12 +196,16 @@ def parse_patient_details(transcribed_text: str) -> dict:
             )
         return text_out
 
-    raw_json = _retry_with_backoff(_generate, operation="gemini_generate")
+    policy = DEFAULT_RETRY_POLICY
+    if max_attempts is not None:
+        policy = replace(policy, max_attempts=max_attempts)
+    raw_json = await call_with_retries(_generate, provider="gemini", operation=operation, policy=policy)
     logger.info(
         "ai_parser.parsing.success",
         extra={
             "event": "ai_parser.parsing.success",
             "provider": "gemini",
+            "operation": operation,
             "response_chars": len(raw_json),
         },
     )
@@ -132,3 +218,129 @@ def parse_patient_details(transcribed_text: str) -> dict:
             message=f"Invalid JSON from Gemini: {exc}",
             payload=_truncate(raw_json),
         ) from exc
+
+
+async def _extract_with_gemini(cleaned_transcript: str) -> dict:
+    """Run the Gemini extraction prompt for an already normalized transcript."""
+    return await _generate_json(_build_prompt(cleaned_transcript), operation="gemini_generate")
+
+
+class ExtractionBatcher:
+    """Coalesce concurrent extractions into one structured Gemini request.
+
+    Transcripts submitted within ``window_seconds`` of the first pending item
+    (or until ``max_batch_size`` items are queued) are sent together and the
+    JSON array response is routed back to each caller by item id. Items the
+    batch does not answer, or every item of a failed batch, are retried
+    individually through :func:`_extract_with_gemini`.
+    """
+
+    def __init__(self, *, window_seconds: float = 0.0, max_batch_size: int = 8) -> None:
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._pending: list[tuple[str, str, asyncio.Future[dict]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        # The event loop only holds weak references to tasks; keep batches
+        # alive until they finish so their callers' futures always resolve.
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._ids = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.fallbacks = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0 and self.max_batch_size > 1
+
+    async def submit(self, cleaned_transcript: str) -> dict:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[dict] = loop.create_future()
+        self._ids += 1
+        self._pending.append((str(self._ids), cleaned_transcript, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+        return await future
+
+    def stats(self) -> dict[str, float | int]:
+        return {
+            "window_seconds": self.window_seconds,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.batches,
+            "batched_items": self.batched_items,
+            "fallbacks": self.fallbacks,
+            "in_flight": len(self._tasks),
+        }
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: list[tuple[str, str, asyncio.Future[dict]]]) -> None:
+        if len(batch) == 1:
+            await self._run_single(*batch[0])
+            return
+
+        self.batches += 1
+        self.batched_items += len(batch)
+        try:
+            response = await _generate_json(
+                _build_batch_prompt([(item_id, text) for item_id, text, _ in batch]),
+                operation="gemini_generate_batch",
+                max_attempts=1,
+            )
+        except Exception as exc:
+            logger.warning(
+                "ai_parser.batch.failed",
+                extra={
+                    "event": "ai_parser.batch.failed",
+                    "provider": "gemini",
+                    "batch_size": len(batch),
+                    "exception": repr(exc),
+                },
+            )
+            response = []
+
+        by_id: dict[str, dict] = {}
+        if isinstance(response, list):
+            for entry in response:
+                if isinstance(entry, dict) and "id" in entry:
+                    fields = dict(entry)
+                    by_id[str(fields.pop("id"))] = fields
+
+        stragglers = []
+        for item_id, text, future in batch:
+            if item_id in by_id:
+                if not future.done():
+                    future.set_result(by_id[item_id])
+            else:
+                stragglers.append((item_id, text, future))
+
+        if stragglers:
+            self.fallbacks += len(stragglers)
+            await asyncio.gather(*(self._run_single(*item) for item in stragglers))
+
+    @staticmethod
+    async def _run_single(item_id: str, text: str, future: asyncio.Future[dict]) -> None:
+        try:
+            result = await _extract_with_gemini(text)
+        except Exception as exc:
+            if not future.done():
+                future.set_exception(exc)
+            return
+        if not future.done():
+            future.set_result(result)
+
+
+extraction_batcher = ExtractionBatcher(
+    window_seconds=float(os.getenv("GEMINI_BATCH_WINDOW_MS", "0")) / 1000,
+    max_batch_size=int(os.getenv("GEMINI_BATCH_MAX_SIZE", "8")),
+)
@@ -0,0 +1,360 @@
+"""Optional local audio preprocessing before speech-to-text upload.
+
+Browser recordings are often high-bitrate stereo with dead air at both ends.
+Speech models only need 16 kHz mono, so a preprocessing stage can decode the
+upload, downmix, resample and trim leading/trailing silence before it is sent
+upstream. Stages are pluggable: the first registered stage that supports the
+upload's format handles it, and the result is only used when it is actually
+smaller than the original.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import wave
+from dataclasses import dataclass, field
+from pathlib import PurePath
+from typing import Protocol
+
+import numpy as np
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+
+from .audio_upload import MAX_UPLOAD_BYTES, fingerprint_upload
+
+logger = logging.getLogger(__name__)
+
+TARGET_SAMPLE_RATE = 16000
+AUDIO_PREPROCESS_DEFAULT = os.getenv("AUDIO_PREPROCESS_DEFAULT", "false").lower() == "true"
+SILENCE_THRESHOLD_DBFS = float(os.getenv("AUDIO_SILENCE_THRESHOLD_DBFS", "-45"))
+FFMPEG_TIMEOUT_SECONDS = float(os.getenv("AUDIO_FFMPEG_TIMEOUT_SECONDS", "30"))
+
+WAV_CONTENT_TYPES = frozenset({"audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave"})
+
+
+@dataclass(frozen=True)
+class ProcessedAudio:
+    """Output of a preprocessing stage."""
+
+    data: bytes
+    content_type: str
+    extension: str
+
+
+class AudioPreprocessor(Protocol):
+    """Interface implemented by preprocessing stages."""
+
+    name: str
+
+    def supports(self, content_type: str, filename: str) -> bool:
+        ...
+
+    async def process(self, data: bytes) -> ProcessedAudio:
+        ...
+
+
+@dataclass(frozen=True)
+class PreprocessResult:
+    """The upload to transcribe plus what preprocessing did to it.
+
+    When a stage ran, ``file`` is a new temporary upload owned by the caller,
+    who must :meth:`aclose` it once transcription is done.
+    """
+
+    file: UploadFile
+    stage: str | None
+    bytes_in: int
+    bytes_out: int
+
+    async def aclose(self) -> None:
+        """Close the processed file; the original upload is left to its owner."""
+        if self.stage is not None:
+            await self.file.close()
+
+
+@dataclass
+class PreprocessStats:
+    runs: int = 0
+    applied: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, result: PreprocessResult) -> None:
+        with self._lock:
+            self.runs += 1
+            self.applied += result.stage is not None
+            self.bytes_in += result.bytes_in
+            self.bytes_out += result.bytes_out
+
+    def snapshot(self) -> dict[str, int | float]:
+        return {
+            "runs": self.runs,
+            "applied": self.applied,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "reduction": 1 - self.bytes_out / self.bytes_in if self.bytes_in else 0.0,
+        }
+
+
+preprocess_stats = PreprocessStats()
+
+
+# -- PCM helpers (also used by the voice-activity gate) ----------------------
+
+
+def pcm_to_float(raw: bytes, width: int, channels: int) -> np.ndarray:
+    """Convert little-endian PCM frames into a float32 ``(frames, channels)`` array in [-1, 1]."""
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width * 8} bits")
+    return samples.reshape(-1, channels)
+
+
+def decode_wav(data: bytes) -> tuple[np.ndarray, int]:
+    """Decode PCM WAV bytes into a float32 ``(frames, channels)`` array in [-1, 1]."""
+    with wave.open(io.BytesIO(data), "rb") as reader:
+        channels = reader.getnchannels()
+        width = reader.getsampwidth()
+        rate = reader.getframerate()
+        raw = reader.readframes(reader.getnframes())
+    return pcm_to_float(raw, width, channels), rate
+
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    """Average all channels into a mono signal."""
+    return samples.mean(axis=1) if samples.ndim == 2 else samples
+
+
+def resample(mono: np.ndarray, rate: int, target: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """Resample ``mono`` to ``target`` Hz.
+
+    Integer decimation factors average each block (a cheap low-pass);
+    anything else falls back to linear interpolation.
+    """
+    if rate == target or mono.size == 0:
+        return mono
+    if rate > target and rate % target == 0:
+        factor = rate // target
+        usable = mono.size - mono.size % factor
+        return mono[:usable].reshape(-1, factor).mean(axis=1)
+    duration = mono.size / rate
+    target_size = max(int(round(duration * target)), 1)
+    positions = np.linspace(0, mono.size - 1, target_size)
+    return np.interp(positions, np.arange(mono.size), mono).astype(np.float32)
+
+
+def frame_dbfs(mono: np.ndarray, rate: int, frame_ms: int = 20) -> np.ndarray:
+    """RMS level of consecutive ``frame_ms`` frames in dBFS."""
+    frame = max(int(rate * frame_ms / 1000), 1)
+    usable = mono.size - mono.size % frame
+    if usable == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = mono[:usable].reshape(-1, frame)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def trim_silence(
+    mono: np.ndarray,
+    rate: int,
+    *,
+    threshold_dbfs: float = SILENCE_THRESHOLD_DBFS,
+    frame_ms: int = 20,
+    padding_ms: int = 150,
+) -> np.ndarray:
+    """Drop leading and trailing frames quieter than ``threshold_dbfs``."""
+    levels = frame_dbfs(mono, rate, frame_ms)
+    voiced = np.flatnonzero(levels > threshold_dbfs)
+    if voiced.size == 0:
+        return mono[:0]
+    frame = max(int(rate * frame_ms / 1000), 1)
+    pad = int(rate * padding_ms / 1000)
+    start = max(voiced[0] * frame - pad, 0)
+    end = min((voiced[-1] + 1) * frame + pad, mono.size)
+    return mono[start:end]
+
+
+def encode_wav(mono: np.ndarray, rate: int) -> bytes:
+    """Encode a float mono signal as 16-bit PCM WAV."""
+    pcm = (np.clip(mono, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+# -- stages -----------------------------------------------------------------
+
+
+class WavPreprocessor:
+    """Pure NumPy stage for PCM WAV uploads."""
+
+    name = "wav"
+
+    def supports(self, content_type: str, filename: str) -> bool:
+        return content_type in WAV_CONTENT_TYPES or filename.lower().endswith(".wav")
+
+    def _process_sync(self, data: bytes) -> ProcessedAudio:
+        samples, rate = decode_wav(data)
+        mono = resample(downmix(samples), rate)
+        trimmed = trim_silence(mono, TARGET_SAMPLE_RATE)
+        if trimmed.size == 0:
+            # All silence: leave rejecting it to the caller rather than sending nothing.
+            trimmed = mono
+        return ProcessedAudio(encode_wav(trimmed, TARGET_SAMPLE_RATE), "audio/wav", ".wav")
+
+    async def process(self, data: bytes) -> ProcessedAudio:
+        return await run_in_threadpool(self._process_sync, data)
+
+
+class FfmpegPreprocessor:
+    """Stage for compressed browser formats (webm, ogg, mp4, mp3) via ``ffmpeg``.
+
+    Output is 16 kHz mono Opus in an Ogg container. The stage is skipped when
+    no ``ffmpeg`` binary is on ``PATH``.
+    """
+
+    name = "ffmpeg"
+
+    def __init__(self, binary: str = "ffmpeg", bitrate: str = "24k") -> None:
+        self.binary = binary
+        self.bitrate = bitrate
+
+    def supports(self, content_type: str, filename: str) -> bool:
+        return content_type.startswith(("audio/", "video/webm")) and shutil.which(self.binary) is not None
+
+    async def process(self, data: bytes) -> ProcessedAudio:
+        trim = f"silenceremove=start_periods=1:start_threshold={SILENCE_THRESHOLD_DBFS}dB"
+        process = await asyncio.create_subprocess_exec(
+            self.binary,
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-i",
+            "pipe:0",
+            "-ac",
+            "1",
+            "-ar",
+            str(TARGET_SAMPLE_RATE),
+            # Trim the head, reverse, trim again, reverse back: strips both ends only.
+            "-af",
+            f"{trim},areverse,{trim},areverse",
+            "-c:a",
+            "libopus",
+            "-b:a",
+            self.bitrate,
+            "-f",
+            "ogg",
+            "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(data), timeout=FFMPEG_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise RuntimeError("ffmpeg preprocessing timed out")
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace')[:500]}")
+        return ProcessedAudio(stdout, "audio/ogg", ".ogg")
+
+
+_PREPROCESSORS: list[AudioPreprocessor] = [WavPreprocessor(), FfmpegPreprocessor()]
+
+
+def register_preprocessor(stage: AudioPreprocessor, *, first: bool = False) -> None:
+    """Add a preprocessing stage; ``first=True`` gives it priority."""
+    if first:
+        _PREPROCESSORS.insert(0, stage)
+    else:
+        _PREPROCESSORS.append(stage)
+
+
+def _select_stage(content_type: str, filename: str) -> AudioPreprocessor | None:
+    for stage in _PREPROCESSORS:
+        if stage.supports(content_type, filename):
+            return stage
+    return None
+
+
+def _wrap(data: bytes, *, filename: str, content_type: str) -> UploadFile:
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spooled.write(data)
+    spooled.seek(0)
+    return UploadFile(
+        file=spooled,
+        size=len(data),
+        filename=filename,
+        headers=Headers({"content-type": content_type}),
+    )
+
+
+async def preprocess_upload(file: UploadFile) -> PreprocessResult:
+    """Run the matching stage over ``file``; fall back to the original on any miss."""
+    fingerprint = await fingerprint_upload(file)
+    content_type = (file.content_type or "").split(";")[0].strip().lower()
+    filename = file.filename or "recording"
+    unchanged = PreprocessResult(file, None, fingerprint.size, fingerprint.size)
+
+    stage = _select_stage(content_type, filename)
+    if stage is None or not fingerprint.size:
+        preprocess_stats.record(unchanged)
+        return unchanged
+
+    # ``fingerprint_upload`` already rejected anything over the cap.
+    data = await file.read(min(fingerprint.size, MAX_UPLOAD_BYTES))
+    await file.seek(0)
+    try:
+        processed = await stage.process(data)
+    except Exception as exc:
+        logger.warning(
+            "audio_preprocess.failed",
+            extra={"event": "audio_preprocess.failed", "stage": stage.name, "exception": repr(exc)},
+        )
+        preprocess_stats.record(unchanged)
+        return unchanged
+
+    if not processed.data or len(processed.data) >= fingerprint.size:
+        preprocess_stats.record(unchanged)
+        return unchanged
+
+    result = PreprocessResult(
+        file=_wrap(
+            processed.data,
+            filename=PurePath(filename).stem + processed.extension,
+            content_type=processed.content_type,
+        ),
+        stage=stage.name,
+        bytes_in=fingerprint.size,
+        bytes_out=len(processed.data),
+    )
+    preprocess_stats.record(result)
+    logger.info(
+        "audio_preprocess.applied",
+        extra={
+            "event": "audio_preprocess.applied",
+            "stage": stage.name,
+            "bytes_in": result.bytes_in,
+            "bytes_out": result.bytes_out,
+        },
+    )
+    return result
@@ -0,0 +1,167 @@
+"""Constant-memory handling of uploaded audio.
+
+Uploads arrive as spooled temporary files. Instead of reading them into a
+single ``bytes`` object (and letting the HTTP client build another in-memory
+multipart body on every retry), the helpers here walk the file in fixed-size
+chunks: once to hash and size-check it, then once per provider attempt to
+stream a multipart body straight from disk.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import threading
+import uuid
+import weakref
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from .exceptions import UploadTooLargeError
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+
+
+@dataclass(frozen=True)
+class UploadFingerprint:
+    """Size and SHA-256 digest of an uploaded file."""
+
+    sha256: str
+    size: int
+
+
+async def fingerprint_upload(
+    file: UploadFile,
+    *,
+    max_bytes: int | None = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> UploadFingerprint:
+    """Hash ``file`` chunk by chunk, enforcing ``max_bytes`` as it streams."""
+    limit = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    digest = hashlib.sha256()
+    size = 0
+    await file.seek(0)
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > limit:
+            raise UploadTooLargeError(limit_bytes=limit)
+        digest.update(chunk)
+    await file.seek(0)
+    return UploadFingerprint(sha256=digest.hexdigest(), size=size)
+
+
+# Fallback for file objects without a descriptor: one lock per upload, so
+# only bodies streaming the same upload wait on each other.
+_READ_LOCKS: weakref.WeakKeyDictionary[UploadFile, threading.Lock] = weakref.WeakKeyDictionary()
+_READ_LOCKS_GUARD = threading.Lock()
+
+
+def _read_lock(file: UploadFile) -> threading.Lock:
+    with _READ_LOCKS_GUARD:
+        lock = _READ_LOCKS.get(file)
+        if lock is None:
+            lock = _READ_LOCKS[file] = threading.Lock()
+        return lock
+
+
+def _seek_and_read(file: UploadFile, offset: int, size: int) -> bytes:
+    with _read_lock(file):
+        file.file.seek(offset)
+        return file.file.read(size)
+
+
+def _read_at_sync(file: UploadFile, offset: int, size: int) -> bytes:
+    try:
+        fd = file.file.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        fd = None
+    if fd is None or not hasattr(os, "pread"):
+        return _seek_and_read(file, offset, size)
+    # Make sure anything still in Python's write buffer is on disk for pread.
+    file.file.flush()
+    # ``pread`` does not move the shared file position, so no lock is needed.
+    return os.pread(fd, size, offset)
+
+
+async def read_at(file: UploadFile, offset: int, size: int) -> bytes:
+    """Read ``size`` bytes at ``offset`` without disturbing other readers.
+
+    Hedged STT requests stream the same upload concurrently, so each body
+    keeps its own offset instead of sharing the file position. Disk-backed
+    files are read with ``os.pread``; anything else seeks and reads under a
+    lock held per upload.
+    """
+    if getattr(file, "_in_memory", True):
+        # ``fileno()`` would roll an in-memory spooled file over to disk.
+        return _seek_and_read(file, offset, size)
+    return await run_in_threadpool(_read_at_sync, file, offset, size)
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\r", "").replace("\n", "")
+
+
+class MultipartFileBody:
+    """Streaming ``multipart/form-data`` body for one file plus text fields.
+
+    The body length is known up front, so it is sent with ``Content-Length``
+    rather than chunked transfer encoding. Iterating re-reads the file from
+    the start, so the same instance can be replayed on a retry, and concurrent
+    bodies over the same upload do not disturb each other.
+    """
+
+    def __init__(
+        self,
+        file: UploadFile,
+        *,
+        file_size: int,
+        field_name: str = "file",
+        filename: str,
+        content_type: str,
+        fields: dict[str, str] | None = None,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+    ) -> None:
+        self._file = file
+        self._chunk_size = chunk_size
+        self.boundary = uuid.uuid4().hex
+        preamble = b"".join(
+            (
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{_quote(name)}"\r\n\r\n'
+                f"{value}\r\n"
+            ).encode("utf-8")
+            for name, value in (fields or {}).items()
+        )
+        self._head = preamble + (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{_quote(field_name)}"; '
+            f'filename="{_quote(filename)}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode("utf-8")
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode("utf-8")
+        self.content_length = len(self._head) + file_size + len(self._tail)
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {
+            "Content-Type": f"multipart/form-data; boundary={self.boundary}",
+            "Content-Length": str(self.content_length),
+        }
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        yield self._head
+        offset = 0
+        while True:
+            chunk = await read_at(self._file, offset, self._chunk_size)
+            if not chunk:
+                break
+            offset += len(chunk)
+            yield chunk
+        yield self._tail
@@ -0,0 +1,248 @@
+"""Batch voice intake for backlogs of recordings.
+
+``POST /voice-input/batch`` accepts many recordings, or zip archives of
+them, in one request and runs each through the regular intake pipeline.
+Up to ``BATCH_INTAKE_CONCURRENCY`` recordings are processed at once, and
+within a batch calls to each provider are capped by
+``BATCH_PROVIDER_CONCURRENCY`` (see :class:`~app.resilience.ProviderLimits`),
+so one recording can be parsed while others wait on speech-to-text. Results
+are streamed back as NDJSON in completion order, one line per recording,
+followed by a summary line.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import IO, Any, AsyncIterator, Iterator
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers
+
+from . import schemas
+from .audio_upload import MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE
+from .exceptions import IntakeError
+from .intake import process_voice_intake
+from .resilience import ProviderLimits, provider_limits_scope
+
+logger = logging.getLogger(__name__)
+
+BATCH_INTAKE_CONCURRENCY = int(os.getenv("BATCH_INTAKE_CONCURRENCY", "8"))
+BATCH_INTAKE_MAX_FILES = int(os.getenv("BATCH_INTAKE_MAX_FILES", "500"))
+BATCH_PROVIDER_CONCURRENCY = os.getenv("BATCH_PROVIDER_CONCURRENCY", "4")
+
+ZIP_CONTENT_TYPES = frozenset({"application/zip", "application/x-zip-compressed"})
+
+
+@dataclass
+class BatchItem:
+    """One recording of a batch, or the reason it cannot be processed.
+
+    Archive members keep only their ``archive`` and ``member`` entry until a
+    worker picks them up, so at most ``BATCH_INTAKE_CONCURRENCY`` of them are
+    decompressed at a time.
+    """
+
+    index: int
+    filename: str
+    file: UploadFile | None = None
+    error: IntakeError | None = None
+    archive: zipfile.ZipFile | None = None
+    member: zipfile.ZipInfo | None = None
+
+
+def _is_zip(upload: UploadFile) -> bool:
+    content_type = (upload.content_type or "").split(";")[0].strip().lower()
+    return content_type in ZIP_CONTENT_TYPES or (upload.filename or "").lower().endswith(".zip")
+
+
+def _too_large() -> IntakeError:
+    return IntakeError(
+        status_code=413,
+        detail={"error": "upload_too_large", "limit_bytes": MAX_UPLOAD_BYTES},
+    )
+
+
+def _invalid_archive() -> IntakeError:
+    return IntakeError(status_code=400, detail={"error": "invalid_archive"})
+
+
+def _spool(source: IO[bytes], limit: int) -> tempfile.SpooledTemporaryFile | None:
+    """Copy ``source`` into a spooled file; ``None`` if it exceeds ``limit`` bytes."""
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    size = 0
+    while chunk := source.read(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > limit:
+            spooled.close()
+            return None
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
+
+def _archive_members(upload: UploadFile) -> Iterator[tuple[str, dict[str, Any]]]:
+    """Yield ``(filename, BatchItem fields)`` per member without decompressing any."""
+    upload.file.seek(0)
+    try:
+        archive = zipfile.ZipFile(upload.file)
+    except zipfile.BadZipFile:
+        yield upload.filename or "archive.zip", {"error": _invalid_archive()}
+        return
+    referenced = False
+    try:
+        for info in archive.infolist():
+            path = PurePosixPath(info.filename)
+            # Skip folders and Finder/Explorer metadata such as __MACOSX/._clip.webm.
+            if info.is_dir() or path.name.startswith(".") or "__MACOSX" in path.parts:
+                continue
+            if info.file_size > MAX_UPLOAD_BYTES:
+                yield info.filename, {"error": _too_large()}
+                continue
+            referenced = True
+            yield info.filename, {"archive": archive, "member": info}
+    finally:
+        if not referenced:
+            archive.close()
+
+
+def _extract_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> UploadFile:
+    """Decompress one member into a spooled upload (blocking)."""
+    try:
+        with archive.open(info) as member:
+            # The declared size can lie; enforce the limit while decompressing.
+            spooled = _spool(member, MAX_UPLOAD_BYTES)
+    except (zipfile.BadZipFile, OSError) as exc:
+        raise _invalid_archive() from exc
+    if spooled is None:
+        raise _too_large()
+    name = PurePosixPath(info.filename).name
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return UploadFile(file=spooled, filename=name, headers=Headers({"content-type": content_type}))
+
+
+def expand_uploads(uploads: list[UploadFile]) -> list[BatchItem]:
+    """Flatten uploads and zip archives into numbered batch items (blocking).
+
+    Only archive directories are read here; members are extracted by the
+    worker that processes them.
+    """
+    items: list[BatchItem] = []
+    for upload in uploads:
+        if _is_zip(upload):
+            entries = _archive_members(upload)
+        else:
+            entries = [(upload.filename or "recording", {"file": upload})]
+        for filename, fields in entries:
+            if len(items) >= BATCH_INTAKE_MAX_FILES:
+                close_items(items)
+                if fields.get("archive") is not None:
+                    fields["archive"].close()
+                raise IntakeError(
+                    status_code=413,
+                    detail={"error": "too_many_files", "limit": BATCH_INTAKE_MAX_FILES},
+                )
+            items.append(BatchItem(len(items), filename, **fields))
+    return items
+
+
+def close_items(items: list[BatchItem]) -> None:
+    """Close every recording's temporary file and archive once the batch is done."""
+    for item in items:
+        if item.file is not None:
+            item.file.file.close()
+        if item.archive is not None:
+            item.archive.close()
+
+
+async def _process(item: BatchItem, db: Session, preprocess: bool | None) -> dict[str, Any]:
+    result: dict[str, Any] = {"index": item.index, "filename": item.filename}
+    if item.error is not None:
+        return {**result, "status_code": item.error.status_code, "error": item.error.detail}
+    try:
+        if item.member is not None:
+            item.file = await run_in_threadpool(_extract_member, item.archive, item.member)
+        patient = await process_voice_intake(item.file, db, preprocess=preprocess)
+    except IntakeError as exc:
+        return {**result, "status_code": exc.status_code, "error": exc.detail}
+    except Exception as exc:
+        logger.exception(
+            "voice_input.batch.item_failed",
+            extra={"event": "voice_input.batch.item_failed", "index": item.index},
+        )
+        return {
+            **result,
+            "status_code": 500,
+            "error": {"error": "internal_error", "message": repr(exc)},
+        }
+    finally:
+        # Extracted members are only needed while they are being processed.
+        if item.member is not None and item.file is not None:
+            item.file.file.close()
+    return {
+        **result,
+        "status_code": 201,
+        "patient": schemas.IntakePatient.model_validate(patient).model_dump(),
+    }
+
+
+async def run_batch(
+    items: list[BatchItem],
+    db: Session,
+    *,
+    concurrency: int = BATCH_INTAKE_CONCURRENCY,
+    limits: ProviderLimits | None = None,
+    preprocess: bool | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """Process ``items`` with bounded concurrency, yielding results as they finish.
+
+    Each worker uses its own session on ``db``'s engine, since sessions are
+    not safe to share between concurrent intakes.
+    """
+    bind = db.get_bind()
+    pending = iter(items)
+    results: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+
+    async def worker() -> None:
+        with Session(bind=bind) as worker_db:
+            for item in pending:
+                await results.put(await _process(item, worker_db, preprocess))
+
+    limits = limits or ProviderLimits.parse(BATCH_PROVIDER_CONCURRENCY)
+    # Workers inherit the provider limits through their copied context.
+    with provider_limits_scope(limits):
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(items)))]
+    try:
+        for _ in items:
+            yield await results.get()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def stream_batch(
+    items: list[BatchItem],
+    db: Session,
+    *,
+    preprocess: bool | None = None,
+) -> AsyncIterator[bytes]:
+    """NDJSON: one line per recording in completion order, then a summary line."""
+    succeeded = 0
+    try:
+        async for result in run_batch(items, db, preprocess=preprocess):
+            succeeded += result["status_code"] == 201
+            yield (json.dumps(result, default=str, separators=(",", ":")) + "\n").encode("utf-8")
+    finally:
+        close_items(items)
+    summary = {"done": True, "total": len(items), "succeeded": succeeded, "failed": len(items) - succeeded}
+    logger.info("voice_input.batch.completed", extra={"event": "voice_input.batch.completed", **summary})
+    yield (json.dumps(summary, separators=(",", ":")) + "\n").encode("utf-8")
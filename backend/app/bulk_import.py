@@ -0,0 +1,316 @@
+"""Streaming bulk import of patients from CSV or NDJSON.
+
+``POST /patients/bulk`` parses the request body as it arrives: a worker
+thread pulls body chunks from the event loop on demand, so memory stays
+constant regardless of upload size. Rows are normalized with
+``clean_and_validate`` and written in batches of ``BULK_IMPORT_BATCH_SIZE``
+with one ``executemany`` upsert and one commit per batch. While a batch is
+being written the next one is parsed. Invalid rows are skipped and listed in
+the returned report; valid rows are committed even when others fail. A
+fatal error (bad header, encoding or CSV quoting, or a batch that cannot be
+written) stops the import, and the report says which line it stopped at,
+since earlier batches stay committed.
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from . import crud, db_writer
+from .db_writer import DB_WRITER_ENABLED
+from .export import EXPORT_MEDIA_TYPES
+from .fast_extractor import REQUIRED_FIELDS
+from .intake import clean_and_validate
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "5000"))
+BULK_IMPORT_MAX_ERRORS = int(os.getenv("BULK_IMPORT_MAX_ERRORS", "1000"))
+
+IMPORT_FORMATS = {media_type: name for name, media_type in EXPORT_MEDIA_TYPES.items()}
+IMPORT_FORMATS["application/jsonl"] = "ndjson"
+
+BULK_IMPORT_ROWS = registry.counter(
+    "patient_bulk_import_rows_total",
+    "Rows read by bulk patient imports.",
+    ("outcome",),
+)
+
+
+class InvalidImportError(ValueError):
+    """The import body cannot be read past ``line`` (bad header, encoding or format)."""
+
+    def __init__(self, message: str, *, line: int) -> None:
+        super().__init__(message)
+        self.line = line
+
+
+def detect_format(content_type: str | None) -> str | None:
+    """Map a request ``Content-Type`` to ``csv`` or ``ndjson``."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return IMPORT_FORMATS.get(media_type)
+
+
+@dataclass
+class ImportReport:
+    """Outcome of one bulk import; ``errors`` is capped at ``max_errors`` entries."""
+
+    max_errors: int = BULK_IMPORT_MAX_ERRORS
+    received: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: list[dict[str, Any]] = field(default_factory=list)
+    aborted_at_line: int | None = None
+    fatal_error: str | None = None
+    write_failed: bool = False
+
+    def reject(self, line: int, error: str, **details: Any) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": error, **details})
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "received": self.received,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "aborted_at_line": self.aborted_at_line,
+            "fatal_error": self.fatal_error,
+        }
+
+
+class _BodyReader(io.RawIOBase):
+    """Blocking file object over an async byte stream, read from a worker thread."""
+
+    def __init__(self, chunks: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop) -> None:
+        self._chunks = chunks
+        self._loop = loop
+        self._pending = b""
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _next_chunk(self) -> bytes:
+        future = asyncio.run_coroutine_threadsafe(self._chunks.__anext__(), self._loop)
+        try:
+            return future.result()
+        except StopAsyncIteration:
+            self._eof = True
+            return b""
+
+    def readinto(self, buffer) -> int:
+        while not self._pending and not self._eof:
+            self._pending = self._next_chunk()
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def _decode_lines(lines: Iterable[bytes]) -> Iterator[str]:
+    for number, raw in enumerate(lines, start=1):
+        try:
+            yield raw.decode("utf-8-sig" if number == 1 else "utf-8")
+        except UnicodeDecodeError as exc:
+            raise InvalidImportError(f"Line {number} is not valid UTF-8", line=number) from exc
+
+
+def _iter_csv(lines: Iterable[bytes]) -> Iterator[tuple[int, dict | None, str | None]]:
+    reader = csv.DictReader(_decode_lines(lines))
+    header = [name.strip() for name in reader.fieldnames or []]
+    missing = [name for name in REQUIRED_FIELDS if name not in header]
+    if missing:
+        raise InvalidImportError(
+            f"CSV header is missing columns: {', '.join(missing)}", line=1
+        )
+    reader.fieldnames = header
+    line = reader.line_num
+    try:
+        for row in reader:
+            # Report the line a record starts on; quoted fields may span lines.
+            start, line = line + 1, reader.line_num
+            if None in row:
+                yield start, None, "too many columns"
+            else:
+                yield start, row, None
+    except csv.Error as exc:
+        raise InvalidImportError(f"Malformed CSV: {exc}", line=reader.line_num) from exc
+
+
+def _iter_ndjson(lines: Iterable[bytes]) -> Iterator[tuple[int, dict | None, str | None]]:
+    for line, raw in enumerate(lines, start=1):
+        if not raw.strip():
+            continue
+        try:
+            # ``json.loads`` decodes bytes itself, including a leading BOM.
+            record = json.loads(raw)
+        except json.JSONDecodeError as exc:
+            yield line, None, f"invalid JSON: {exc.msg}"
+            continue
+        except UnicodeDecodeError:
+            yield line, None, "invalid UTF-8"
+            continue
+        if not isinstance(record, dict):
+            yield line, None, "expected a JSON object"
+            continue
+        yield line, record, None
+
+
+def _text(value: Any) -> str | None:
+    # NDJSON exports from other systems often store phone numbers as integers.
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    return value if isinstance(value, str) else None
+
+
+def _validate(record: dict) -> tuple[dict, list[str]]:
+    candidate = clean_and_validate({name: _text(record.get(name)) for name in REQUIRED_FIELDS})
+    return candidate, [name for name in REQUIRED_FIELDS if not candidate.get(name)]
+
+
+def import_records(
+    body: io.RawIOBase,
+    import_format: str,
+    write_batch: Callable[[list[dict]], Future],
+    *,
+    batch_size: int = BULK_IMPORT_BATCH_SIZE,
+    max_errors: int = BULK_IMPORT_MAX_ERRORS,
+) -> ImportReport:
+    """Parse, validate and write every record in ``body`` (blocking).
+
+    ``write_batch`` starts writing a batch and returns a future for it; at
+    most one batch is in flight while the next is parsed. A phone number
+    repeated within a batch is rejected as ``duplicate_phone``: upserting both
+    rows in one ``executemany`` would mark a brand-new patient as returning.
+    A fatal error ends the import; rows parsed before it are still written
+    and the report records ``aborted_at_line``. A batch that fails to write
+    also ends it, at the batch's first line, and nothing after it is written.
+    """
+    # Split on raw newlines and decode per line, so an encoding error is tied
+    # to the line it occurs on rather than to an arbitrary decode buffer.
+    lines = io.BufferedReader(body)
+    records = _iter_csv(lines) if import_format == "csv" else _iter_ndjson(lines)
+    report = ImportReport(max_errors=max_errors)
+    batch: list[dict] = []
+    batch_lines: dict[str, int] = {}
+    in_flight: tuple[Future, int] | None = None
+
+    def settle() -> None:
+        """Wait for the batch in flight and record how it went."""
+        nonlocal in_flight
+        if in_flight is None:
+            return
+        (future, first_line), in_flight = in_flight, None
+        try:
+            report.imported += future.result()
+        except Exception as exc:
+            logger.exception(
+                "patients.bulk_import.write_failed",
+                extra={"event": "patients.bulk_import.write_failed", "line": first_line},
+            )
+            report.write_failed = True
+            report.aborted_at_line = first_line
+            report.fatal_error = f"Writing the batch starting at line {first_line} failed: {exc}"
+
+    def flush() -> None:
+        """Wait for the batch in flight, then start writing the current one."""
+        nonlocal batch, in_flight
+        settle()
+        if batch and not report.write_failed:
+            in_flight = write_batch(batch), next(iter(batch_lines.values()))
+        batch = []
+        batch_lines.clear()
+
+    try:
+        for line, record, problem in records:
+            report.received += 1
+            if problem is not None:
+                report.reject(line, "invalid_row", message=problem)
+                continue
+            candidate, invalid = _validate(record)
+            if invalid:
+                report.reject(line, "invalid_fields", fields=invalid)
+                continue
+            phone = candidate["phone_number"]
+            if phone in batch_lines:
+                report.reject(line, "duplicate_phone", first_line=batch_lines[phone])
+                continue
+            batch_lines[phone] = line
+            batch.append(candidate)
+            if len(batch) >= batch_size:
+                flush()
+                if report.write_failed:
+                    break
+    except InvalidImportError as exc:
+        report.aborted_at_line = exc.line
+        report.fatal_error = str(exc)
+    finally:
+        # Whatever was parsed before a fatal parse error is still written.
+        flush()
+        settle()
+
+    BULK_IMPORT_ROWS.inc(report.imported, outcome="imported")
+    BULK_IMPORT_ROWS.inc(report.failed, outcome="failed")
+    return report
+
+
+def _direct_writer(db: Session) -> Callable[[list[dict]], Future]:
+    def write(rows: list[dict]) -> Future:
+        future: Future = Future()
+        try:
+            written = crud.upsert_patients(db, rows)
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            future.set_exception(exc)
+        else:
+            future.set_result(written)
+        return future
+
+    return write
+
+
+def _queued_writer(rows: list[dict]) -> Future:
+    return db_writer.patient_writer.submit(partial(crud.upsert_patients, rows=rows))
+
+
+async def import_patients(
+    chunks: AsyncIterator[bytes],
+    import_format: str,
+    db: Session,
+    *,
+    batch_size: int = BULK_IMPORT_BATCH_SIZE,
+) -> ImportReport:
+    """Import a streamed request body; batches go through the group-commit writer when enabled."""
+    body = _BodyReader(chunks, asyncio.get_running_loop())
+    write_batch = _queued_writer if DB_WRITER_ENABLED else _direct_writer(db)
+    report = await run_in_threadpool(
+        import_records, body, import_format, write_batch, batch_size=batch_size
+    )
+    logger.info(
+        "patients.bulk_import.completed",
+        extra={
+            "event": "patients.bulk_import.completed",
+            "format": import_format,
+            "received": report.received,
+            "imported": report.imported,
+            "failed": report.failed,
+            "aborted_at_line": report.aborted_at_line,
+        },
+    )
+    return report
@@ -2,21 +2,211 @@
 
 from __future__ import annotations
 
-from sqlalchemy.exc import IntegrityError
+import base64
+import binascii
+import os
+import re
+
+from sqlalchemy import case, func, or_, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
-from . import models, schemas
+from . import duplicates, models, schemas
+from .patient_cache import patient_cache
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+_CURSOR_PREFIX = "id:"
+_OFFSET_CURSOR_PREFIX = "offset:"
+
+
+def encode_cursor(patient_id: int, *, prefix: str = _CURSOR_PREFIX) -> str:
+    """Encode a patient id into an opaque, URL-safe pagination cursor."""
+    raw = f"{prefix}{patient_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *, prefix: str = _CURSOR_PREFIX) -> int:
+    """Decode a cursor produced by :func:`encode_cursor`.
+
+    Raises ``ValueError`` when the cursor is malformed.
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii")
+    except (binascii.Error, UnicodeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+    if not raw.startswith(prefix) or not raw[len(prefix):].isdigit():
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return int(raw[len(prefix):])
+
 
+def list_patients(
+    db: Session,
+    *,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after_id: int | None = None,
+):
+    """Return up to ``limit`` patients ordered by newest first.
 
-def list_patients(db: Session):
-    """Return all patients ordered by newest first."""
+    ``after_id`` is a keyset bound: only rows with a smaller id are returned,
+    so each page is a single index range scan regardless of table size.
+    """
+    query = db.query(models.PatientTable)
+    if after_id is not None:
+        query = query.filter(models.PatientTable.id < after_id)
     return (
-        db.query(models.PatientTable)
-        .order_by(models.PatientTable.id.desc())
+        query.order_by(models.PatientTable.id.desc())
+        .limit(limit)
         .all()
     )
 
 
+def list_patients_page(
+    db: Session,
+    *,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+):
+    """Return ``(patients, next_cursor)`` for one page of the patient list.
+
+    Ordering is by descending primary key, which is stable across pages even
+    while new patients are being inserted. ``next_cursor`` is ``None`` on the
+    last page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after_id = decode_cursor(cursor) if cursor else None
+    rows = list_patients(db, limit=limit + 1, after_id=after_id)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].id)
+    return rows, None
+
+
+_PHONE_QUERY_RE = re.compile(r"[\d\s().+\-]+")
+_SEARCH_TOKEN_RE = re.compile(r"\w+")
+_MAX_SEARCH_TOKENS = 8
+
+SEARCH_RANK_LIMIT = int(os.getenv("PATIENT_SEARCH_RANK_LIMIT", "1000"))
+
+_FTS_PROBE = text(
+    "SELECT count(*) FROM (SELECT 1 FROM patients_fts WHERE patients_fts MATCH :match LIMIT :cap)"
+)
+# bm25 weights: name matches outrank address matches.
+_FTS_RANKED = text(
+    "SELECT patients.* FROM ("
+    "SELECT rowid, rank FROM patients_fts "
+    "WHERE patients_fts MATCH :match AND rank MATCH 'bm25(10.0, 10.0, 1.0)' "
+    "ORDER BY rank, rowid DESC LIMIT :limit OFFSET :offset"
+    ") AS hits JOIN patients ON patients.id = hits.rowid ORDER BY hits.rank, hits.rowid DESC"
+)
+_FTS_NEWEST = text(
+    "SELECT patients.* FROM ("
+    "SELECT rowid FROM patients_fts WHERE patients_fts MATCH :match "
+    "ORDER BY rowid DESC LIMIT :limit OFFSET :offset"
+    ") AS hits JOIN patients ON patients.id = hits.rowid ORDER BY patients.id DESC"
+)
+
+
+def _fts_match(query: str) -> str | None:
+    """Turn free text into an FTS5 query: every token must match as a prefix."""
+    tokens = _SEARCH_TOKEN_RE.findall(query.lower())[:_MAX_SEARCH_TOKENS]
+    return " ".join(f'"{token}"*' for token in tokens) or None
+
+
+def search_patients(
+    db: Session,
+    query: str,
+    *,
+    limit: int = DEFAULT_PAGE_SIZE,
+    offset: int = 0,
+) -> list[models.PatientTable]:
+    """Search patients by name/address tokens or by phone-number prefix.
+
+    A query made only of digits and phone punctuation is a phone prefix,
+    answered by a range scan of the unique phone index in phone order.
+    Anything else goes to the FTS5 index, ranked by relevance. Ranking has to
+    score every match, so queries matching ``SEARCH_RANK_LIMIT`` rows or more
+    (e.g. "st") are returned newest first instead, which FTS5 can stream.
+    """
+    digits = re.sub(r"\D", "", query)
+    if digits and _PHONE_QUERY_RE.fullmatch(query):
+        # ``LIKE 'p%'`` cannot use the index; the equivalent range can.
+        upper = digits[:-1] + chr(ord(digits[-1]) + 1)
+        stmt = (
+            select(models.PatientTable)
+            .where(
+                models.PatientTable.phone_number >= digits,
+                models.PatientTable.phone_number < upper,
+            )
+            .order_by(models.PatientTable.phone_number)
+            .limit(limit)
+            .offset(offset)
+        )
+        return list(db.scalars(stmt))
+
+    match = _fts_match(query)
+    if match is None:
+        return []
+    matches = db.execute(_FTS_PROBE, {"match": match, "cap": SEARCH_RANK_LIMIT}).scalar_one()
+    search = _FTS_RANKED if matches < SEARCH_RANK_LIMIT else _FTS_NEWEST
+    stmt = select(models.PatientTable).from_statement(search)
+    return list(db.scalars(stmt, {"match": match, "limit": limit, "offset": offset}))
+
+
+def search_patients_page(
+    db: Session,
+    query: str,
+    *,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+):
+    """Return ``(patients, next_cursor)`` for one page of search results.
+
+    Ranked results have no stable key to seek from, so search cursors carry
+    an offset instead of an id.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    offset = decode_cursor(cursor, prefix=_OFFSET_CURSOR_PREFIX) if cursor else 0
+    rows = search_patients(db, query, limit=limit + 1, offset=offset)
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(offset + limit, prefix=_OFFSET_CURSOR_PREFIX)
+    return rows, None
+
+
+def list_changes(
+    db: Session,
+    *,
+    since: int = 0,
+    limit: int = MAX_PAGE_SIZE,
+) -> tuple[list[models.PatientTable], int, bool]:
+    """Return ``(patients, next_since, has_more)`` for rows changed after ``since``.
+
+    Rows come in ``change_seq`` order from an index range scan, so the cost
+    depends on the number of changes, not the table size. ``next_since`` is
+    the high-water mark to pass back on the next call; when ``has_more`` is
+    set, call again straight away for the rest.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    rows = list(
+        db.scalars(
+            select(models.PatientTable)
+            .where(models.PatientTable.change_seq > since)
+            .order_by(models.PatientTable.change_seq)
+            .limit(limit + 1)
+        )
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, rows[-1].change_seq if rows else since, has_more
+
+
+def current_change_seq(db: Session) -> int:
+    """Highest ``change_seq`` in use: where a client that just loaded everything resumes."""
+    return db.scalar(select(func.coalesce(func.max(models.PatientTable.change_seq), 0)))
+
+
 def get_patient_by_identity(
     db: Session,
     first_name: str,
@@ -53,44 +243,154 @@ def get_patient_by_phone(db: Session, phone: str):
     )
 
 
-def create_patient(db: Session, patient_in: schemas.PatientCreate):
-    """Create or update a patient keyed by normalized phone number."""
+def _next_change_seq():
+    """``max(change_seq) + 1``, evaluated per row; one step down the index.
 
-    existing_by_phone = get_patient_by_phone(db, patient_in.phone_number)
-    if existing_by_phone:
-        existing_by_phone.first_name = patient_in.first_name
-        existing_by_phone.last_name = patient_in.last_name
-        existing_by_phone.address = patient_in.address
-        existing_by_phone.new_patient = False
-        db.add(existing_by_phone)
-        db.commit()
-        db.refresh(existing_by_phone)
-        return existing_by_phone
-
-    obj = models.PatientTable(
-        first_name=patient_in.first_name,
-        last_name=patient_in.last_name,
-        phone_number=patient_in.phone_number,
-        address=patient_in.address,
-        new_patient=True,
+    SQLite has a single writer, so no other transaction can take the same
+    number, and sequence order matches commit order.
+    """
+    seq = models.PatientTable.__table__.alias("seq")
+    return select(func.coalesce(func.max(seq.c.change_seq), 0) + 1).scalar_subquery()
+
+
+def _upsert_statement(target, *, update_details: bool):
+    table = models.PatientTable.__table__
+    stmt = sqlite_insert(target).values(change_seq=_next_change_seq())
+    changes = {"new_patient": False}
+    changed = [table.c.new_patient]
+    if update_details:
+        changes.update(
+            first_name=stmt.excluded.first_name,
+            last_name=stmt.excluded.last_name,
+            address=stmt.excluded.address,
+        )
+        changed += [table.c[name] != stmt.excluded[name] for name in ("first_name", "last_name", "address")]
+    # A repeat visit that changes nothing keeps its sequence number, so delta
+    # sync only sends rows that actually changed.
+    changes["change_seq"] = case((or_(*changed), _next_change_seq()), else_=table.c.change_seq)
+    return stmt.on_conflict_do_update(index_elements=[table.c.phone_number], set_=changes)
+
+
+def upsert_patient(
+    db: Session,
+    patient_in: schemas.PatientCreate,
+    *,
+    update_details: bool = True,
+) -> models.PatientTable:
+    """Insert or update a patient keyed by phone in a single statement.
+
+    Runs ``INSERT … ON CONFLICT(phone_number) DO UPDATE … RETURNING``: a new
+    phone number is inserted with ``new_patient=True``; a returning one gets
+    ``new_patient=False`` and, when ``update_details`` is set, the new name
+    and address. Does not commit, so callers can batch several upserts per
+    transaction; cached responses for the row are dropped now and again when
+    the transaction ends.
+
+    Duplicate-candidate keys are written for new rows and refreshed when the
+    details were updated; a plain returning-patient visit stays one statement.
+    """
+    stmt = (
+        _upsert_statement(models.PatientTable, update_details=update_details)
+        .values(
+            first_name=patient_in.first_name,
+            last_name=patient_in.last_name,
+            phone_number=patient_in.phone_number,
+            address=patient_in.address,
+            new_patient=True,
+        )
+        .returning(models.PatientTable)
     )
-    db.add(obj)
+    patient = db.scalars(stmt, execution_options={"populate_existing": True}).one()
+    patient_cache.invalidate_on_commit(db, [patient.id])
+    if patient.new_patient or update_details:
+        duplicates.index_patients(db, [patient], replace=not patient.new_patient)
+    return patient
+
+
+def upsert_patients(db: Session, rows: list[dict], *, update_details: bool = True) -> int:
+    """Upsert many validated patient dicts with one ``executemany`` call.
+
+    Same conflict handling as :func:`upsert_patient`, but rows are not
+    returned, which lets the driver reuse one prepared statement for the
+    whole batch. Duplicate-candidate keys are then rebuilt for the batch's
+    phone numbers. Does not commit. Returns the number of rows written.
+    """
+    if not rows:
+        return 0
+    params = [
+        {
+            "first_name": row["first_name"],
+            "last_name": row["last_name"],
+            "phone_number": row["phone_number"],
+            "address": row["address"],
+            "new_patient": True,
+        }
+        for row in rows
+    ]
+    # A Core (table) statement skips the ORM bulk machinery; without RETURNING
+    # SQLAlchemy hands the parameter list straight to ``cursor.executemany``.
+    table = models.PatientTable.__table__
+    db.execute(_upsert_statement(table, update_details=update_details), params)
+    _reindex_by_phone(db, [row["phone_number"] for row in params])
+    return len(params)
+
 
+def _reindex_by_phone(db: Session, phones: list[str], *, chunk_size: int = 5000) -> None:
+    """Rebuild match keys and drop cached responses for the rows behind ``phones``."""
+    for start in range(0, len(phones), chunk_size):
+        written = db.execute(
+            select(
+                models.PatientTable.id,
+                models.PatientTable.first_name,
+                models.PatientTable.last_name,
+                models.PatientTable.phone_number,
+            ).where(models.PatientTable.phone_number.in_(phones[start:start + chunk_size]))
+        ).all()
+        duplicates.index_patients(db, written, replace=True)
+        patient_cache.invalidate_on_commit(db, [row.id for row in written])
+
+
+def commit_without_expiry(db: Session) -> None:
+    """Commit without expiring loaded rows.
+
+    Rows populated by ``RETURNING`` are already current, so the reload that
+    ``expire_on_commit`` would trigger on next access is a wasted SELECT.
+    """
+    expire_on_commit, db.expire_on_commit = db.expire_on_commit, False
     try:
         db.commit()
-    except IntegrityError:
-        db.rollback()
-        existing_by_phone = get_patient_by_phone(db, patient_in.phone_number)
-        if existing_by_phone:
-            existing_by_phone.first_name = patient_in.first_name
-            existing_by_phone.last_name = patient_in.last_name
-            existing_by_phone.address = patient_in.address
-            existing_by_phone.new_patient = False
-            db.add(existing_by_phone)
-            db.commit()
-            db.refresh(existing_by_phone)
-            return existing_by_phone
-        raise
-
-    db.refresh(obj)
-    return obj
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+
+def create_patient(db: Session, patient_in: schemas.PatientCreate):
+    """Create or update a patient keyed by normalized phone number."""
+    patient = upsert_patient(db, patient_in)
+    commit_without_expiry(db)
+    return patient
+
+
+EXPORT_COLUMNS = (
+    "id",
+    "first_name",
+    "last_name",
+    "phone_number",
+    "address",
+    "new_patient",
+)
+
+
+def iter_patient_rows(db: Session, *, chunk_size: int = 1000):
+    """Yield patients as plain tuples (ordered by id) in ``chunk_size`` batches.
+
+    Rows are fetched with ``yield_per`` so only one chunk is buffered at a
+    time; column order matches :data:`EXPORT_COLUMNS`.
+    """
+    columns = [getattr(models.PatientTable, name) for name in EXPORT_COLUMNS]
+    query = (
+        db.query(*columns)
+        .order_by(models.PatientTable.id.asc())
+        .yield_per(chunk_size)
+    )
+    for row in query:
+        yield tuple(row)
@@ -15,17 +15,57 @@ across different threads (e.g., FastAPI’s default Uvicorn workers). Without it
 SQLite raises "ProgrammingError: SQLite objects created in a thread can only
 be used in that same thread".
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import os
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import Session, sessionmaker
+from .duplicates import backfill_match_keys
+from .metrics import instrument_engine
 from .models import Base
 
 from typing import Optional
 
 from sqlalchemy.engine import Engine
 
-DATABASE_URL = "sqlite:///./patients.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./patients.db")
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+def configure_sqlite(target_engine: Engine) -> None:
+    """Apply WAL journaling, ``synchronous``, ``busy_timeout`` and explicit ``BEGIN`` to every connection.
+
+    WAL lets readers proceed while the writer commits, ``synchronous=NORMAL``
+    skips the per-commit fsync of the WAL (still durable across application
+    crashes), and ``busy_timeout`` makes contending connections wait for the
+    write lock instead of failing with "database is locked".
+
+    pysqlite's own transaction handling is switched off and SQLAlchemy emits
+    ``BEGIN`` itself. Otherwise pysqlite only begins a transaction before
+    DML, so a ``SAVEPOINT`` (the writer wraps each request in one) runs
+    outside any transaction and its ``RELEASE`` commits on the spot.
+    """
+
+    @event.listens_for(target_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+    @event.listens_for(target_engine, "begin")
+    def _begin_transaction(connection) -> None:
+        connection.exec_driver_sql("BEGIN")
+
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+if engine.dialect.name == "sqlite":
+    configure_sqlite(engine)
+instrument_engine(engine)
 
 # Session factory: autocommit/flush are OFF so you control when data is persisted.
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
@@ -42,12 +82,78 @@ def _ensure_constraints(target_engine: Engine) -> None:
         )
 
 
+def _ensure_change_seq(target_engine: Engine) -> None:
+    """Add ``patients.change_seq`` to databases created before delta sync.
+
+    Existing rows are numbered by id, so a first sync from ``since=0`` still
+    returns every patient.
+    """
+
+    if "change_seq" in {column["name"] for column in inspect(target_engine).get_columns("patients")}:
+        return
+    with target_engine.begin() as connection:
+        connection.exec_driver_sql(
+            "ALTER TABLE patients ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0"
+        )
+        connection.exec_driver_sql("UPDATE patients SET change_seq = id")
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_patients_change_seq ON patients (change_seq)"
+        )
+
+
+# External-content FTS5 index over patient names and addresses. Triggers keep
+# it in sync with every write path (ORM, upserts, bulk executemany); the
+# update trigger only fires when an indexed column is assigned, so flipping
+# ``new_patient`` on a returning patient does not touch the index.
+_SEARCH_INDEX_DDL = (
+    "CREATE VIRTUAL TABLE patients_fts USING fts5("
+    "first_name, last_name, address, content='patients', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS patients_fts_ai AFTER INSERT ON patients BEGIN "
+    "INSERT INTO patients_fts(rowid, first_name, last_name, address) "
+    "VALUES (new.id, new.first_name, new.last_name, new.address); END",
+    "CREATE TRIGGER IF NOT EXISTS patients_fts_ad AFTER DELETE ON patients BEGIN "
+    "INSERT INTO patients_fts(patients_fts, rowid, first_name, last_name, address) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.address); END",
+    "CREATE TRIGGER IF NOT EXISTS patients_fts_au "
+    "AFTER UPDATE OF first_name, last_name, address ON patients BEGIN "
+    "INSERT INTO patients_fts(patients_fts, rowid, first_name, last_name, address) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.address); "
+    "INSERT INTO patients_fts(rowid, first_name, last_name, address) "
+    "VALUES (new.id, new.first_name, new.last_name, new.address); END",
+)
+
+
+def _ensure_search_index(target_engine: Engine) -> None:
+    """Create the FTS5 patient search index and its triggers (SQLite only)."""
+
+    with target_engine.begin() as connection:
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'patients_fts'"
+        ).first()
+        if exists:
+            return
+        for statement in _SEARCH_INDEX_DDL:
+            connection.exec_driver_sql(statement)
+        # Index patients that were stored before search existed.
+        connection.exec_driver_sql("INSERT INTO patients_fts(patients_fts) VALUES ('rebuild')")
+
+
 def init_db(engine_override: Optional[Engine] = None) -> None:
     """Create database tables if they don't exist and enforce constraints."""
 
     target_engine = engine_override or engine
+    index_missing = not inspect(target_engine).has_table("patient_match_keys")
     Base.metadata.create_all(bind=target_engine)
     _ensure_constraints(target_engine)
+    _ensure_change_seq(target_engine)
+    if target_engine.dialect.name == "sqlite":
+        _ensure_search_index(target_engine)
+    if index_missing:
+        # Patients stored before duplicate detection existed need their keys.
+        with Session(bind=target_engine) as db:
+            backfill_match_keys(db)
+            db.commit()
 
 
 def get_db():
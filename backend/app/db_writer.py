@@ -0,0 +1,190 @@
+"""Single-writer, group-committing queue for patient upserts.
+
+SQLite allows one writer at a time and every commit is an fsync. Instead of
+each request committing on its own (and contending for the write lock), a
+dedicated writer thread takes upserts from a queue, applies up to
+``max_batch_size`` of them in one transaction and commits once. Each upsert
+runs in its own SAVEPOINT, so a failing item is reported to its caller
+without aborting the rest of the batch.
+
+``max_wait`` trades latency for batch size: after the first request arrives
+the writer waits at most that long for more before committing.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from . import crud, schemas
+from .database import SessionLocal
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+DB_WRITER_ENABLED = os.getenv("DB_WRITER_ENABLED", "true").lower() == "true"
+
+WRITER_BATCH_SIZE = registry.histogram(
+    "db_writer_batch_size",
+    "Upserts applied per group-committed transaction.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+WRITER_COMMIT_SECONDS = registry.histogram(
+    "db_writer_commit_seconds",
+    "Time to apply and commit one group-committed batch.",
+)
+
+_STOP = object()
+
+
+@dataclass
+class _WriteRequest:
+    apply: Callable[[Session], Any]
+    future: Future
+
+
+class PatientWriter:
+    """Apply patient upserts from a queue in group-committed transactions."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        max_batch_size: int = 64,
+        max_wait: float = 0.002,
+    ) -> None:
+        self.session_factory = session_factory
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+
+    @classmethod
+    def from_env(cls, session_factory: Callable[[], Session] = SessionLocal) -> "PatientWriter":
+        return cls(
+            session_factory,
+            max_batch_size=int(os.getenv("DB_WRITER_MAX_BATCH", "64")),
+            max_wait=float(os.getenv("DB_WRITER_MAX_WAIT_MS", "2")) / 1000,
+        )
+
+    # -- producer side -----------------------------------------------------
+
+    def submit(self, apply: Callable[[Session], Any]) -> Future:
+        """Queue ``apply(session)``; the future resolves after its batch commits."""
+        self.start()
+        future: Future = Future()
+        self._queue.put(_WriteRequest(apply, future))
+        return future
+
+    async def run(self, apply: Callable[[Session], Any]) -> Any:
+        return await asyncio.wrap_future(self.submit(apply))
+
+    async def upsert(self, patient_in: schemas.PatientCreate, *, update_details: bool = True):
+        """Insert or update one patient and return the committed (detached) row."""
+        return await self.run(
+            partial(crud.upsert_patient, patient_in=patient_in, update_details=update_details)
+        )
+
+    # -- writer thread -------------------------------------------------------
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="patient-writer", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Drain queued writes, then stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._apply_batch(batch)
+
+    def _apply_batch(self, batch: list[_WriteRequest]) -> None:
+        started = time.perf_counter()
+        outcomes: list[tuple[_WriteRequest, Any, BaseException | None]] = []
+        try:
+            with self.session_factory() as db:
+                # Rows are handed to other threads after the session closes.
+                db.expire_on_commit = False
+                for request in batch:
+                    if not request.future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with db.begin_nested():
+                            result = request.apply(db)
+                        outcomes.append((request, result, None))
+                    except Exception as exc:
+                        outcomes.append((request, None, exc))
+                db.commit()
+        except Exception as exc:
+            logger.exception(
+                "db_writer.commit_failed",
+                extra={"event": "db_writer.commit_failed", "batch_size": len(batch)},
+            )
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(exc)
+            return
+
+        for request, result, error in outcomes:
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(result)
+        self.batches += 1
+        self.writes += len(outcomes)
+        WRITER_BATCH_SIZE.observe(len(outcomes))
+        WRITER_COMMIT_SECONDS.observe(time.perf_counter() - started)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": DB_WRITER_ENABLED,
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "writes": self.writes,
+            "avg_batch_size": self.writes / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+patient_writer = PatientWriter.from_env()
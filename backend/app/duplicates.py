@@ -0,0 +1,230 @@
+"""Fuzzy duplicate-patient candidates for STT-mangled intakes.
+
+Patients are deduplicated exactly on phone number, so one mis-transcribed
+digit or a misspelled name creates a second record. Comparing every intake
+against every row would be a table scan, so each patient instead gets a set
+of precomputed match keys in ``patient_match_keys``, written by the ``crud``
+upsert paths:
+
+* ``p:<digits>`` for the phone number and for each of its single-digit
+  deletions. Two numbers one substitution, transposition, insertion or
+  deletion apart always share one of these keys.
+* ``n:<soundex(first)>:<soundex(last)>`` for how the name sounds.
+
+A lookup is two indexed key queries plus a primary-key fetch of the few
+candidates, independent of table size. Neighbouring phone
+numbers are common in a dense patient list, so a candidate is only reported
+when two signals agree: a similar phone plus a similar-sounding name, or a
+same-sounding name at the same address.
+"""
+from __future__ import annotations
+
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+
+DUPLICATE_CHECK_ENABLED = os.getenv("DUPLICATE_CHECK_ENABLED", "true").lower() == "true"
+MAX_DUPLICATE_CANDIDATES = int(os.getenv("MAX_DUPLICATE_CANDIDATES", "5"))
+# Common names ("John Smith") can share a name key with many rows.
+_MAX_NAME_KEY_ROWS = 50
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+_ADDRESS_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def soundex(name: str) -> str:
+    """American Soundex of ``name`` (accents folded), or ``""`` without letters."""
+    folded = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    letters = [ch for ch in folded.lower() if ch.isalpha()]
+    if not letters:
+        return ""
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0], "")
+    for ch in letters[1:]:
+        digit = _SOUNDEX_CODES.get(ch, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # "h" and "w" do not separate letters with the same code; vowels do.
+        if ch not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def normalize_phone(phone: str) -> str:
+    digits = re.sub(r"\D", "", phone)
+    # A spoken leading country code should not make a number look different.
+    return digits[1:] if len(digits) == 11 and digits.startswith("1") else digits
+
+
+def name_key(first_name: str, last_name: str) -> str | None:
+    first, last = soundex(first_name), soundex(last_name)
+    return f"n:{first}:{last}" if first and last else None
+
+
+def phone_keys(phone: str) -> set[str]:
+    digits = normalize_phone(phone)
+    if not digits:
+        return set()
+    return {f"p:{digits}"} | {f"p:{digits[:i]}{digits[i + 1:]}" for i in range(len(digits))}
+
+
+def match_keys(first_name: str, last_name: str, phone_number: str) -> set[str]:
+    keys = phone_keys(phone_number)
+    name = name_key(first_name, last_name)
+    if name:
+        keys.add(name)
+    return keys
+
+
+def index_patients(db: Session, patients: Sequence, *, replace: bool = False) -> None:
+    """Write match keys for ``patients`` (rows with id, names and phone).
+
+    ``replace`` drops each patient's old keys first, for updates that may
+    have changed the name or phone. Does not commit.
+    """
+    if not patients:
+        return
+    table = models.PatientMatchKeyTable.__table__
+    if replace:
+        db.execute(delete(table).where(table.c.patient_id.in_([p.id for p in patients])))
+    rows = [
+        {"key": key, "patient_id": p.id}
+        for p in patients
+        for key in match_keys(p.first_name, p.last_name, p.phone_number)
+    ]
+    db.execute(sqlite_insert(table).on_conflict_do_nothing(), rows)
+
+
+def backfill_match_keys(db: Session, *, chunk_size: int = 5000) -> int:
+    """Index every patient; used once when the key table is first created."""
+    count = 0
+    last_id = 0
+    while True:
+        chunk = db.execute(
+            select(
+                models.PatientTable.id,
+                models.PatientTable.first_name,
+                models.PatientTable.last_name,
+                models.PatientTable.phone_number,
+            )
+            .where(models.PatientTable.id > last_id)
+            .order_by(models.PatientTable.id)
+            .limit(chunk_size)
+        ).all()
+        if not chunk:
+            return count
+        index_patients(db, chunk)
+        count += len(chunk)
+        last_id = chunk[-1].id
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Optimal string alignment distance <= 1 (adjacent swaps count as one edit)."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        if len(diffs) != 2 or diffs[1] != diffs[0] + 1:
+            return False
+        i, j = diffs
+        return a[i] == b[j] and a[j] == b[i]
+    shorter, longer = sorted((a, b), key=len)
+    return any(longer[:i] + longer[i + 1:] == shorter for i in range(len(longer)))
+
+
+def _street(address: str) -> tuple[str, ...]:
+    # Civic number and first street word: "12 Maple Ave." == "12 maple avenue".
+    return tuple(_ADDRESS_TOKEN_RE.findall(address.lower())[:2])
+
+
+@dataclass(frozen=True)
+class DuplicateCandidate:
+    patient: models.PatientTable
+    reasons: tuple[str, ...]
+
+    def to_dict(self) -> dict:
+        patient = schemas.Patient.model_validate(self.patient).model_dump()
+        return {**patient, "reasons": list(self.reasons)}
+
+
+def _reasons(patient, other) -> tuple[str, ...]:
+    reasons = []
+    if _within_one_edit(normalize_phone(patient.phone_number), normalize_phone(other.phone_number)):
+        reasons.append("similar_phone")
+    first_match = soundex(patient.first_name) == soundex(other.first_name)
+    last_match = soundex(patient.last_name) == soundex(other.last_name)
+    if first_match and last_match:
+        reasons.append("similar_name")
+    elif first_match or last_match:
+        reasons.append("partial_name")
+    if _street(patient.address) == _street(other.address):
+        reasons.append("same_address")
+    return tuple(reasons)
+
+
+def _is_likely_duplicate(reasons: Iterable[str]) -> bool:
+    found = set(reasons)
+    if "similar_phone" in found:
+        return bool(found & {"similar_name", "partial_name", "same_address"})
+    return {"similar_name", "same_address"} <= found
+
+
+def find_duplicates(
+    db: Session,
+    patient,
+    *,
+    limit: int = MAX_DUPLICATE_CANDIDATES,
+) -> list[DuplicateCandidate]:
+    """Return existing patients that are probably the same person as ``patient``."""
+    key_table = models.PatientMatchKeyTable
+    keys = phone_keys(patient.phone_number)
+    candidate_ids = set(
+        db.scalars(
+            select(key_table.patient_id)
+            .where(key_table.key.in_(keys), key_table.patient_id != patient.id)
+            .distinct()
+        )
+    )
+    name = name_key(patient.first_name, patient.last_name)
+    if name:
+        candidate_ids.update(
+            db.scalars(
+                select(key_table.patient_id)
+                .where(key_table.key == name, key_table.patient_id != patient.id)
+                .limit(_MAX_NAME_KEY_ROWS)
+            )
+        )
+    if not candidate_ids:
+        return []
+
+    others = db.scalars(
+        select(models.PatientTable).where(models.PatientTable.id.in_(candidate_ids))
+    )
+    candidates = [
+        DuplicateCandidate(other, reasons)
+        for other in others
+        if _is_likely_duplicate(reasons := _reasons(patient, other))
+    ]
+    candidates.sort(key=lambda candidate: (-len(candidate.reasons), -candidate.patient.id))
+    return candidates[:limit]
@@ -25,3 +25,65 @@ class ProviderError(RuntimeError):
         if self.payload is not None:
             fields["payload"] = self.payload
         return fields
+
+
+@dataclass
+class CircuitOpenError(ProviderError):
+    """Exception raised without calling a provider whose circuit breaker is open."""
+
+    retry_after: float = 0.0
+
+
+@dataclass
+class DeadlineExceededError(TimeoutError):
+    """Exception raised when a request's end-to-end time budget runs out."""
+
+    budget_seconds: float
+    stage: str
+
+    def __post_init__(self) -> None:  # pragma: no cover - trivial
+        super().__init__(f"{self.budget_seconds:.1f}s deadline exceeded during {self.stage}")
+
+
+@dataclass
+class IntakeError(RuntimeError):
+    """Exception raised when a voice intake cannot produce a patient record.
+
+    ``status_code`` and ``detail`` mirror the HTTP error the synchronous
+    ``/voice-input`` route returns, so background jobs can record the same
+    structured error.
+    """
+
+    status_code: int
+    detail: Any
+
+    def __post_init__(self) -> None:  # pragma: no cover - trivial
+        super().__init__(str(self.detail))
+
+    @property
+    def retryable(self) -> bool:
+        """Provider failures are transient; validation failures are not."""
+        return self.status_code >= 500
+
+
+@dataclass
+class UploadTooLargeError(ValueError):
+    """Exception raised when an uploaded recording exceeds the size limit."""
+
+    limit_bytes: int
+
+    def __post_init__(self) -> None:  # pragma: no cover - trivial
+        super().__init__(f"Upload exceeds {self.limit_bytes} bytes")
+
+
+@dataclass
+class NoSpeechDetectedError(ValueError):
+    """Exception raised when a recording contains too little speech to transcribe."""
+
+    speech_seconds: float
+    min_speech_seconds: float
+
+    def __post_init__(self) -> None:  # pragma: no cover - trivial
+        super().__init__(
+            f"Detected {self.speech_seconds:.2f}s of speech; need {self.min_speech_seconds:.2f}s"
+        )
@@ -0,0 +1,68 @@
+"""Streaming serializers for bulk patient exports."""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Iterable, Iterator, Sequence
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _batched(rows: Iterable[tuple], size: int) -> Iterator[list[tuple]]:
+    batch: list[tuple] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_ndjson(
+    rows: Iterable[tuple],
+    columns: Sequence[str],
+    *,
+    batch_size: int = 500,
+) -> Iterator[bytes]:
+    """Encode ``rows`` as newline-delimited JSON, one chunk per batch."""
+    for batch in _batched(rows, batch_size):
+        lines = [
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, separators=(",", ":"))
+            for row in batch
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def stream_csv(
+    rows: Iterable[tuple],
+    columns: Sequence[str],
+    *,
+    batch_size: int = 500,
+) -> Iterator[bytes]:
+    """Encode ``rows`` as CSV with a header line, one chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    yield buffer.getvalue().encode("utf-8")
+
+    for batch in _batched(rows, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_export(
+    rows: Iterable[tuple],
+    columns: Sequence[str],
+    export_format: str,
+) -> Iterator[bytes]:
+    """Dispatch to the serializer for ``export_format`` (``ndjson`` or ``csv``)."""
+    if export_format == "csv":
+        return stream_csv(rows, columns)
+    return stream_ndjson(rows, columns)
@@ -0,0 +1,165 @@
+"""Local stand-in for a streaming speech-to-text provider.
+
+It speaks the protocol described in :mod:`app.streaming_stt` and reveals a
+scripted transcript word by word as audio bytes arrive, so the realtime
+intake can be exercised and benchmarked offline::
+
+    python -m app.fake_stt_server --port 8765 \\
+        --transcript "My name is Alice Nguyen, my phone number is 514 555 0100 and I live at 1 Main St."
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from typing import AsyncIterator
+
+from websockets.asyncio.server import ServerConnection, serve
+
+from .streaming_stt import TranscriptEvent
+
+DEFAULT_TRANSCRIPT = (
+    "My name is Alice Nguyen, my phone number is 514 555 0100 "
+    "and I live at 123 Maple Avenue."
+)
+
+
+class ScriptedTranscriber:
+    """Turn a byte count into progressively revealed transcript events.
+
+    Every ``bytes_per_word`` bytes of audio reveal one more word; a segment
+    is settled (a ``final`` event) every ``segment_words`` words and when the
+    stream ends.
+    """
+
+    def __init__(
+        self,
+        transcript: str = DEFAULT_TRANSCRIPT,
+        *,
+        bytes_per_word: int = 3200,
+        segment_words: int = 8,
+    ) -> None:
+        self._words = transcript.split()
+        self._bytes_per_word = max(bytes_per_word, 1)
+        self._segment_words = max(segment_words, 1)
+        self._received = 0
+        self._revealed = 0
+        self._segment_start = 0
+
+    def feed(self, n_bytes: int) -> list[TranscriptEvent]:
+        self._received += n_bytes
+        target = min(self._received // self._bytes_per_word, len(self._words))
+        events: list[TranscriptEvent] = []
+        while self._revealed < target:
+            self._revealed += 1
+            if self._revealed - self._segment_start >= self._segment_words:
+                events.append(self._settle())
+            else:
+                segment = " ".join(self._words[self._segment_start:self._revealed])
+                events.append(TranscriptEvent(segment, is_final=False))
+        return events
+
+    def finish(self) -> list[TranscriptEvent]:
+        # Whatever was spoken but not yet "heard" is flushed on end of stream.
+        self._revealed = len(self._words)
+        if self._segment_start < self._revealed:
+            return [self._settle()]
+        return []
+
+    def _settle(self) -> TranscriptEvent:
+        segment = " ".join(self._words[self._segment_start:self._revealed])
+        self._segment_start = self._revealed
+        return TranscriptEvent(segment, is_final=True)
+
+
+class FakeStreamingSTTSession:
+    """In-process :class:`~app.streaming_stt.StreamingSTTSession` backed by a script."""
+
+    def __init__(self, transcriber: ScriptedTranscriber, *, latency: float = 0.0) -> None:
+        self._transcriber = transcriber
+        self._latency = latency
+        self._queue: asyncio.Queue[TranscriptEvent | None] = asyncio.Queue()
+
+    async def send_audio(self, chunk: bytes) -> None:
+        for event in self._transcriber.feed(len(chunk)):
+            self._queue.put_nowait(event)
+
+    async def finish(self) -> None:
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        for event in self._transcriber.finish():
+            self._queue.put_nowait(event)
+        self._queue.put_nowait(None)
+
+    async def events(self) -> AsyncIterator[TranscriptEvent]:
+        while True:
+            event = await self._queue.get()
+            if event is None:
+                return
+            yield event
+
+    async def aclose(self) -> None:
+        return None
+
+
+def _encode(event: TranscriptEvent) -> str:
+    return json.dumps({"type": "final" if event.is_final else "partial", "text": event.text})
+
+
+def make_handler(transcript: str, *, bytes_per_word: int, segment_words: int, latency: float):
+    async def handler(connection: ServerConnection) -> None:
+        transcriber = ScriptedTranscriber(
+            transcript, bytes_per_word=bytes_per_word, segment_words=segment_words
+        )
+        async for message in connection:
+            if isinstance(message, bytes):
+                for event in transcriber.feed(len(message)):
+                    await connection.send(_encode(event))
+            elif json.loads(message).get("type") == "end":
+                if latency:
+                    await asyncio.sleep(latency)
+                for event in transcriber.finish():
+                    await connection.send(_encode(event))
+                await connection.send(json.dumps({"type": "done"}))
+                return
+
+    return handler
+
+
+def serve_fake_stt(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    *,
+    transcript: str = DEFAULT_TRANSCRIPT,
+    bytes_per_word: int = 3200,
+    segment_words: int = 8,
+    latency: float = 0.0,
+):
+    """Return a ``websockets`` server (use as an async context manager)."""
+    handler = make_handler(
+        transcript, bytes_per_word=bytes_per_word, segment_words=segment_words, latency=latency
+    )
+    return serve(handler, host, port)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    async with serve_fake_stt(
+        args.host,
+        args.port,
+        transcript=args.transcript,
+        bytes_per_word=args.bytes_per_word,
+        segment_words=args.segment_words,
+        latency=args.latency,
+    ) as server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":  # pragma: no cover - manual tool
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--transcript", default=DEFAULT_TRANSCRIPT)
+    parser.add_argument("--bytes-per-word", type=int, default=3200)
+    parser.add_argument("--segment-words", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay before the final segment")
+    asyncio.run(_main(parser.parse_args()))
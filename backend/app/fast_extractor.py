@@ -0,0 +1,178 @@
+"""Rule-based fast path for scripted patient introductions.
+
+Most intakes follow the script "My name is X Y, my phone number is …, I live
+at …". For those, precompiled patterns recover the fields locally in
+microseconds; anything unusual gets a low confidence score so the caller
+falls back to the LLM parser.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.8"))
+
+REQUIRED_FIELDS = ("first_name", "last_name", "phone_number", "address")
+
+_NAME_RE = re.compile(
+    r"\b(?:my name is|my name's|this is|i am|i'm)\s+"
+    r"(?P<first>[A-Za-z][A-Za-z'\-]*)\s+(?P<last>[A-Za-z][A-Za-z'\-]*)"
+    # A third word before any punctuation ("Mary Ann Smith") makes the split uncertain.
+    r"(?:\s+(?P<extra>[A-Za-z][A-Za-z'\-]*))?",
+    re.IGNORECASE,
+)
+_PHONE_TOKEN = (
+    r"(?:\d+|(?:zero|oh|one|two|three|four|five|six|seven|eight|nine|double|triple)\b)"
+)
+_PHONE_RE = re.compile(
+    r"\b(?:phone number|phone|cell number|cell|mobile number|mobile|number)"
+    rf"(?:\s+is|:)?\s+(?P<phone>\(?{_PHONE_TOKEN}(?:[\s,.\-()]+{_PHONE_TOKEN})*)",
+    re.IGNORECASE,
+)
+# Street abbreviations whose period does not end the address ("123 St. Catherine").
+_ADDRESS_ABBREVIATIONS = r"(?:st|ste|mt|ave|apt|rd|blvd|dr|ln|ct|pl|hwy|pkwy|no|n|s|e|w)"
+_ADDRESS_RE = re.compile(
+    r"\b(?:i live at|my address is|address is|i reside at)\s+"
+    rf"(?P<address>(?:\b{_ADDRESS_ABBREVIATIONS}\.|.)+?)"
+    r"(?=\.\s|\.$|,?\s+and\s+my\b|,?\s+(?:my|and)\s+(?:phone|number|name|cell|mobile)\b|;|$)",
+    re.IGNORECASE,
+)
+# Left in a captured address, these mean another clause was swallowed.
+_ADDRESS_SPILL_RE = re.compile(r"\b(?:phone|number|name|cell|mobile)\b", re.IGNORECASE)
+_PHONE_TOKEN_RE = re.compile(r"[A-Za-z]+|\d+")
+
+_SPOKEN_DIGITS = {
+    "zero": "0",
+    "oh": "0",
+    "o": "0",
+    "one": "1",
+    "two": "2",
+    "three": "3",
+    "four": "4",
+    "five": "5",
+    "six": "6",
+    "seven": "7",
+    "eight": "8",
+    "nine": "9",
+}
+_REPEATERS = {"double": 2, "triple": 3}
+_NAME_STOPWORDS = frozenset(
+    {"and", "my", "the", "calling", "speaking", "here", "from", "at", "phone", "number", "i", "a"}
+)
+
+
+@dataclass
+class FastPathResult:
+    """Fields recovered by the rule-based extractor with per-field confidence."""
+
+    fields: dict[str, str | None]
+    field_confidence: dict[str, float]
+
+    @property
+    def confidence(self) -> float:
+        """Overall confidence: the weakest required field decides."""
+        return min(self.field_confidence.get(name, 0.0) for name in REQUIRED_FIELDS)
+
+    def is_confident(self, threshold: float = FAST_PATH_MIN_CONFIDENCE) -> bool:
+        return self.confidence >= threshold
+
+
+@dataclass
+class FastPathStats:
+    """Counters for how often the fast path short-circuits the LLM."""
+
+    attempts: int = 0
+    hits: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            self.attempts += 1
+            if hit:
+                self.hits += 1
+
+    def snapshot(self) -> dict[str, float | int]:
+        return {
+            "attempts": self.attempts,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.attempts if self.attempts else 0.0,
+        }
+
+
+fast_path_stats = FastPathStats()
+
+
+def spoken_digits_to_number(text: str) -> tuple[str, bool]:
+    """Convert "five one four, double five …" style speech into digits.
+
+    Returns ``(digits, clean)`` where ``clean`` is False when tokens that are
+    neither digits nor spoken numbers had to be skipped.
+    """
+    digits: list[str] = []
+    clean = True
+    repeat = 1
+    for token in _PHONE_TOKEN_RE.findall(text):
+        lowered = token.lower()
+        if token.isdigit():
+            digits.append(token[0] * repeat + token[1:])
+            repeat = 1
+        elif lowered in _REPEATERS:
+            repeat = _REPEATERS[lowered]
+        elif lowered in _SPOKEN_DIGITS:
+            digits.append(_SPOKEN_DIGITS[lowered] * repeat)
+            repeat = 1
+        else:
+            clean = False
+    return "".join(digits), clean
+
+
+def _name_confidence(token: str) -> float:
+    if token.lower() in _NAME_STOPWORDS or len(token) < 2:
+        return 0.0
+    # STT engines capitalize proper nouns; lowercase names are less certain.
+    return 0.95 if token[0].isupper() else 0.6
+
+
+def _format_name(token: str) -> str:
+    return token if any(ch.isupper() for ch in token) else token.capitalize()
+
+
+def extract_fast(transcript: str) -> FastPathResult:
+    """Extract patient fields from a scripted transcript without an LLM."""
+    fields: dict[str, str | None] = {name: None for name in REQUIRED_FIELDS}
+    confidence: dict[str, float] = {}
+
+    name_match = _NAME_RE.search(transcript)
+    if name_match:
+        first, last = name_match.group("first"), name_match.group("last")
+        fields["first_name"] = _format_name(first)
+        fields["last_name"] = _format_name(last)
+        confidence["first_name"] = _name_confidence(first)
+        confidence["last_name"] = _name_confidence(last)
+        extra = name_match.group("extra")
+        if extra and extra.lower() not in _NAME_STOPWORDS:
+            # Middle name or compound first name: leave the split to the LLM.
+            confidence["last_name"] = min(confidence["last_name"], 0.5)
+
+    phone_match = _PHONE_RE.search(transcript)
+    if phone_match:
+        digits, clean = spoken_digits_to_number(phone_match.group("phone"))
+        if digits:
+            fields["phone_number"] = digits
+            well_formed = len(digits) == 10 or (len(digits) == 11 and digits.startswith("1"))
+            confidence["phone_number"] = (0.95 if clean else 0.7) if well_formed else 0.2
+
+    address_match = _ADDRESS_RE.search(transcript)
+    if address_match:
+        address = address_match.group("address").strip(" ,")
+        if address:
+            fields["address"] = address
+            # Street addresses normally open with a civic number.
+            confidence["address"] = 0.9 if address[0].isdigit() else 0.5
+            if _ADDRESS_SPILL_RE.search(address):
+                confidence["address"] = 0.3
+
+    return FastPathResult(fields=fields, field_confidence=confidence)
@@ -0,0 +1,140 @@
+"""Shared, pooled HTTP clients for upstream AI/STT providers.
+
+Each provider gets one long-lived ``httpx.AsyncClient`` so TCP/TLS
+connections are reused across intakes (keep-alive) and the CA bundle is
+loaded once. Pool limits are per client, which makes them per upstream host.
+"""
+from __future__ import annotations
+
+import importlib.util
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import certifi
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ProviderClientSettings:
+    """Connection pool configuration shared by all provider clients."""
+
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+
+    @classmethod
+    def from_env(cls) -> "ProviderClientSettings":
+        return cls(
+            max_connections=int(os.getenv("PROVIDER_HTTP_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("PROVIDER_HTTP_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("PROVIDER_HTTP_KEEPALIVE_EXPIRY", "30")),
+            http2=os.getenv("PROVIDER_HTTP2", "false").lower() == "true",
+        )
+
+
+class _InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper that tracks in-flight requests for pool sizing."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport) -> None:
+        self.inner = inner
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        self.total_requests += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await self.inner.handle_async_request(request)
+        finally:
+            self.in_flight -= 1
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+    def connection_counts(self) -> tuple[int, int]:
+        """Return ``(open, idle)`` connection counts when the pool exposes them."""
+        pool = getattr(self.inner, "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for conn in connections if getattr(conn, "is_idle", lambda: False)())
+        return len(connections), idle
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class ProviderClients:
+    """Lazily created, shared ``httpx.AsyncClient`` per provider name."""
+
+    def __init__(
+        self,
+        settings: ProviderClientSettings | None = None,
+        transport_factory: Callable[[ProviderClientSettings], httpx.AsyncBaseTransport] | None = None,
+    ) -> None:
+        self.settings = settings or ProviderClientSettings.from_env()
+        self._transport_factory = transport_factory or self._default_transport
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._transports: dict[str, _InstrumentedTransport] = {}
+
+    @staticmethod
+    def _default_transport(settings: ProviderClientSettings) -> httpx.AsyncBaseTransport:
+        http2 = settings.http2
+        if http2 and not _http2_available():
+            logger.warning(
+                "http_clients.http2_unavailable",
+                extra={"event": "http_clients.http2_unavailable"},
+            )
+            http2 = False
+        return httpx.AsyncHTTPTransport(
+            verify=certifi.where(),
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry,
+            ),
+        )
+
+    def get(self, provider: str) -> httpx.AsyncClient:
+        """Return the shared client for ``provider``, creating it on first use."""
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            transport = _InstrumentedTransport(self._transport_factory(self.settings))
+            client = httpx.AsyncClient(transport=transport)
+            self._clients[provider] = client
+            self._transports[provider] = transport
+        return client
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Pool utilization per provider, used to size ``max_connections``."""
+        result: dict[str, dict[str, Any]] = {}
+        for provider, transport in self._transports.items():
+            open_connections, idle_connections = transport.connection_counts()
+            result[provider] = {
+                "max_connections": self.settings.max_connections,
+                "in_flight": transport.in_flight,
+                "peak_in_flight": transport.peak_in_flight,
+                "total_requests": transport.total_requests,
+                "open_connections": open_connections,
+                "idle_connections": idle_connections,
+                "utilization": transport.in_flight / self.settings.max_connections,
+            }
+        return result
+
+    async def aclose(self) -> None:
+        """Close every client; safe to call more than once."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        self._transports.clear()
+        for client in clients:
+            await client.aclose()
+
+
+provider_clients = ProviderClients()
@@ -0,0 +1,368 @@
+"""Voice intake pipeline: audio → STT → field extraction → validation → persistence.
+
+The pipeline is shared by the synchronous ``/voice-input`` route and the
+background intake job workers. Failures are raised as
+:class:`~app.exceptions.IntakeError` carrying the HTTP status and structured
+detail the route returns.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import time
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from . import crud, db_writer, schemas
+from .ai_parser import parse_patient_details
+from .audio_preprocess import AUDIO_PREPROCESS_DEFAULT, preprocess_upload
+from .db_writer import DB_WRITER_ENABLED
+from .duplicates import DUPLICATE_CHECK_ENABLED, find_duplicates
+from .exceptions import (
+    CircuitOpenError,
+    DeadlineExceededError,
+    IntakeError,
+    NoSpeechDetectedError,
+    ProviderError,
+    UploadTooLargeError,
+)
+from .fast_extractor import FAST_PATH_ENABLED, REQUIRED_FIELDS, extract_fast, fast_path_stats
+from .metrics import INTAKE_SECONDS, INTAKES_IN_FLIGHT, stage_timer
+from .resilience import INTAKE_DEADLINE_SECONDS, check_deadline, deadline_scope
+from .voice_activity import VAD_ENABLED, VAD_MIN_SPEECH_SECONDS, measure_upload
+from .voice_agent import transcribe_audio_data
+
+logger = logging.getLogger(__name__)
+
+
+def clean_and_validate(parsed: dict) -> dict:
+    """Normalize and minimally validate parsed patient data."""
+    for k, v in parsed.items():
+        if isinstance(v, str):
+            parsed[k] = v.strip() or None
+
+    if parsed.get("phone_number"):
+        parsed["phone_number"] = re.sub(r"\D", "", parsed["phone_number"])
+
+    if parsed.get("phone_number") and len(parsed["phone_number"]) < 10:
+        parsed["phone_number"] = None
+
+    return parsed
+
+
+async def extract_patient_fields(transcribed_text: str) -> dict:
+    """Recover patient fields, trying the local rule-based path before Gemini."""
+    if FAST_PATH_ENABLED:
+        result = extract_fast(transcribed_text)
+        if result.is_confident():
+            candidate = clean_and_validate(dict(result.fields))
+            if all(candidate.get(field) for field in REQUIRED_FIELDS):
+                fast_path_stats.record(hit=True)
+                logger.info(
+                    "voice_input.parsing.fast_path",
+                    extra={
+                        "event": "voice_input.parsing.fast_path",
+                        "stage": "parsing",
+                        "confidence": result.confidence,
+                    },
+                )
+                return candidate
+        fast_path_stats.record(hit=False)
+    return await parse_patient_details(transcribed_text)
+
+
+def _patient_in(parsed: dict) -> schemas.PatientCreate:
+    return schemas.PatientCreate(
+        first_name=parsed["first_name"],
+        last_name=parsed["last_name"],
+        phone_number=parsed["phone_number"],
+        address=parsed["address"],
+    )
+
+
+def _log_persisted(patient) -> None:
+    event = (
+        "voice_input.persistence.new_patient"
+        if patient.new_patient
+        else "voice_input.persistence.returning_patient"
+    )
+    logger.info(
+        event,
+        extra={"event": event, "stage": "persistence", "patient_id": patient.id},
+    )
+
+
+def persist_intake(db: Session, parsed: dict):
+    """Upsert a validated intake on ``db``, flagging returning patients by phone."""
+    with stage_timer("persistence"):
+        patient = crud.upsert_patient(db, _patient_in(parsed), update_details=False)
+        crud.commit_without_expiry(db)
+    _log_persisted(patient)
+    return patient
+
+
+async def save_intake(db: Session, parsed: dict):
+    """Persist a validated intake, through the group-commit writer when enabled.
+
+    A new patient is checked against the duplicate-candidate index and the
+    matches are attached as ``possible_duplicates``.
+    """
+    if not DB_WRITER_ENABLED:
+        # SQLite calls are blocking; keep them off the event loop.
+        patient = await run_in_threadpool(persist_intake, db, parsed)
+    else:
+        with stage_timer("persistence"):
+            patient = await db_writer.patient_writer.upsert(_patient_in(parsed), update_details=False)
+        _log_persisted(patient)
+    if patient.new_patient and DUPLICATE_CHECK_ENABLED:
+        with stage_timer("dedup"):
+            candidates = await run_in_threadpool(find_duplicates, db, patient)
+        if candidates:
+            patient.possible_duplicates = [candidate.to_dict() for candidate in candidates]
+            logger.info(
+                "voice_input.dedup.candidates",
+                extra={
+                    "event": "voice_input.dedup.candidates",
+                    "stage": "dedup",
+                    "patient_id": patient.id,
+                    "candidate_ids": [candidate.patient.id for candidate in candidates],
+                },
+            )
+    return patient
+
+
+async def _check_voice_activity(file: UploadFile) -> None:
+    """Reject recordings with less speech than ``VAD_MIN_SPEECH_SECONDS``."""
+    activity = await measure_upload(file)
+    if activity is None:
+        # Format we cannot decode locally; let the STT provider decide.
+        return
+    logger.info(
+        "voice_input.vad.measured",
+        extra={
+            "event": "voice_input.vad.measured",
+            "stage": "vad",
+            "speech_seconds": activity.speech_seconds,
+            "total_seconds": activity.total_seconds,
+        },
+    )
+    if activity.speech_seconds < VAD_MIN_SPEECH_SECONDS:
+        logger.warning(
+            "voice_input.vad.rejected",
+            extra={"event": "voice_input.vad.rejected", "stage": "vad"},
+        )
+        raise NoSpeechDetectedError(
+            speech_seconds=activity.speech_seconds,
+            min_speech_seconds=VAD_MIN_SPEECH_SECONDS,
+        )
+
+
+def _to_intake_error(exc: Exception) -> IntakeError:
+    """Map a pipeline failure onto the HTTP status/detail the API reports."""
+    if isinstance(exc, IntakeError):
+        return exc
+    if isinstance(exc, NoSpeechDetectedError):
+        return IntakeError(
+            status_code=422,
+            detail={
+                "error": "no_speech_detected",
+                "speech_seconds": round(exc.speech_seconds, 3),
+                "min_speech_seconds": exc.min_speech_seconds,
+            },
+        )
+    if isinstance(exc, UploadTooLargeError):
+        logger.warning(
+            "voice_input.upload_too_large",
+            extra={
+                "event": "voice_input.upload_too_large",
+                "stage": "transcription",
+                "limit_bytes": exc.limit_bytes,
+            },
+        )
+        return IntakeError(
+            status_code=413,
+            detail={"error": "upload_too_large", "limit_bytes": exc.limit_bytes},
+        )
+    if isinstance(exc, DeadlineExceededError):
+        logger.error(
+            "voice_input.deadline_exceeded",
+            extra={
+                "event": "voice_input.deadline_exceeded",
+                "stage": exc.stage,
+                "budget_seconds": exc.budget_seconds,
+            },
+        )
+        return IntakeError(
+            status_code=504,
+            detail={
+                "error": "deadline_exceeded",
+                "stage": exc.stage,
+                "budget_seconds": exc.budget_seconds,
+            },
+        )
+    if isinstance(exc, CircuitOpenError):
+        logger.error(
+            "voice_input.provider_unavailable",
+            extra={"event": "voice_input.provider_unavailable", "provider": exc.provider},
+        )
+        return IntakeError(
+            status_code=503,
+            detail={
+                "error": "provider_unavailable",
+                "provider": exc.provider,
+                "retry_after": round(exc.retry_after, 1),
+            },
+        )
+    if isinstance(exc, ProviderError):
+        log_fields = {"event": "voice_input.provider_error", "stage": "external"}
+        log_fields.update(exc.to_log_fields())
+        logger.error("Provider failure in voice pipeline", extra=log_fields)
+        return IntakeError(
+            status_code=502,
+            detail={
+                "error": "provider_error",
+                "provider": exc.provider,
+                "message": exc.message,
+            },
+        )
+    logger.error(
+        "Unexpected failure in voice pipeline",
+        exc_info=exc,
+        extra={"event": "voice_input.error"},
+    )
+    return IntakeError(status_code=500, detail="Internal processing error")
+
+
+async def parse_transcript(transcribed_text: str) -> dict:
+    """Extract, normalize and check the required fields of a transcript.
+
+    Returns the cleaned fields or raises :class:`IntakeError` (``422`` when
+    fields are missing, ``502`` on provider failure).
+    """
+    try:
+        logger.info(
+            "voice_input.parsing.start",
+            extra={"event": "voice_input.parsing.start", "stage": "parsing"},
+        )
+        check_deadline("parsing")
+        with stage_timer("parsing"):
+            parsed = await extract_patient_fields(transcribed_text)
+        logger.info(
+            "voice_input.parsing.success",
+            extra={
+                "event": "voice_input.parsing.success",
+                "stage": "parsing",
+                "fields": sorted(parsed.keys()),
+            },
+        )
+
+        with stage_timer("validation"):
+            parsed = clean_and_validate(parsed)
+        logger.info(
+            "voice_input.validation.success",
+            extra={"event": "voice_input.validation.success", "stage": "validation"},
+        )
+    except Exception as exc:
+        raise _to_intake_error(exc) from exc
+
+    missing_fields = [field for field in REQUIRED_FIELDS if not parsed.get(field)]
+    if missing_fields:
+        logger.warning(
+            "voice_input.validation.incomplete",
+            extra={
+                "event": "voice_input.validation.incomplete",
+                "stage": "validation",
+                "missing_fields": missing_fields,
+            },
+        )
+        raise IntakeError(
+            status_code=422,
+            detail={
+                "error": "incomplete_patient_data",
+                "missing_fields": missing_fields,
+            },
+        )
+    return parsed
+
+
+async def process_voice_intake(file: UploadFile, db: Session, *, preprocess: bool | None = None):
+    """Run the full intake pipeline for one uploaded recording.
+
+    ``preprocess`` toggles local audio preprocessing for this call; ``None``
+    uses the ``AUDIO_PREPROCESS_DEFAULT`` setting. All stages share one
+    ``INTAKE_DEADLINE_SECONDS`` budget. Returns the persisted patient row or
+    raises :class:`IntakeError`.
+    """
+    started = time.perf_counter()
+    outcome = "success"
+    try:
+        with deadline_scope(INTAKE_DEADLINE_SECONDS), INTAKES_IN_FLIGHT.track_in_progress():
+            return await _run_voice_intake(file, db, preprocess=preprocess)
+    except IntakeError as exc:
+        outcome = str(exc.status_code)
+        raise
+    finally:
+        INTAKE_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+
+
+async def _run_voice_intake(file: UploadFile, db: Session, *, preprocess: bool | None):
+    logger.info(
+        "voice_input.received",
+        extra={
+            "event": "voice_input.received",
+            "upload_filename": file.filename,
+            "content_type": file.content_type,
+        },
+    )
+    prepared = None
+    try:
+        if VAD_ENABLED:
+            with stage_timer("vad"):
+                await _check_voice_activity(file)
+
+        if AUDIO_PREPROCESS_DEFAULT if preprocess is None else preprocess:
+            check_deadline("preprocess")
+            with stage_timer("preprocess"):
+                prepared = await preprocess_upload(file)
+            logger.info(
+                "voice_input.preprocess.success",
+                extra={
+                    "event": "voice_input.preprocess.success",
+                    "stage": "preprocess",
+                    "preprocessor": prepared.stage,
+                    "bytes_in": prepared.bytes_in,
+                    "bytes_out": prepared.bytes_out,
+                },
+            )
+            file = prepared.file
+
+        check_deadline("transcription")
+        logger.info(
+            "voice_input.transcription.start",
+            extra={"event": "voice_input.transcription.start", "stage": "transcription"},
+        )
+        with stage_timer("transcription"):
+            transcribed_text = await transcribe_audio_data(file)
+        logger.info(
+            "voice_input.transcription.success",
+            extra={
+                "event": "voice_input.transcription.success",
+                "stage": "transcription",
+                "char_length": len(transcribed_text),
+            },
+        )
+    except Exception as exc:
+        raise _to_intake_error(exc) from exc
+    finally:
+        if prepared is not None:
+            await prepared.aclose()
+
+    parsed = await parse_transcript(transcribed_text)
+    try:
+        check_deadline("persistence")
+    except DeadlineExceededError as exc:
+        raise _to_intake_error(exc) from exc
+
+    return await save_intake(db, parsed)
@@ -0,0 +1,297 @@
+"""Durable, SQLite-backed queue for asynchronous voice intakes.
+
+``POST /voice-input/jobs`` stores the upload on disk, writes an
+``intake_jobs`` row and returns immediately. A small pool of asyncio workers
+claims queued rows and runs the regular intake pipeline. Provider failures
+are retried with exponential backoff; validation failures are final. Jobs
+left ``running`` by a crashed process are re-queued on startup.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers
+
+from . import models
+from .audio_upload import MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE
+from .database import SessionLocal
+from .exceptions import IntakeError
+from .intake import process_voice_intake
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = frozenset({"succeeded", "failed"})
+
+
+def _utcnow() -> datetime:
+    # SQLite stores naive timestamps; keep comparisons naive UTC throughout.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class IntakeJobQueue:
+    """Enqueue intake uploads and process them with background workers."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        storage_dir: str | os.PathLike[str],
+        max_attempts: int = 5,
+        base_delay: float = 2.0,
+        max_delay: float = 300.0,
+        poll_interval: float = 0.5,
+    ) -> None:
+        self.session_factory = session_factory
+        self.storage_dir = Path(storage_dir)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self._wake = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+        self._stopping = False
+
+    # -- producer side -----------------------------------------------------
+
+    def enqueue(self, db: Session, file: UploadFile) -> models.IntakeJobTable:
+        """Persist ``file`` and create a queued job row (blocking; run in a thread).
+
+        Raises :class:`IntakeError` (``413``) when the upload exceeds
+        ``MAX_UPLOAD_BYTES``; nothing is left on disk in that case.
+        """
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        audio_path = self.storage_dir / f"{job_id}.upload"
+        file.file.seek(0)
+        written = 0
+        with open(audio_path, "wb") as out:
+            while chunk := file.file.read(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > MAX_UPLOAD_BYTES:
+                    break
+                out.write(chunk)
+        if written > MAX_UPLOAD_BYTES:
+            audio_path.unlink(missing_ok=True)
+            raise IntakeError(
+                status_code=413,
+                detail={"error": "upload_too_large", "limit_bytes": MAX_UPLOAD_BYTES},
+            )
+
+        job = models.IntakeJobTable(
+            id=job_id,
+            status="queued",
+            audio_path=str(audio_path),
+            filename=file.filename,
+            content_type=file.content_type,
+            attempts=0,
+            next_attempt_at=_utcnow(),
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._wake.set()
+        logger.info(
+            "intake_jobs.enqueued",
+            extra={"event": "intake_jobs.enqueued", "job_id": job_id},
+        )
+        return job
+
+    def get(self, db: Session, job_id: str) -> models.IntakeJobTable | None:
+        db.expire_all()
+        return db.get(models.IntakeJobTable, job_id)
+
+    async def wait_for(
+        self,
+        db: Session,
+        job_id: str,
+        *,
+        timeout: float = 0.0,
+        interval: float = 0.25,
+    ) -> models.IntakeJobTable | None:
+        """Long-poll helper: return once the job is terminal or ``timeout`` elapses."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            job = await run_in_threadpool(self.get, db, job_id)
+            if job is None or job.status in TERMINAL_STATUSES or loop.time() >= deadline:
+                return job
+            await asyncio.sleep(min(interval, max(deadline - loop.time(), 0)))
+
+    # -- worker side -------------------------------------------------------
+
+    async def start(self, workers: int) -> None:
+        """Re-queue interrupted jobs and spawn ``workers`` worker tasks."""
+        self._stopping = False
+        self._wake = asyncio.Event()
+        recovered = await run_in_threadpool(self._recover_interrupted)
+        if recovered:
+            logger.warning(
+                "intake_jobs.recovered",
+                extra={"event": "intake_jobs.recovered", "count": recovered},
+            )
+        for _ in range(workers):
+            self._workers.append(asyncio.create_task(self._worker_loop()))
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self._wake.set()
+        workers, self._workers = self._workers, []
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def run_once(self) -> bool:
+        """Claim and process one due job. Returns False when the queue is idle."""
+        job_id = await run_in_threadpool(self._claim_next)
+        if job_id is None:
+            return False
+        await self._process(job_id)
+        return True
+
+    async def _worker_loop(self) -> None:
+        while not self._stopping:
+            try:
+                processed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # pragma: no cover - defensive
+                logger.exception("Intake job worker failure", extra={"event": "intake_jobs.worker_error"})
+                processed = False
+            if not processed:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _recover_interrupted(self) -> int:
+        with self.session_factory() as db:
+            count = (
+                db.query(models.IntakeJobTable)
+                .filter(models.IntakeJobTable.status == "running")
+                .update({"status": "queued", "next_attempt_at": _utcnow()}, synchronize_session=False)
+            )
+            db.commit()
+            return count
+
+    def _claim_next(self) -> str | None:
+        with self.session_factory() as db:
+            now = _utcnow()
+            candidate = (
+                db.query(models.IntakeJobTable.id)
+                .filter(
+                    models.IntakeJobTable.status == "queued",
+                    models.IntakeJobTable.next_attempt_at <= now,
+                )
+                .order_by(models.IntakeJobTable.next_attempt_at, models.IntakeJobTable.created_at)
+                .first()
+            )
+            if candidate is None:
+                return None
+            # Conditional update so two workers never claim the same job.
+            claimed = (
+                db.query(models.IntakeJobTable)
+                .filter(
+                    models.IntakeJobTable.id == candidate.id,
+                    models.IntakeJobTable.status == "queued",
+                )
+                .update(
+                    {
+                        "status": "running",
+                        "attempts": models.IntakeJobTable.attempts + 1,
+                        "updated_at": now,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            return candidate.id if claimed else None
+
+    async def _process(self, job_id: str) -> None:
+        db = self.session_factory()
+        try:
+            job = db.get(models.IntakeJobTable, job_id)
+            try:
+                with open(job.audio_path, "rb") as audio:
+                    upload = UploadFile(
+                        file=audio,
+                        filename=job.filename,
+                        headers=Headers({"content-type": job.content_type or "audio/webm"}),
+                    )
+                    patient = await process_voice_intake(upload, db)
+            except IntakeError as exc:
+                db.rollback()
+                await run_in_threadpool(self._record_failure, db, job, exc.detail, exc.retryable)
+                return
+            except Exception as exc:
+                db.rollback()
+                logger.exception("Intake job crashed", extra={"event": "intake_jobs.error", "job_id": job_id})
+                await run_in_threadpool(
+                    self._record_failure,
+                    db,
+                    job,
+                    {"error": "internal_error", "message": repr(exc)},
+                    True,
+                )
+                return
+
+            await run_in_threadpool(self._record_success, db, job, patient.id)
+        finally:
+            db.close()
+
+    def _record_success(self, db: Session, job: models.IntakeJobTable, patient_id: int) -> None:
+        job.status = "succeeded"
+        job.patient_id = patient_id
+        job.error = None
+        db.commit()
+        _delete_audio(job)
+        logger.info(
+            "intake_jobs.succeeded",
+            extra={"event": "intake_jobs.succeeded", "job_id": job.id, "patient_id": patient_id},
+        )
+
+    def _record_failure(self, db: Session, job: models.IntakeJobTable, detail, retryable: bool) -> None:
+        job.error = detail
+        if retryable and job.attempts < self.max_attempts:
+            delay = min(self.base_delay * (2 ** (job.attempts - 1)), self.max_delay)
+            job.status = "queued"
+            job.next_attempt_at = _utcnow() + timedelta(seconds=delay)
+            event = "intake_jobs.retry_scheduled"
+        else:
+            job.status = "failed"
+            event = "intake_jobs.failed"
+        db.commit()
+        if job.status in TERMINAL_STATUSES:
+            _delete_audio(job)
+        logger.warning(
+            event,
+            extra={"event": event, "job_id": job.id, "attempts": job.attempts},
+        )
+
+
+def _delete_audio(job: models.IntakeJobTable) -> None:
+    """Drop a finished job's stored upload; the row keeps the outcome."""
+    Path(job.audio_path).unlink(missing_ok=True)
+
+
+def _default_queue() -> IntakeJobQueue:
+    return IntakeJobQueue(
+        SessionLocal,
+        storage_dir=os.getenv("INTAKE_JOB_STORAGE_DIR", "./intake_uploads"),
+        max_attempts=int(os.getenv("INTAKE_JOB_MAX_ATTEMPTS", "5")),
+        base_delay=float(os.getenv("INTAKE_JOB_RETRY_BASE_SECONDS", "2")),
+    )
+
+
+INTAKE_JOB_WORKERS = int(os.getenv("INTAKE_JOB_WORKERS", "2"))
+
+intake_jobs = _default_queue()
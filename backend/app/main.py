@@ -2,18 +2,33 @@ from __future__ import annotations
 
 import logging
 import os
-import re
 from typing import List
 
-from fastapi import Depends, FastAPI, File, HTTPException, UploadFile
+from fastapi import Depends, FastAPI, File, HTTPException, Query, Request, Response, UploadFile, WebSocket
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
-from . import crud, schemas
-from .ai_parser import parse_patient_details
+from . import crud, db_writer, schemas
+from .ai_parser import extraction_batcher, extraction_memo
+from .audio_preprocess import preprocess_stats
+from .batch_intake import expand_uploads, stream_batch
+from .bulk_import import detect_format, import_patients
 from .database import get_db, init_db
-from .exceptions import ProviderError
-from .voice_agent import transcribe_audio_data
+from .db_writer import DB_WRITER_ENABLED
+from .exceptions import IntakeError
+from .export import EXPORT_MEDIA_TYPES, stream_export
+from .fast_extractor import fast_path_stats
+from .http_clients import provider_clients
+from .intake import clean_and_validate, process_voice_intake  # noqa: F401 - re-exported
+from .jobs import INTAKE_JOB_WORKERS, intake_jobs
+from .metrics import PROMETHEUS_CONTENT_TYPE, registry as metrics_registry
+from .patient_cache import patient_cache, serialize_patient, serialize_patients
+from .realtime import run_realtime_intake
+from .resilience import circuit_breakers
+from .stt_providers import stt_router
+from .transcript_cache import transcript_cache
 
 
 def _configure_logging() -> None:
@@ -51,166 +66,302 @@ app.add_middleware(
     allow_credentials=SETTINGS["allow_credentials"],
     allow_methods=[method.strip() or "*" for method in SETTINGS["allow_methods"]],
     allow_headers=[header.strip() or "*" for header in SETTINGS["allow_headers"]],
+    expose_headers=["X-Next-Cursor", "X-Change-Seq", "ETag"],
 )
 
 
-def clean_and_validate(parsed: dict) -> dict:
-    """Normalize and minimally validate parsed patient data."""
-    for k, v in parsed.items():
-        if isinstance(v, str):
-            parsed[k] = v.strip() or None
+@app.on_event("startup")
+def startup_event() -> None:
+    """FastAPI startup hook that initializes the database schema."""
+    init_db()
 
-    if parsed.get("phone_number"):
-        parsed["phone_number"] = re.sub(r"\D", "", parsed["phone_number"])
 
-    if parsed.get("phone_number") and len(parsed["phone_number"]) < 10:
-        parsed["phone_number"] = None
+@app.on_event("startup")
+async def start_intake_workers() -> None:
+    """Resume interrupted intake jobs and start the background worker pool."""
+    await intake_jobs.start(workers=INTAKE_JOB_WORKERS)
 
-    return parsed
 
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    """FastAPI shutdown hook that stops workers and closes provider connections."""
+    await intake_jobs.stop()
+    await run_in_threadpool(db_writer.patient_writer.stop)
+    await provider_clients.aclose()
 
-@app.on_event("startup")
-def startup_event() -> None:
-    """FastAPI startup hook that initializes the database schema."""
-    init_db()
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of pipeline, provider and database metrics."""
+    if not metrics_registry.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
-@app.get("/patients", response_model=List[schemas.Patient])
-def get_patients(db: Session = Depends(get_db)):
-    """List all patients ordered by newest first."""
-    return crud.list_patients(db)
 
+@app.get("/diagnostics/http-clients")
+def http_client_stats():
+    """Connection pool utilization for each upstream provider client."""
+    return provider_clients.stats()
 
-@app.post("/patients", response_model=schemas.Patient, status_code=201)
-def add_patient(patient: schemas.PatientCreate, db: Session = Depends(get_db)):
-    """Create a patient record from a structured JSON payload."""
-    return crud.create_patient(db, patient)
 
+@app.get("/diagnostics/circuit-breakers")
+def circuit_breaker_stats():
+    """Per-provider circuit breaker state and failure counters."""
+    return circuit_breakers.stats()
 
-@app.get("/patients/{patient_id}", response_model=schemas.Patient)
-def get_patient(patient_id: int, db: Session = Depends(get_db)):
-    """Retrieve a single patient by ID."""
-    patient = crud.get_patient_by_id(db, patient_id)
-    if not patient:
-        raise HTTPException(status_code=404, detail="Patient not found")
-    return patient
 
+@app.get("/diagnostics/stt")
+def stt_diagnostics():
+    """STT routing: hedge delay, hedge/failover counters and rolling latency percentiles."""
+    return stt_router.stats()
 
-@app.post("/voice-input", response_model=schemas.Patient, status_code=201)
-def voice_input(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """Voice intake endpoint: audio → STT → LLM parsing → persistence."""
-    logger.info(
-        "voice_input.received",
-        extra={
-            "event": "voice_input.received",
-            "filename": file.filename,
-            "content_type": file.content_type,
-        },
-    )
-    try:
-        logger.info(
-            "voice_input.transcription.start",
-            extra={"event": "voice_input.transcription.start", "stage": "transcription"},
-        )
-        transcribed_text = transcribe_audio_data(file)
-        logger.info(
-            "voice_input.transcription.success",
-            extra={
-                "event": "voice_input.transcription.success",
-                "stage": "transcription",
-                "char_length": len(transcribed_text),
-            },
-        )
 
-        logger.info(
-            "voice_input.parsing.start",
-            extra={"event": "voice_input.parsing.start", "stage": "parsing"},
-        )
-        parsed = parse_patient_details(transcribed_text)
-        logger.info(
-            "voice_input.parsing.success",
-            extra={
-                "event": "voice_input.parsing.success",
-                "stage": "parsing",
-                "fields": sorted(parsed.keys()),
-            },
-        )
+@app.get("/diagnostics/db-writer")
+def db_writer_stats():
+    """Group-commit writer queue depth and batch sizes."""
+    return db_writer.patient_writer.stats()
+
+
+@app.get("/diagnostics/transcript-cache")
+def transcript_cache_stats():
+    """Hit/miss/coalescing counters for the audio transcript cache."""
+    return transcript_cache.stats()
+
+
+@app.get("/diagnostics/extraction-cache")
+def extraction_cache_stats():
+    """Memo hit/miss and micro-batching counters for LLM extraction."""
+    return {**extraction_memo.stats(), "batching": extraction_batcher.stats()}
+
+
+@app.get("/diagnostics/patient-cache")
+def patient_cache_stats():
+    """Hit/miss, invalidation and 304 counters for cached patient reads."""
+    return patient_cache.stats()
+
+
+@app.get("/diagnostics/audio-preprocess")
+def audio_preprocess_diagnostics():
+    """Bytes in/out of the optional audio preprocessing stage."""
+    return preprocess_stats.snapshot()
+
+
+@app.get("/diagnostics/fast-path")
+def fast_path_diagnostics():
+    """How often the rule-based extractor let an intake skip Gemini."""
+    return fast_path_stats.snapshot()
 
-        parsed = clean_and_validate(parsed)
-        logger.info(
-            "voice_input.validation.success",
-            extra={"event": "voice_input.validation.success", "stage": "validation"},
-        )
 
-    except ProviderError as exc:
-        log_fields = {"event": "voice_input.provider_error", "stage": "external"}
-        log_fields.update(exc.to_log_fields())
-        logger.error("Provider failure in voice pipeline", extra=log_fields)
+@app.get("/patients", response_model=List[schemas.Patient])
+def get_patients(
+    request: Request,
+    limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+    after: str | None = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    db: Session = Depends(get_db),
+):
+    """List one page of patients ordered by newest first.
+
+    When more rows are available the cursor for the next page is returned in
+    the ``X-Next-Cursor`` response header. ``X-Change-Seq`` is where to start
+    ``GET /patients/changes`` from to keep the list up to date. Pages are served from the patient
+    cache with an ``ETag``; ``If-None-Match`` yields ``304 Not Modified``.
+    """
+
+    def load():
+        # Read the sequence first: a change landing in between is sent again
+        # by the next delta sync rather than missed.
+        headers = {"X-Change-Seq": str(crud.current_change_seq(db))}
+        patients, next_cursor = crud.list_patients_page(db, limit=limit, cursor=after)
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        return serialize_patients(patients, headers)
+
+    try:
+        cached = patient_cache.get_or_load(("page", limit, after), load)
+    except ValueError as exc:
         raise HTTPException(
-            status_code=502,
-            detail={
-                "error": "provider_error",
-                "provider": exc.provider,
-                "message": exc.message,
-            },
+            status_code=400,
+            detail={"error": "invalid_cursor", "message": str(exc)},
         ) from exc
-    except Exception as exc:  # pragma: no cover - defensive
-        logger.exception("Unexpected failure in voice pipeline", extra={"event": "voice_input.error"})
-        raise HTTPException(status_code=500, detail="Internal processing error") from exc
-
-    first_name = parsed.get("first_name")
-    last_name = parsed.get("last_name")
-    phone = parsed.get("phone_number")
-    address = parsed.get("address")
-
-    required_fields = ["first_name", "last_name", "phone_number", "address"]
-    missing_fields = [field for field in required_fields if not parsed.get(field)]
-    if missing_fields:
-        logger.warning(
-            "voice_input.validation.incomplete",
-            extra={
-                "event": "voice_input.validation.incomplete",
-                "stage": "validation",
-                "missing_fields": missing_fields,
+    return patient_cache.respond(request, cached)
+
+
+@app.post("/patients", response_model=schemas.Patient, status_code=201)
+async def add_patient(patient: schemas.PatientCreate, db: Session = Depends(get_db)):
+    """Create a patient record from a structured JSON payload."""
+    if DB_WRITER_ENABLED:
+        return await db_writer.patient_writer.upsert(patient)
+    return await run_in_threadpool(crud.create_patient, db, patient)
+
+
+@app.get("/patients/search", response_model=List[schemas.Patient])
+def search_patients(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Name/address words or a phone prefix"),
+    limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+    after: str | None = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    db: Session = Depends(get_db),
+):
+    """Search patients: ranked full-text match on names/address, or phone-number prefix."""
+    try:
+        patients, next_cursor = crud.search_patients_page(db, q, limit=limit, cursor=after)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": "invalid_cursor", "message": str(exc)},
+        ) from exc
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return patients
+
+
+@app.get("/patients/changes", response_model=schemas.PatientChanges)
+def patient_changes(
+    since: int = Query(0, ge=0, description="next_since (or X-Change-Seq) from the previous sync"),
+    limit: int = Query(crud.MAX_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """Delta sync: patients inserted or updated since change sequence ``since``."""
+    patients, next_since, has_more = crud.list_changes(db, since=since, limit=limit)
+    return {"patients": patients, "next_since": next_since, "has_more": has_more}
+
+
+@app.post("/patients/bulk")
+async def bulk_import_patients(
+    request: Request,
+    import_format: str | None = Query(None, alias="format", pattern="^(ndjson|csv)$"),
+    db: Session = Depends(get_db),
+):
+    """Upsert patients from a streamed CSV or NDJSON body and report rejected rows.
+
+    The format comes from ``?format=`` or, failing that, the ``Content-Type``.
+    A fatal error after some rows were committed returns ``207`` with the
+    partial report; one before anything was written returns ``400``, or
+    ``500`` when the database write failed.
+    """
+    import_format = import_format or detect_format(request.headers.get("content-type"))
+    if import_format is None:
+        raise HTTPException(
+            status_code=415,
+            detail={
+                "error": "unsupported_media_type",
+                "message": "Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson",
             },
         )
+    report = await import_patients(request.stream(), import_format, db)
+    if report.write_failed and not report.imported:
         raise HTTPException(
-            status_code=422,
+            status_code=500,
             detail={
-                "error": "incomplete_patient_data",
-                "missing_fields": missing_fields,
+                "error": "import_write_failed",
+                "message": report.fatal_error,
+                "report": report.to_dict(),
             },
         )
-
-    existing_patient = crud.get_patient_by_phone(db, phone)
-    if existing_patient:
-        existing_patient.new_patient = False
-        db.commit()
-        db.refresh(existing_patient)
-        logger.info(
-            "voice_input.persistence.returning_patient",
-            extra={
-                "event": "voice_input.persistence.returning_patient",
-                "stage": "persistence",
-                "patient_id": existing_patient.id,
+    if report.fatal_error is not None and not report.imported:
+        # Nothing was written, so the client can fix the file and retry as is.
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "invalid_import",
+                "message": report.fatal_error,
+                "report": report.to_dict(),
             },
         )
-        return existing_patient
-
-    patient_in = schemas.PatientCreate(
-        first_name=first_name,
-        last_name=last_name,
-        phone_number=phone,
-        address=address,
+    if report.fatal_error is not None:
+        # Rows before ``aborted_at_line`` are committed; say so instead of failing.
+        return JSONResponse(report.to_dict(), status_code=207)
+    return report.to_dict()
+
+
+@app.get("/patients/export")
+def export_patients(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    db: Session = Depends(get_db),
+):
+    """Stream every patient as NDJSON or CSV without buffering the table."""
+    rows = crud.iter_patient_rows(db)
+    return StreamingResponse(
+        stream_export(rows, crud.EXPORT_COLUMNS, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="patients.{export_format}"'},
     )
 
-    new_patient = crud.create_patient(db, patient_in)
-    logger.info(
-        "voice_input.persistence.new_patient",
-        extra={
-            "event": "voice_input.persistence.new_patient",
-            "stage": "persistence",
-            "patient_id": new_patient.id,
-        },
+
+@app.get("/patients/{patient_id}", response_model=schemas.Patient)
+def get_patient(patient_id: int, request: Request, db: Session = Depends(get_db)):
+    """Retrieve a single patient by ID (cached, with ``ETag``/``304`` support)."""
+
+    def load():
+        patient = crud.get_patient_by_id(db, patient_id)
+        return serialize_patient(patient) if patient else None
+
+    cached = patient_cache.get_or_load(("patient", patient_id), load)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return patient_cache.respond(request, cached)
+
+
+@app.post("/voice-input", response_model=schemas.IntakePatient, status_code=201)
+async def voice_input(
+    file: UploadFile = File(...),
+    preprocess: bool | None = Query(None, description="Downmix/resample/trim audio before STT"),
+    db: Session = Depends(get_db),
+):
+    """Voice intake endpoint: audio → STT → LLM parsing → persistence."""
+    try:
+        return await process_voice_intake(file, db, preprocess=preprocess)
+    except IntakeError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail) from exc
+
+
+@app.post("/voice-input/batch")
+async def voice_input_batch(
+    files: List[UploadFile] = File(...),
+    preprocess: bool | None = Query(None, description="Downmix/resample/trim audio before STT"),
+    db: Session = Depends(get_db),
+):
+    """Run many recordings (or zip archives of them) through intake, streaming NDJSON results."""
+    try:
+        items = await run_in_threadpool(expand_uploads, files)
+    except IntakeError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail) from exc
+    return StreamingResponse(
+        stream_batch(items, db, preprocess=preprocess),
+        media_type="application/x-ndjson",
     )
-    return new_patient
+
+
+@app.websocket("/ws/voice-input")
+async def realtime_voice_input(websocket: WebSocket, db: Session = Depends(get_db)):
+    """Streaming voice intake: audio chunks in, partial transcripts and the patient out."""
+    await websocket.accept()
+    await run_realtime_intake(websocket, db)
+
+
+@app.post("/voice-input/jobs", response_model=schemas.IntakeJob, status_code=202)
+async def enqueue_voice_input(
+    response: Response,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+):
+    """Store the recording and queue it for background processing."""
+    try:
+        job = await run_in_threadpool(intake_jobs.enqueue, db, file)
+    except IntakeError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail) from exc
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job
+
+
+@app.get("/jobs/{job_id}", response_model=schemas.IntakeJob)
+async def get_intake_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=30, description="Long-poll up to this many seconds"),
+    db: Session = Depends(get_db),
+):
+    """Return an intake job's status, its patient on success or its error."""
+    job = await intake_jobs.wait_for(db, job_id, timeout=wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,325 @@
+"""In-process Prometheus metrics for the voice pipeline.
+
+A deliberately small implementation of counters, gauges and histograms that
+renders the Prometheus text exposition format for ``GET /metrics``. Each
+update is a dict lookup, a ``bisect`` and a short lock, so instrumentation
+can stay enabled in production; set ``METRICS_ENABLED=false`` to turn every
+update into a no-op.
+"""
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120
+)
+DB_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Sequence[str]):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:  # pragma: no cover - overridden
+        raise NotImplementedError
+
+    def reset(self) -> None:  # pragma: no cover - overridden
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, *args) -> None:
+        super().__init__(*args)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Counter):
+    """Value that can go up and down, e.g. requests in flight."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    @contextmanager
+    def track_in_progress(self, **labels: str) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values (seconds, by convention)."""
+
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(*args)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last is +Inf)], sum, count.
+        self._values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def quantile(self, q: float, **labels: str) -> float | None:
+        """Estimate the ``q`` quantile by interpolating within buckets (like ``histogram_quantile``)."""
+        state = self._values.get(self._key(labels))
+        if not state or not state[2]:
+            return None
+        counts, _, total = state
+        rank = q * total
+        cumulative = 0
+        lower = 0.0
+        for index, bucket_count in enumerate(counts):
+            upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+            if bucket_count and cumulative + bucket_count >= rank:
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+            lower = upper
+        return self.buckets[-1]
+
+    def label_sets(self) -> list[dict[str, str]]:
+        return [dict(zip(self.labelnames, key)) for key in sorted(self._values)]
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        lines = self._header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together by ``GET /metrics``."""
+
+    def __init__(self, *, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._metrics: list[_Metric] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(self, name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        *,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(self, name, documentation, labelnames, buckets=buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        for metric in self._metrics:
+            metric.reset()
+
+
+registry = MetricsRegistry(enabled=METRICS_ENABLED)
+
+INTAKE_SECONDS = registry.histogram(
+    "voice_intake_seconds",
+    "End-to-end latency of a voice intake by outcome (success or HTTP status).",
+    ["outcome"],
+)
+INTAKES_IN_FLIGHT = registry.gauge(
+    "voice_intakes_in_flight",
+    "Voice intakes currently being processed.",
+)
+STAGE_SECONDS = registry.histogram(
+    "voice_intake_stage_seconds",
+    "Latency of each voice intake pipeline stage.",
+    ["stage", "outcome"],
+)
+PROVIDER_REQUEST_SECONDS = registry.histogram(
+    "provider_request_seconds",
+    "Latency of individual upstream provider attempts.",
+    ["provider", "operation", "outcome"],
+)
+PROVIDER_RETRIES = registry.counter(
+    "provider_retries_total",
+    "Provider attempts that failed transiently and were retried.",
+    ["provider", "operation"],
+)
+PROVIDER_CIRCUIT_REJECTIONS = registry.counter(
+    "provider_circuit_rejections_total",
+    "Provider calls rejected because the provider's circuit was open.",
+    ["provider"],
+)
+PROVIDER_IN_FLIGHT = registry.gauge(
+    "provider_requests_in_flight",
+    "Upstream provider attempts currently in flight.",
+    ["provider"],
+)
+DB_QUERY_SECONDS = registry.histogram(
+    "db_query_seconds",
+    "Latency of SQL statements by statement type.",
+    ["statement"],
+    buckets=DB_BUCKETS,
+)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Time one pipeline stage, labelling the outcome ``success`` or ``error``."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage, outcome=outcome)
+
+
+def _statement_type(statement: str) -> str:
+    head = statement.lstrip().split(None, 1)
+    return head[0].upper() if head else "UNKNOWN"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    starts = conn.info.get("metrics_query_start")
+    if starts:
+        DB_QUERY_SECONDS.observe(time.perf_counter() - starts.pop(), statement=_statement_type(statement))
+
+
+def _handle_error(context) -> None:
+    connection = context.connection
+    starts = connection.info.get("metrics_query_start") if connection is not None else None
+    if starts:
+        DB_QUERY_SECONDS.observe(time.perf_counter() - starts.pop(), statement="ERROR")
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Record every statement executed through ``engine`` in ``db_query_seconds``."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
@@ -1,12 +1,15 @@
-from sqlalchemy import Boolean, Column, Integer, String, UniqueConstraint
-from sqlalchemy.orm import declarative_base
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, Boolean, Column, DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
 
 """
 SQLAlchemy ORM models for the Dentist Voice Agent.
 
-Defines the single `patients` table used by the application.
+Defines the `patients` table, its `patient_match_keys` duplicate-candidate
+index and the `intake_jobs` queue table.
 """
 
 
@@ -21,6 +24,7 @@ class PatientTable(Base):
         phone_number (String): Normalized phone (digits-only) used for dedup (required, unique).
         address (String): Mailing/street address (required).
         new_patient (Boolean): True on first intake, set to False on subsequent visits.
+        change_seq (Integer): Database-wide sequence number of the row's last change (delta sync).
     """
     __tablename__ = "patients"
 
@@ -34,6 +38,62 @@ class PatientTable(Base):
     phone_number = Column(String, nullable=False)
     address = Column(String, nullable=False)
     new_patient = Column(Boolean, nullable=False, default=True)
+    change_seq = Column(Integer, nullable=False, default=0, index=True)
+
+    # Not a column: likely duplicates found by the intake path for a new patient.
+    possible_duplicates = ()
+
+
+class PatientMatchKeyTable(Base):
+    """
+    SQLAlchemy ORM model for the `patient_match_keys` table.
+
+    Fuzzy-match keys (phone deletion neighbourhood, phonetic name) per
+    patient; see ``app.duplicates``.
+
+    Columns:
+        key (String): Match key, e.g. ``p:514555010`` or ``n:A540:L120``.
+        patient_id (Integer): Patient the key was derived from.
+    """
+    __tablename__ = "patient_match_keys"
 
+    key = Column(String, primary_key=True)
+    patient_id = Column(Integer, ForeignKey("patients.id"), primary_key=True, index=True)
+
+
+def _utcnow() -> datetime:
+    # SQLite has no timezone support; store naive UTC timestamps.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class IntakeJobTable(Base):
+    """
+    SQLAlchemy ORM model for the `intake_jobs` table (durable voice intake queue).
+
+    Columns:
+        id (String): Random job identifier returned to the client.
+        status (String): queued, running, succeeded or failed.
+        audio_path (String): Location of the stored upload on local disk.
+        filename (String): Original upload filename.
+        content_type (String): Original upload MIME type.
+        attempts (Integer): Number of pipeline runs started so far.
+        next_attempt_at (DateTime): Earliest time a queued job may be claimed.
+        patient_id (Integer): Resulting patient row once the job succeeds.
+        error (JSON): Structured error detail of the last failed attempt.
+        created_at / updated_at (DateTime): Bookkeeping timestamps (UTC).
+    """
+    __tablename__ = "intake_jobs"
 
+    id = Column(String, primary_key=True)
+    status = Column(String, nullable=False, default="queued", index=True)
+    audio_path = Column(String, nullable=False)
+    filename = Column(String, nullable=True)
+    content_type = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=_utcnow)
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=True)
+    error = Column(JSON, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=_utcnow)
+    updated_at = Column(DateTime, nullable=False, default=_utcnow, onupdate=_utcnow)
 
+    patient = relationship(PatientTable)
@@ -0,0 +1,221 @@
+"""In-process cache of serialized patient responses.
+
+The dashboard polls ``GET /patients`` and ``GET /patients/{id}`` for the
+same few records over and over. Responses are cached as ready-to-send JSON
+bytes together with a strong ``ETag`` (a hash of those bytes), so a hit skips
+both SQLite and Pydantic, and a client sending ``If-None-Match`` gets
+``304 Not Modified`` without the body being serialized at all.
+
+Entries are dropped by the ``crud`` write paths rather than expired on a
+timer: a write invalidates the changed patients and every cached list page
+immediately, and again once its transaction ends. Loads that started
+before an invalidation are not stored, so a reader racing a writer cannot
+put the pre-write rows back. The cache is per process; with several worker
+processes, set ``PATIENT_CACHE_TTL_SECONDS`` to bound how stale another
+process's copy can get.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, Iterable
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import schemas
+
+_PENDING_KEY = "patient_cache.changed_ids"
+
+_PATIENT = TypeAdapter(schemas.Patient)
+_PATIENT_LIST = TypeAdapter(list[schemas.Patient])
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A serialized JSON body, its strong ETag and any extra response headers."""
+
+    body: bytes
+    etag: str
+    headers: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_body(cls, body: bytes, headers: dict[str, str] | None = None) -> "CachedResponse":
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        return cls(body, etag, headers or {})
+
+
+def serialize_patient(patient) -> CachedResponse:
+    return CachedResponse.from_body(_PATIENT.dump_json(_PATIENT.validate_python(patient)))
+
+
+def serialize_patients(patients, headers: dict[str, str] | None = None) -> CachedResponse:
+    return CachedResponse.from_body(
+        _PATIENT_LIST.dump_json(_PATIENT_LIST.validate_python(patients)), headers
+    )
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a W/ prefix still matches.
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class PatientResponseCache:
+    """LRU cache of :class:`CachedResponse` bounded by entry count and bytes.
+
+    Keys are ``("patient", id)`` for single records and ``("page", ...)`` for
+    list pages. ``max_entries=0`` disables storage; ETags still work.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 1024,
+        max_bytes: int = 8 * 1024 * 1024,
+        ttl_seconds: float = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[CachedResponse, float]] = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.not_modified = 0
+
+    @classmethod
+    def from_env(cls) -> "PatientResponseCache":
+        return cls(
+            max_entries=int(os.getenv("PATIENT_CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("PATIENT_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+            ttl_seconds=float(os.getenv("PATIENT_CACHE_TTL_SECONDS", "0")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        load: Callable[[], CachedResponse | None],
+    ) -> CachedResponse | None:
+        """Return the cached response for ``key`` or build it with ``load``.
+
+        ``load`` returning ``None`` (e.g. patient not found) is not cached.
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                cached, stored_at = entry
+                if not self.ttl_seconds or now - stored_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return cached
+                self._evict(key)
+            self.misses += 1
+            generation = self._generation
+
+        cached = load()
+        if cached is not None and self.max_entries > 0:
+            with self._lock:
+                # A write since the load started may have changed what it read.
+                if generation == self._generation:
+                    self._store(key, cached, now)
+        return cached
+
+    def respond(self, request: Request, cached: CachedResponse) -> Response:
+        """200 with the cached body, or 304 when the client already has this ETag."""
+        # ``no-cache`` lets clients store the body but makes them revalidate each poll.
+        headers = {"ETag": cached.etag, "Cache-Control": "no-cache", **cached.headers}
+        if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=cached.body, media_type="application/json", headers=headers)
+
+    def invalidate(self, patient_ids: Iterable[int]) -> None:
+        """Drop the given patients and every list page (which may contain them)."""
+        patient_ids = set(patient_ids)
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            stale = [
+                key
+                for key in self._entries
+                if key[0] == "page" or (key[0] == "patient" and key[1] in patient_ids)
+            ]
+            for key in stale:
+                self._evict(key)
+
+    def invalidate_on_commit(self, db: Session, patient_ids: Iterable[int]) -> None:
+        """Invalidate ``patient_ids`` now and again when ``db``'s transaction ends.
+
+        Readers on other connections keep seeing the old rows until the
+        commit, so the first invalidation alone could be refilled with them.
+        """
+        patient_ids = list(patient_ids)
+        db.info.setdefault(_PENDING_KEY, set()).update(patient_ids)
+        self.invalidate(patient_ids)
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "not_modified": self.not_modified,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def _store(self, key: Hashable, cached: CachedResponse, stored_at: float) -> None:
+        size = len(cached.body)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (cached, stored_at)
+        self._bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: Hashable) -> None:
+        cached, _ = self._entries.pop(key)
+        self._bytes -= len(cached.body)
+
+
+patient_cache = PatientResponseCache.from_env()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _invalidate_after_transaction(session: Session, transaction) -> None:
+    # Savepoints (the writer wraps each upsert in one) end before the commit.
+    if transaction.parent is not None:
+        return
+    changed: set[Any] | None = session.info.pop(_PENDING_KEY, None)
+    if changed:
+        patient_cache.invalidate(changed)
@@ -0,0 +1,200 @@
+"""Realtime voice intake over a WebSocket.
+
+The browser streams audio chunks (binary frames) and sends ``{"type": "end"}``
+when the patient stops talking. Chunks are forwarded to a streaming STT
+session; partial transcripts are relayed back as they arrive. Every settled
+segment speculatively starts field extraction on the transcript so far, so by
+the time the stream ends the extraction is usually finished already.
+
+Messages sent to the browser:
+
+* ``{"type": "partial", "text": …}`` – the segment in progress.
+* ``{"type": "final", "text": …, "transcript": …}`` – a settled segment and
+  the full transcript so far.
+* ``{"type": "patient", "patient": {…}}`` – the persisted patient.
+* ``{"type": "error", "status_code": …, "detail": …}`` – the intake failed.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from contextlib import suppress
+
+from fastapi import WebSocket, WebSocketDisconnect
+from sqlalchemy.orm import Session
+
+from . import schemas, streaming_stt
+from .audio_upload import MAX_UPLOAD_BYTES
+from .exceptions import DeadlineExceededError, IntakeError
+from .intake import _to_intake_error, parse_transcript, save_intake
+from .resilience import INTAKE_DEADLINE_SECONDS, current_deadline, deadline_scope
+
+logger = logging.getLogger(__name__)
+
+
+class _SpeculativeExtraction:
+    """Keep at most one extraction running, for the latest transcript."""
+
+    def __init__(self) -> None:
+        self.transcript: str | None = None
+        self._task: asyncio.Task | None = None
+
+    def restart(self, transcript: str) -> None:
+        self.cancel()
+        self.transcript = transcript
+        self._task = asyncio.create_task(parse_transcript(transcript))
+        # A superseded run may still fail; retrieve its exception so it is not logged as lost.
+        self._task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def result(self, transcript: str) -> dict:
+        if self._task is None or transcript != self.transcript:
+            self.restart(transcript)
+        # A speculative run started before the deadline scope; bound the wait instead.
+        deadline = current_deadline()
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(self._task), deadline.remaining() if deadline else None
+            )
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError(
+                budget_seconds=deadline.budget_seconds, stage="parsing"
+            ) from None
+
+    def cancel(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+
+async def _pump_audio(websocket: WebSocket, session: streaming_stt.StreamingSTTSession) -> None:
+    """Forward browser audio to the STT session until the client sends ``end``."""
+    received = 0
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        chunk = message.get("bytes")
+        if chunk:
+            received += len(chunk)
+            if received > MAX_UPLOAD_BYTES:
+                raise IntakeError(
+                    status_code=413,
+                    detail={"error": "upload_too_large", "limit_bytes": MAX_UPLOAD_BYTES},
+                )
+            await session.send_audio(chunk)
+            continue
+        text = message.get("text")
+        if not text:
+            continue
+        try:
+            control = json.loads(text)
+        except ValueError:
+            control = None
+        if not isinstance(control, dict):
+            await _reject_frame(websocket)
+        if control.get("type") == "end":
+            await session.finish()
+            return
+
+
+async def _reject_frame(websocket: WebSocket) -> None:
+    """Report a text frame that is not a JSON control message and close with 1003."""
+    logger.warning(
+        "voice_input.realtime.invalid_message",
+        extra={"event": "voice_input.realtime.invalid_message", "stage": "transcription"},
+    )
+    await websocket.send_json(
+        {"type": "error", "status_code": 400, "detail": {"error": "invalid_message"}}
+    )
+    await websocket.close(code=1003)
+    # Already closed: unwind like a client disconnect.
+    raise WebSocketDisconnect(1003)
+
+
+async def _relay_transcript(
+    websocket: WebSocket,
+    session: streaming_stt.StreamingSTTSession,
+    extraction: _SpeculativeExtraction,
+) -> str:
+    """Relay transcript events and restart extraction on each final segment."""
+    segments: list[str] = []
+    async for event in session.events():
+        if not event.is_final:
+            await websocket.send_json({"type": "partial", "text": event.text})
+            continue
+        if event.text.strip():
+            segments.append(event.text.strip())
+        transcript = " ".join(segments)
+        await websocket.send_json({"type": "final", "text": event.text, "transcript": transcript})
+        if transcript:
+            extraction.restart(transcript)
+    return " ".join(segments)
+
+
+async def _stream_to_transcript(
+    websocket: WebSocket,
+    session: streaming_stt.StreamingSTTSession,
+    extraction: _SpeculativeExtraction,
+) -> str:
+    pump = asyncio.create_task(_pump_audio(websocket, session))
+    relay = asyncio.create_task(_relay_transcript(websocket, session, extraction))
+    try:
+        done, _ = await asyncio.wait({pump, relay}, return_when=asyncio.FIRST_COMPLETED)
+        if pump in done:
+            pump.result()  # re-raise a disconnect or size-limit error
+        return await relay
+    finally:
+        for task in (pump, relay):
+            task.cancel()
+        await asyncio.gather(pump, relay, return_exceptions=True)
+
+
+async def run_realtime_intake(websocket: WebSocket, db: Session) -> None:
+    """Drive one realtime intake session on an accepted ``websocket``."""
+    logger.info(
+        "voice_input.realtime.start",
+        extra={"event": "voice_input.realtime.start", "stage": "transcription"},
+    )
+    extraction = _SpeculativeExtraction()
+    session: streaming_stt.StreamingSTTSession | None = None
+    try:
+        session = await streaming_stt.open_streaming_session()
+        transcript = await _stream_to_transcript(websocket, session, extraction)
+        if not transcript:
+            raise IntakeError(status_code=422, detail={"error": "empty_transcript"})
+        logger.info(
+            "voice_input.transcription.success",
+            extra={
+                "event": "voice_input.transcription.success",
+                "stage": "transcription",
+                "char_length": len(transcript),
+                "speculative_hit": extraction.transcript == transcript,
+            },
+        )
+        # The budget starts when the patient stops talking, not when the socket opened.
+        with deadline_scope(INTAKE_DEADLINE_SECONDS):
+            parsed = await extraction.result(transcript)
+            patient = await save_intake(db, parsed)
+        await websocket.send_json(
+            {
+                "type": "patient",
+                "patient": schemas.IntakePatient.model_validate(patient).model_dump(mode="json"),
+            }
+        )
+    except WebSocketDisconnect:
+        logger.info(
+            "voice_input.realtime.disconnected",
+            extra={"event": "voice_input.realtime.disconnected"},
+        )
+        return
+    except Exception as exc:
+        error = _to_intake_error(exc)
+        await websocket.send_json(
+            {"type": "error", "status_code": error.status_code, "detail": error.detail}
+        )
+    finally:
+        extraction.cancel()
+        if session is not None:
+            with suppress(Exception):
+                await session.aclose()
+    await websocket.close()
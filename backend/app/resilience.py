@@ -0,0 +1,418 @@
+"""Shared retry, deadline and circuit-breaker helpers for provider calls.
+
+Every intake runs under an end-to-end :class:`Deadline` carried in a context
+variable, so each stage (VAD, preprocessing, transcription, extraction) sees
+the same remaining budget without threading it through every signature.
+Provider calls go through :func:`call_with_retries`, which
+
+* retries only transient failures (network errors and retryable statuses),
+* sleeps with full-jitter exponential backoff without blocking the loop,
+* never sleeps or starts an attempt past the deadline,
+* consults a per-provider :class:`CircuitBreaker` that fails fast while the
+  provider keeps failing, and
+* waits for a slot when a :func:`provider_limits_scope` caps how many calls
+  to the provider may run at once.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Mapping, TypeVar
+
+from .exceptions import CircuitOpenError, DeadlineExceededError, ProviderError
+from .metrics import (
+    PROVIDER_CIRCUIT_REJECTIONS,
+    PROVIDER_IN_FLIGHT,
+    PROVIDER_REQUEST_SECONDS,
+    PROVIDER_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+INTAKE_DEADLINE_SECONDS = float(os.getenv("INTAKE_DEADLINE_SECONDS", "60"))
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+# -- deadlines ----------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class Deadline:
+    """Absolute point in (monotonic) time by which a request must finish."""
+
+    expires_at: float
+    budget_seconds: float
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(expires_at=time.monotonic() + seconds, budget_seconds=seconds)
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, stage: str) -> None:
+        if self.expired:
+            raise DeadlineExceededError(budget_seconds=self.budget_seconds, stage=stage)
+
+
+_current_deadline: ContextVar[Deadline | None] = ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Deadline | None:
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(seconds: float | None) -> Iterator[Deadline | None]:
+    """Run the enclosed block under a deadline ``seconds`` from now.
+
+    An enclosing deadline that expires sooner stays in force; ``None`` or a
+    non-positive value keeps whatever deadline is already active.
+    """
+    outer = _current_deadline.get()
+    deadline = outer
+    if seconds and seconds > 0:
+        candidate = Deadline.after(seconds)
+        if outer is None or candidate.expires_at < outer.expires_at:
+            deadline = candidate
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def check_deadline(stage: str) -> None:
+    """Raise :class:`DeadlineExceededError` if the active deadline has passed."""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def remaining_timeout(cap: float) -> float:
+    """Per-attempt timeout: ``cap`` shortened to the remaining deadline budget."""
+    deadline = _current_deadline.get()
+    return cap if deadline is None else min(cap, deadline.remaining())
+
+
+# -- concurrency limits ----------------------------------------------------------
+
+
+class ProviderLimits:
+    """Per-provider semaphores; ``default`` applies to providers not in ``overrides``.
+
+    A limit of 0 or less means unlimited.
+    """
+
+    def __init__(self, default: int, overrides: Mapping[str, int] | None = None) -> None:
+        self.default = default
+        self.overrides = dict(overrides or {})
+        self._semaphores: dict[str, asyncio.Semaphore | None] = {}
+
+    @classmethod
+    def parse(cls, spec: str) -> "ProviderLimits":
+        """Parse ``"4,gemini=8"``: a bare number sets the default, ``name=n`` overrides."""
+        default, overrides = 0, {}
+        for part in filter(None, (item.strip() for item in spec.split(","))):
+            name, sep, value = part.partition("=")
+            if sep:
+                overrides[name.strip()] = int(value)
+            else:
+                default = int(name)
+        return cls(default, overrides)
+
+    def semaphore(self, provider: str) -> asyncio.Semaphore | None:
+        if provider not in self._semaphores:
+            limit = self.overrides.get(provider, self.default)
+            self._semaphores[provider] = asyncio.Semaphore(limit) if limit > 0 else None
+        return self._semaphores[provider]
+
+
+_provider_limits: ContextVar[ProviderLimits | None] = ContextVar("provider_limits", default=None)
+
+
+@contextmanager
+def provider_limits_scope(limits: ProviderLimits) -> Iterator[ProviderLimits]:
+    """Cap concurrent provider calls made by the enclosed block and tasks it spawns."""
+    token = _provider_limits.set(limits)
+    try:
+        yield limits
+    finally:
+        _provider_limits.reset(token)
+
+
+@asynccontextmanager
+async def provider_slot(provider: str, operation: str) -> AsyncIterator[None]:
+    """Hold one of ``provider``'s slots, waiting no longer than the deadline allows."""
+    limits = _provider_limits.get()
+    semaphore = limits.semaphore(provider) if limits is not None else None
+    if semaphore is None:
+        yield
+        return
+    deadline = current_deadline()
+    try:
+        await asyncio.wait_for(semaphore.acquire(), deadline.remaining() if deadline else None)
+    except asyncio.TimeoutError:
+        raise DeadlineExceededError(budget_seconds=deadline.budget_seconds, stage=operation) from None
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+# -- circuit breaker ------------------------------------------------------------
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one provider.
+
+    After ``failure_threshold`` transient failures in a row the circuit opens
+    and calls fail immediately with :class:`CircuitOpenError`. Once
+    ``reset_timeout`` seconds have passed a single probe call is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> None:
+        """Raise :class:`CircuitOpenError` unless a call may proceed."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejected += 1
+            retry_after = max(self.reset_timeout - (self._clock() - self._opened_at), 0.0)
+        raise CircuitOpenError(
+            provider=self.name,
+            message=f"{self.name} circuit is open; failing fast",
+            retry_after=retry_after,
+        )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probe_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probe_in_flight:
+                    self.opened += 1
+                    logger.error(
+                        "resilience.circuit_opened",
+                        extra={"event": "resilience.circuit_opened", "provider": self.name},
+                    )
+                self._opened_at = self._clock()
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Give up a half-open probe slot without deciding the circuit's state."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreakerRegistry:
+    """Lazily created breakers, one per provider name."""
+
+    def __init__(self, *, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreakerRegistry":
+        return cls(
+            failure_threshold=int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", "30")),
+        )
+
+    def get(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(provider)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    provider,
+                    failure_threshold=self.failure_threshold,
+                    reset_timeout=self.reset_timeout,
+                )
+                self._breakers[provider] = breaker
+            return breaker
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {name: breaker.stats() for name, breaker in self._breakers.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._breakers.clear()
+
+
+circuit_breakers = CircuitBreakerRegistry.from_env()
+
+
+# -- retries ----------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Attempt budget and full-jitter backoff bounds."""
+
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            max_attempts=int(os.getenv("PROVIDER_RETRY_MAX_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("PROVIDER_RETRY_BASE_SECONDS", "0.5")),
+            max_delay=float(os.getenv("PROVIDER_RETRY_MAX_SECONDS", "8")),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in ``[0, min(max_delay, base * 2**(attempt-1))]``."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy.from_env()
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transient provider failures: network errors and retryable HTTP statuses."""
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, ProviderError):
+        return exc.status_code is None or exc.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+async def _within_deadline(fn: Callable[[], Awaitable[T]], operation: str) -> T:
+    deadline = current_deadline()
+    if deadline is None:
+        return await fn()
+    try:
+        return await asyncio.wait_for(fn(), timeout=deadline.remaining())
+    except asyncio.TimeoutError:
+        if not deadline.expired:
+            raise  # the call's own timeout, not the deadline
+        raise DeadlineExceededError(budget_seconds=deadline.budget_seconds, stage=operation) from None
+
+
+async def call_with_retries(
+    fn: Callable[[], Awaitable[T]],
+    *,
+    provider: str,
+    operation: str,
+    policy: RetryPolicy | None = None,
+    breaker: CircuitBreaker | None = None,
+) -> T:
+    """Call ``fn`` with deadline-bounded, jittered retries behind a circuit breaker."""
+    policy = policy or DEFAULT_RETRY_POLICY
+    breaker = breaker or circuit_breakers.get(provider)
+    for attempt in range(1, policy.max_attempts + 1):
+        check_deadline(operation)
+        async with provider_slot(provider, operation):
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                PROVIDER_CIRCUIT_REJECTIONS.inc(provider=provider)
+                raise
+            started = time.perf_counter()
+            try:
+                with PROVIDER_IN_FLIGHT.track_in_progress(provider=provider):
+                    result = await _within_deadline(fn, operation)
+            except asyncio.CancelledError:
+                breaker.release_probe()
+                raise
+            except Exception as exc:
+                PROVIDER_REQUEST_SECONDS.observe(
+                    time.perf_counter() - started, provider=provider, operation=operation, outcome="error"
+                )
+                retryable = is_retryable(exc)
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    # A 4xx says nothing about the provider's health.
+                    breaker.release_probe()
+                delay = policy.backoff(attempt)
+                deadline = current_deadline()
+                out_of_time = deadline is not None and deadline.remaining() <= delay
+                final = not retryable or attempt == policy.max_attempts or out_of_time
+
+                log_fields: dict[str, Any] = {
+                    "event": "resilience.retry" if not final else "resilience.gave_up",
+                    "provider": provider,
+                    "operation": operation,
+                    "attempt": attempt,
+                    "max_attempts": policy.max_attempts,
+                    "retryable": retryable,
+                }
+                if isinstance(exc, ProviderError):
+                    log_fields.update(exc.to_log_fields())
+                else:
+                    log_fields["exception"] = repr(exc)
+                if final:
+                    logger.error(f"Giving up calling {provider}", extra=log_fields)
+                    raise
+                logger.warning(f"Retryable error when calling {provider}", extra=log_fields)
+                PROVIDER_RETRIES.inc(provider=provider, operation=operation)
+            else:
+                PROVIDER_REQUEST_SECONDS.observe(
+                    time.perf_counter() - started, provider=provider, operation=operation, outcome="success"
+                )
+                breaker.record_success()
+                return result
+        # Back off without holding the provider slot.
+        await asyncio.sleep(delay)
+    raise AssertionError("unreachable")  # pragma: no cover
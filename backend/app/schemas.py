@@ -1,5 +1,7 @@
+from datetime import datetime
+
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Optional
 
 
 """
@@ -51,4 +53,62 @@ class Patient(PatientBase):
 
     model_config = {"from_attributes": True}
 
- 
\ No newline at end of file
+
+class DuplicateCandidate(Patient):
+    """
+    Existing patient that is probably the same person as a new intake.
+
+    Attributes:
+        reasons: Signals that matched, e.g. ``similar_phone`` (one digit
+            off), ``similar_name``/``partial_name`` (sounds alike) and
+            ``same_address``.
+    """
+    reasons: list[str]
+
+
+class IntakePatient(Patient):
+    """
+    Patient returned by the voice intake endpoints.
+
+    Attributes:
+        possible_duplicates: Likely duplicates of a newly created patient,
+            for staff to review and merge; empty for returning patients.
+    """
+    possible_duplicates: list[DuplicateCandidate] = []
+
+
+class PatientChanges(BaseModel):
+    """
+    Response of ``GET /patients/changes`` (delta sync).
+
+    Attributes:
+        patients: Rows inserted or updated after ``since``, oldest change first.
+        next_since: High-water mark to send as ``since`` on the next call.
+        has_more: True when more changes are waiting; call again immediately.
+    """
+    patients: list[Patient]
+    next_since: int
+    has_more: bool
+
+
+class IntakeJob(BaseModel):
+    """
+    Status of an asynchronous voice intake job.
+
+    Attributes:
+        id: Job identifier returned by ``POST /voice-input/jobs``.
+        status: queued, running, succeeded or failed.
+        attempts: Number of pipeline runs started so far.
+        patient: Resulting patient once the job has succeeded.
+        error: Structured error detail (same shape as the ``/voice-input``
+            error responses) from the most recent failed attempt.
+    """
+    id: str
+    status: str
+    attempts: int
+    created_at: datetime
+    updated_at: datetime
+    patient: Optional[Patient] = None
+    error: Optional[Any] = None
+
+    model_config = {"from_attributes": True}
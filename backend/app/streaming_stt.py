@@ -0,0 +1,120 @@
+"""Client side of the streaming speech-to-text protocol.
+
+The realtime intake forwards browser audio chunks to a streaming STT backend
+over a WebSocket and relays transcript events back. The wire protocol is
+deliberately small so a provider adapter (or the local stand-in in
+:mod:`app.fake_stt_server`) can implement it:
+
+* client → server: binary frames with audio bytes, then ``{"type": "end"}``.
+* server → client: ``{"type": "partial", "text": …}`` for the segment in
+  progress, ``{"type": "final", "text": …}`` when a segment is settled,
+  ``{"type": "error", "message": …}`` on failure and ``{"type": "done"}``
+  once the stream is complete.
+
+No hosted provider speaks this protocol as is; today the only backend is the
+fake server. Connecting a real realtime STT service means writing an adapter
+that implements :class:`StreamingSTTSession` (or a relay that translates its
+protocol to this one). ``STREAMING_STT_API_KEY`` is sent as a generic
+``Authorization: Bearer`` header.
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from typing import AsyncIterator, Protocol
+
+from websockets.asyncio.client import ClientConnection, connect
+from websockets.exceptions import WebSocketException
+
+from .exceptions import ProviderError
+
+STREAMING_STT_URL = os.getenv("STREAMING_STT_URL", "ws://127.0.0.1:8765")
+STREAMING_STT_API_KEY = os.getenv("STREAMING_STT_API_KEY")
+STREAMING_STT_PROVIDER = os.getenv("STREAMING_STT_PROVIDER", "streaming_stt")
+
+
+@dataclass(frozen=True)
+class TranscriptEvent:
+    """A partial or settled (``is_final``) transcript segment."""
+
+    text: str
+    is_final: bool
+
+
+class StreamingSTTSession(Protocol):
+    """One streaming transcription, fed audio and yielding transcript events."""
+
+    async def send_audio(self, chunk: bytes) -> None:
+        ...
+
+    async def finish(self) -> None:
+        ...
+
+    def events(self) -> AsyncIterator[TranscriptEvent]:
+        ...
+
+    async def aclose(self) -> None:
+        ...
+
+
+class WebSocketSTTSession:
+    """:class:`StreamingSTTSession` speaking the JSON/WebSocket protocol above."""
+
+    def __init__(self, connection: ClientConnection, *, provider: str = STREAMING_STT_PROVIDER) -> None:
+        self._connection = connection
+        self._provider = provider
+
+    @classmethod
+    async def connect(
+        cls,
+        url: str = STREAMING_STT_URL,
+        *,
+        api_key: str | None = STREAMING_STT_API_KEY,
+    ) -> "WebSocketSTTSession":
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else None
+        try:
+            connection = await connect(url, additional_headers=headers, open_timeout=10)
+        except (OSError, WebSocketException) as exc:
+            raise ProviderError(
+                provider=STREAMING_STT_PROVIDER,
+                message=f"Could not connect to streaming STT at {url}",
+                payload=repr(exc),
+            ) from exc
+        return cls(connection)
+
+    async def send_audio(self, chunk: bytes) -> None:
+        await self._connection.send(chunk)
+
+    async def finish(self) -> None:
+        await self._connection.send(json.dumps({"type": "end"}))
+
+    async def events(self) -> AsyncIterator[TranscriptEvent]:
+        try:
+            async for message in self._connection:
+                event = json.loads(message)
+                kind = event.get("type")
+                if kind == "done":
+                    return
+                if kind == "error":
+                    raise ProviderError(
+                        provider=self._provider,
+                        message=event.get("message") or "Streaming STT reported an error",
+                        payload=event,
+                    )
+                if kind in {"partial", "final"}:
+                    yield TranscriptEvent(text=event.get("text") or "", is_final=kind == "final")
+        except WebSocketException as exc:
+            raise ProviderError(
+                provider=self._provider,
+                message="Streaming STT connection failed",
+                payload=repr(exc),
+            ) from exc
+
+    async def aclose(self) -> None:
+        await self._connection.close()
+
+
+async def open_streaming_session() -> StreamingSTTSession:
+    """Open a session against the configured streaming STT backend."""
+    return await WebSocketSTTSession.connect()
@@ -0,0 +1,249 @@
+"""Speech-to-text provider abstraction with adaptive request hedging.
+
+``transcribe_audio_data`` hands the upload to :data:`stt_router`, which sends
+it to the primary provider. If no answer arrives within the primary's
+recent p95 latency, a second (hedged) request goes to the configured
+alternate provider, which may be the primary itself. The first transcript
+wins and the other request is cancelled. A primary that fails outright is
+failed over to the alternate immediately.
+
+Latencies are tracked per provider in a rolling :class:`LatencyHistogram`,
+so the hedge delay follows the provider's current behaviour.
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Protocol
+
+from fastapi import UploadFile
+
+from .audio_upload import UploadFingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class STTProvider(Protocol):
+    """A batch speech-to-text backend."""
+
+    name: str
+    model_id: str
+
+    async def transcribe(self, file: UploadFile, fingerprint: UploadFingerprint) -> str:
+        ...
+
+
+def _log_spaced_bounds(low: float, high: float, per_decade: int) -> list[float]:
+    bounds = [low]
+    factor = 10 ** (1 / per_decade)
+    while bounds[-1] < high:
+        bounds.append(bounds[-1] * factor)
+    return bounds
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram over the last ``window`` observations.
+
+    Buckets are ~12% wide (20 per decade from 10 ms to 10 min), so percentile
+    estimates are within one bucket while observe/percentile stay O(buckets)
+    regardless of traffic.
+    """
+
+    BOUNDS = _log_spaced_bounds(0.01, 600.0, 20)
+
+    def __init__(self, window: int = 500) -> None:
+        self._samples: deque[int] = deque(maxlen=window)
+        self._counts = [0] * (len(self.BOUNDS) + 1)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        bucket = bisect.bisect_left(self.BOUNDS, seconds)
+        with self._lock:
+            if len(self._samples) == self._samples.maxlen:
+                self._counts[self._samples[0]] -= 1
+            self._samples.append(bucket)
+            self._counts[bucket] += 1
+
+    def percentile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the ``q`` quantile, or ``None`` if empty."""
+        with self._lock:
+            total = len(self._samples)
+            if not total:
+                return None
+            rank = max(int(q * total + 0.5), 1)
+            seen = 0
+            for bucket, count in enumerate(self._counts):
+                seen += count
+                if seen >= rank:
+                    return self.BOUNDS[min(bucket, len(self.BOUNDS) - 1)]
+        return self.BOUNDS[-1]  # pragma: no cover - counts always sum to total
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "samples": len(self),
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+
+class STTRouter:
+    """Route transcriptions to registered providers, hedging slow requests."""
+
+    def __init__(
+        self,
+        *,
+        primary: str = "elevenlabs",
+        alternate: str | None = None,
+        hedging: bool = True,
+        hedge_percentile: float = 0.95,
+        min_hedge_delay: float = 0.5,
+        max_hedge_delay: float = 30.0,
+        initial_hedge_delay: float = 10.0,
+        min_samples: int = 20,
+        window: int = 500,
+    ) -> None:
+        self.primary_name = primary
+        self.alternate_name = alternate or primary
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_samples = min_samples
+        self.window = window
+        self._providers: dict[str, STTProvider] = {}
+        self._latency: dict[str, LatencyHistogram] = {}
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    @classmethod
+    def from_env(cls) -> "STTRouter":
+        return cls(
+            primary=os.getenv("STT_PROVIDER", "elevenlabs"),
+            alternate=os.getenv("STT_HEDGE_PROVIDER") or None,
+            hedging=os.getenv("STT_HEDGING_ENABLED", "true").lower() == "true",
+            hedge_percentile=float(os.getenv("STT_HEDGE_PERCENTILE", "0.95")),
+            min_hedge_delay=float(os.getenv("STT_HEDGE_MIN_DELAY_SECONDS", "0.5")),
+            max_hedge_delay=float(os.getenv("STT_HEDGE_MAX_DELAY_SECONDS", "30")),
+            initial_hedge_delay=float(os.getenv("STT_HEDGE_INITIAL_DELAY_SECONDS", "10")),
+            window=int(os.getenv("STT_LATENCY_WINDOW", "500")),
+        )
+
+    def register(self, provider: STTProvider) -> None:
+        self._providers[provider.name] = provider
+        self._latency.setdefault(provider.name, LatencyHistogram(self.window))
+
+    def provider(self, name: str) -> STTProvider:
+        try:
+            return self._providers[name]
+        except KeyError:
+            raise ValueError(f"Unknown STT provider: {name}") from None
+
+    @property
+    def primary(self) -> STTProvider:
+        return self.provider(self.primary_name)
+
+    @property
+    def alternate(self) -> STTProvider:
+        return self.provider(self.alternate_name)
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait on the primary before hedging: its clamped recent p95."""
+        histogram = self._latency.get(self.primary_name)
+        if histogram is None or len(histogram) < self.min_samples:
+            return self.initial_hedge_delay
+        estimate = histogram.percentile(self.hedge_percentile) or self.initial_hedge_delay
+        return min(max(estimate, self.min_hedge_delay), self.max_hedge_delay)
+
+    async def transcribe(self, file: UploadFile, fingerprint: UploadFingerprint) -> str:
+        self.requests += 1
+        primary = self.primary
+        if not self.hedging:
+            return await self._timed(primary, file, fingerprint)
+
+        tasks = [asyncio.create_task(self._timed(primary, file, fingerprint))]
+        try:
+            delay = self.hedge_delay()
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                first = tasks[0]
+                if first.exception() is None or self.alternate_name == primary.name:
+                    return first.result()
+                self.failovers += 1
+                logger.warning(
+                    "stt.failover",
+                    extra={
+                        "event": "stt.failover",
+                        "provider": primary.name,
+                        "alternate": self.alternate_name,
+                        "exception": repr(first.exception()),
+                    },
+                )
+                return await self._timed(self.alternate, file, fingerprint)
+
+            self.hedged += 1
+            logger.info(
+                "stt.hedged",
+                extra={
+                    "event": "stt.hedged",
+                    "provider": primary.name,
+                    "alternate": self.alternate_name,
+                    "hedge_delay": round(delay, 3),
+                },
+            )
+            tasks.append(asyncio.create_task(self._timed(self.alternate, file, fingerprint)))
+            pending = set(tasks)
+            errors: list[BaseException] = []
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            self.hedge_wins += 1
+                        return task.result()
+                    errors.append(task.exception())
+            raise errors[0]
+        finally:
+            # The losing (or abandoned) request is cancelled, never left running.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _timed(self, provider: STTProvider, file: UploadFile, fingerprint: UploadFingerprint) -> str:
+        started = time.perf_counter()
+        try:
+            transcript = await provider.transcribe(file, fingerprint)
+        except asyncio.CancelledError:
+            # A cancelled hedge loser was at least this slow. Dropping it would
+            # leave only the fast attempts in the p95 that sets the hedge delay.
+            self._latency[provider.name].observe(time.perf_counter() - started)
+            raise
+        self._latency[provider.name].observe(time.perf_counter() - started)
+        return transcript
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "primary": self.primary_name,
+            "alternate": self.alternate_name,
+            "hedging": self.hedging,
+            "hedge_delay": self.hedge_delay(),
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "latency": {name: histogram.snapshot() for name, histogram in self._latency.items()},
+        }
+
+
+stt_router = STTRouter.from_env()
@@ -0,0 +1,190 @@
+"""Content-addressed cache for speech-to-text transcripts.
+
+Transcripts are keyed by the SHA-256 of the uploaded audio bytes, so a
+double-submitted or retried upload reuses the earlier transcription instead
+of paying for another provider call. Concurrent lookups for the same key are
+coalesced onto a single in-flight computation.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+def digest_cache_key(sha256_hex: str, *, model_id: str) -> str:
+    """Return the cache key for audio with digest ``sha256_hex`` and ``model_id``."""
+    return f"{model_id}:{sha256_hex}"
+
+
+def audio_cache_key(audio_bytes: bytes, *, model_id: str) -> str:
+    """Return the cache key for ``audio_bytes`` transcribed by ``model_id``."""
+    return digest_cache_key(hashlib.sha256(audio_bytes).hexdigest(), model_id=model_id)
+
+
+class TranscriptCache:
+    """LRU + TTL transcript cache with an optional SQLite backing store.
+
+    ``max_entries`` and ``max_bytes`` bound the in-memory tier; the least
+    recently used transcripts are evicted first. When ``db_path`` is set,
+    entries are also written to SQLite so they survive restarts.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 1024,
+        max_bytes: int = 4 * 1024 * 1024,
+        ttl_seconds: float = 24 * 3600,
+        db_path: str | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict[str, asyncio.Future[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._db: sqlite3.Connection | None = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS transcript_cache ("
+                "cache_key TEXT PRIMARY KEY, transcript TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls) -> "TranscriptCache":
+        return cls(
+            max_entries=int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(4 * 1024 * 1024))),
+            ttl_seconds=float(os.getenv("TRANSCRIPT_CACHE_TTL_SECONDS", str(24 * 3600))),
+            db_path=os.getenv("TRANSCRIPT_CACHE_DB") or None,
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> str | None:
+        """Return a fresh cached transcript for ``key`` or ``None``."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                transcript, created_at = entry
+                if now - created_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    return transcript
+                self._evict(key)
+
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT transcript, created_at FROM transcript_cache WHERE cache_key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            transcript, created_at = row
+            if now - created_at >= self.ttl_seconds:
+                self._db.execute("DELETE FROM transcript_cache WHERE cache_key = ?", (key,))
+                self._db.commit()
+                return None
+            self._store_memory(key, transcript, created_at)
+            return transcript
+
+    def put(self, key: str, transcript: str) -> None:
+        """Store ``transcript`` under ``key`` in memory and, if enabled, SQLite."""
+        created_at = self._clock()
+        with self._lock:
+            self._store_memory(key, transcript, created_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO transcript_cache (cache_key, transcript, created_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, transcript, created_at),
+                )
+                self._db.commit()
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """Return the cached transcript or run ``compute`` exactly once per key.
+
+        Callers that arrive while a computation for ``key`` is in flight
+        await the same result. Failures are propagated to every waiter and
+        are never cached.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        task = asyncio.ensure_future(self._compute_and_store(key, compute))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _compute_and_store(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        transcript = await compute()
+        self.put(key, transcript)
+        return transcript
+
+    def stats(self) -> dict[str, int | bool]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "persistent": self._db is not None,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM transcript_cache")
+                self._db.commit()
+
+    def _store_memory(self, key: str, transcript: str, created_at: float) -> None:
+        size = len(transcript.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (transcript, created_at)
+        self._bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._evict(oldest)
+
+    def _evict(self, key: str) -> None:
+        transcript, _ = self._entries.pop(key)
+        self._bytes -= len(transcript.encode("utf-8"))
+
+
+transcript_cache = TranscriptCache.from_env()
@@ -0,0 +1,224 @@
+"""Cheap local voice-activity gate for uploaded recordings.
+
+Accidental clicks on the record button produce near-silent uploads that
+still cost a full STT round trip before failing on an empty transcript. The
+gate decodes the upload locally in chunks, measures how much of it carries speech-level
+energy (vectorized over 20 ms frames) and lets the caller reject recordings
+with too little speech before any provider is called.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import shutil
+import wave
+from dataclasses import dataclass
+from typing import BinaryIO
+
+import numpy as np
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from .audio_preprocess import (
+    FFMPEG_TIMEOUT_SECONDS,
+    SILENCE_THRESHOLD_DBFS,
+    TARGET_SAMPLE_RATE,
+    WAV_CONTENT_TYPES,
+    downmix,
+    frame_dbfs,
+    pcm_to_float,
+)
+from .audio_upload import MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE
+from .exceptions import UploadTooLargeError
+
+logger = logging.getLogger(__name__)
+
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+VAD_MIN_SPEECH_SECONDS = float(os.getenv("VAD_MIN_SPEECH_SECONDS", "0.5"))
+VAD_NOISE_MARGIN_DB = float(os.getenv("VAD_NOISE_MARGIN_DB", "10"))
+VAD_FRAME_MS = 20
+
+
+@dataclass(frozen=True)
+class VoiceActivity:
+    """Speech measurements for one recording."""
+
+    speech_seconds: float
+    total_seconds: float
+
+    @property
+    def speech_ratio(self) -> float:
+        return self.speech_seconds / self.total_seconds if self.total_seconds else 0.0
+
+
+def analyze_levels(
+    levels: np.ndarray,
+    total_seconds: float,
+    *,
+    frame_ms: int = VAD_FRAME_MS,
+    floor_dbfs: float = SILENCE_THRESHOLD_DBFS,
+    noise_margin_db: float = VAD_NOISE_MARGIN_DB,
+) -> VoiceActivity:
+    """Count frames whose level clears both an absolute and an adaptive floor.
+
+    The adaptive floor is the 10th-percentile frame level (the room noise)
+    plus ``noise_margin_db``, so steady background hum is not mistaken for
+    speech. It only applies when the recording has quieter stretches to
+    learn the noise from: if the 10th percentile is within the margin of the
+    median, the whole clip is at one level (continuous speech, or steady
+    noise) and only the absolute floor is used.
+    """
+    if levels.size == 0:
+        return VoiceActivity(0.0, total_seconds)
+    noise_floor, median = (float(level) for level in np.percentile(levels, (10, 50)))
+    threshold = floor_dbfs
+    if median - noise_floor >= noise_margin_db:
+        threshold = max(floor_dbfs, noise_floor + noise_margin_db)
+    voiced_frames = int(np.count_nonzero(levels > threshold))
+    return VoiceActivity(voiced_frames * frame_ms / 1000, total_seconds)
+
+
+def analyze_pcm(
+    mono: np.ndarray,
+    rate: int,
+    *,
+    frame_ms: int = VAD_FRAME_MS,
+    floor_dbfs: float = SILENCE_THRESHOLD_DBFS,
+    noise_margin_db: float = VAD_NOISE_MARGIN_DB,
+) -> VoiceActivity:
+    """Measure speech in a whole decoded recording (see :func:`analyze_levels`)."""
+    return analyze_levels(
+        frame_dbfs(mono, rate, frame_ms),
+        mono.size / rate if rate else 0.0,
+        frame_ms=frame_ms,
+        floor_dbfs=floor_dbfs,
+        noise_margin_db=noise_margin_db,
+    )
+
+
+class _LevelMeter:
+    """Frame levels of a recording fed in arbitrary-sized chunks of mono samples."""
+
+    def __init__(self, rate: int, frame_ms: int = VAD_FRAME_MS) -> None:
+        self.rate = rate
+        self.frame_ms = frame_ms
+        self._frame = max(int(rate * frame_ms / 1000), 1)
+        self._carry = np.empty(0, dtype=np.float32)
+        self._levels: list[np.ndarray] = []
+        self._samples = 0
+
+    def feed(self, mono: np.ndarray) -> None:
+        self._samples += mono.size
+        if self._carry.size:
+            mono = np.concatenate((self._carry, mono))
+        usable = mono.size - mono.size % self._frame
+        self._levels.append(frame_dbfs(mono[:usable], self.rate, self.frame_ms))
+        self._carry = mono[usable:].copy()
+
+    def result(self) -> VoiceActivity:
+        levels = np.concatenate(self._levels) if self._levels else np.empty(0, dtype=np.float32)
+        total_seconds = self._samples / self.rate if self.rate else 0.0
+        return analyze_levels(levels, total_seconds, frame_ms=self.frame_ms)
+
+
+def _stream_size(stream: BinaryIO) -> int:
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def _measure_wav(stream: BinaryIO) -> VoiceActivity | None:
+    """Read a WAV stream about a second at a time; ``None`` if it is not valid PCM WAV."""
+    try:
+        with wave.open(stream, "rb") as reader:
+            channels = reader.getnchannels()
+            width = reader.getsampwidth()
+            meter = _LevelMeter(reader.getframerate())
+            chunk_frames = max(reader.getframerate(), 1)
+            while raw := reader.readframes(chunk_frames):
+                usable = len(raw) - len(raw) % (width * channels)
+                meter.feed(downmix(pcm_to_float(raw[:usable], width, channels)))
+    except (wave.Error, ValueError, EOFError):
+        return None
+    finally:
+        stream.seek(0)
+    return meter.result()
+
+
+async def _measure_with_ffmpeg(file: UploadFile) -> VoiceActivity | None:
+    """Pipe ``file`` through ffmpeg in chunks, metering its PCM output as it arrives."""
+    if shutil.which("ffmpeg") is None:
+        return None
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        "pipe:0",
+        "-ac",
+        "1",
+        "-ar",
+        str(TARGET_SAMPLE_RATE),
+        "-f",
+        "s16le",
+        "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    meter = _LevelMeter(TARGET_SAMPLE_RATE)
+
+    async def feed() -> None:
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                process.stdin.write(chunk)
+                await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg gave up on the input; its exit status reports why.
+            pass
+        finally:
+            process.stdin.close()
+
+    async def drain() -> None:
+        carry = b""
+        while chunk := await process.stdout.read(UPLOAD_CHUNK_SIZE):
+            chunk = carry + chunk
+            usable = len(chunk) - len(chunk) % 2
+            carry = chunk[usable:]
+            await run_in_threadpool(meter.feed, pcm_to_float(chunk[:usable], 2, 1)[:, 0])
+
+    try:
+        await asyncio.wait_for(asyncio.gather(feed(), drain()), timeout=FFMPEG_TIMEOUT_SECONDS)
+        await process.wait()
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        logger.warning("voice_activity.ffmpeg_timeout", extra={"event": "voice_activity.ffmpeg_timeout"})
+        return None
+    finally:
+        await file.seek(0)
+    if process.returncode != 0:
+        return None
+    return meter.result()
+
+
+async def measure_upload(file: UploadFile) -> VoiceActivity | None:
+    """Measure speech in ``file``; ``None`` when the format cannot be decoded locally.
+
+    The upload is read in chunks off the event loop and left at position 0
+    for the next stage.
+    """
+    size = await run_in_threadpool(_stream_size, file.file)
+    if size > MAX_UPLOAD_BYTES:
+        raise UploadTooLargeError(limit_bytes=MAX_UPLOAD_BYTES)
+    if not size:
+        return VoiceActivity(0.0, 0.0)
+
+    content_type = (file.content_type or "").split(";")[0].strip().lower()
+    filename = (file.filename or "").lower()
+    if content_type in WAV_CONTENT_TYPES or filename.endswith(".wav"):
+        return await run_in_threadpool(_measure_wav, file.file)
+    return await _measure_with_ffmpeg(file)
@@ -1,138 +1,126 @@
-"""Utilities for communicating with the ElevenLabs speech-to-text API."""
+"""Speech-to-text entry point and the ElevenLabs provider implementation."""
 from __future__ import annotations
 
-import io
 import logging
 import os
-import time
-from typing import Any, Callable, TypeVar
+from typing import Any
 
-import certifi
-import requests
+import httpx
 from fastapi import UploadFile
 from dotenv import load_dotenv
 
+from .audio_upload import MultipartFileBody, UploadFingerprint, fingerprint_upload
 from .exceptions import ProviderError
+from .http_clients import provider_clients
+from .resilience import call_with_retries, remaining_timeout
+from .stt_providers import stt_router
+from .transcript_cache import digest_cache_key, transcript_cache
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
-ELEVENLABS_STT_URL = "https://api.elevenlabs.io/v1/speech-to-text"
-
-T = TypeVar("T")
-
-
-def _retry_with_backoff(
-    fn: Callable[[], T],
-    *,
-    operation: str,
-    max_attempts: int = 3,
-    base_delay: float = 1.0,
-) -> T:
-    """Retry ``fn`` with exponential backoff."""
-    last_exc: Exception | None = None
-    for attempt in range(1, max_attempts + 1):
-        try:
-            return fn()
-        except Exception as exc:  # pragma: no cover - network heavy
-            last_exc = exc
-            wait = base_delay * (2 ** (attempt - 1))
-            log_kwargs: dict[str, Any] = {
-                "event": "voice_agent.retry",
-                "operation": operation,
-                "attempt": attempt,
-                "max_attempts": max_attempts,
-            }
-            if isinstance(exc, ProviderError):
-                log_kwargs.update(exc.to_log_fields())
-            else:
-                log_kwargs["exception"] = repr(exc)
-            log_method = logger.warning if attempt < max_attempts else logger.error
-            log_method("Retryable error when calling ElevenLabs", extra=log_kwargs)
-            if attempt < max_attempts:
-                time.sleep(wait)
-    assert last_exc is not None
-    raise last_exc
-
-
-def _safe_payload(resp: requests.Response) -> Any:  # pragma: no cover - best effort
+ELEVENLABS_STT_URL = os.getenv(
+    "ELEVENLABS_STT_URL", "https://api.elevenlabs.io/v1/speech-to-text"
+)
+ELEVENLABS_MODEL_ID = "scribe_v1"
+ELEVENLABS_TIMEOUT_SECONDS = float(os.getenv("ELEVENLABS_TIMEOUT_SECONDS", "90"))
+
+
+def _safe_payload(resp: httpx.Response) -> Any:  # pragma: no cover - best effort
     try:
         return resp.json()
     except ValueError:
         return resp.text[:1000]
 
 
-def transcribe_audio_data(file: UploadFile) -> str:
-    """Send uploaded audio file to ElevenLabs STT and return transcribed text."""
-    if not ELEVENLABS_API_KEY:
-        raise ValueError("Missing ELEVENLABS_API_KEY")
+class ElevenLabsSTT:
+    """:class:`~app.stt_providers.STTProvider` for the ElevenLabs batch STT API."""
 
-    if hasattr(file.file, "seek"):
-        try:
-            file.file.seek(0)
-        except Exception:  # pragma: no cover - defensive
-            pass
+    name = "elevenlabs"
 
-    audio_bytes = file.file.read()
-    if not audio_bytes:
-        raise RuntimeError("Empty audio file received from frontend")
+    def __init__(self, model_id: str = ELEVENLABS_MODEL_ID) -> None:
+        self.model_id = model_id
 
-    headers = {
-        "xi-api-key": ELEVENLABS_API_KEY,
-        "Accept": "application/json",
-    }
+    async def transcribe(self, file: UploadFile, fingerprint: UploadFingerprint) -> str:
+        if not ELEVENLABS_API_KEY:
+            raise ValueError("Missing ELEVENLABS_API_KEY")
 
-    def _do_request() -> str:
-        files = {
-            "file": (file.filename or "recording.webm", io.BytesIO(audio_bytes), file.content_type or "audio/webm"),
+        headers = {
+            "xi-api-key": ELEVENLABS_API_KEY,
+            "Accept": "application/json",
         }
-        data = {"model_id": "scribe_v1"}
-
-        try:
-            resp = requests.post(
-                ELEVENLABS_STT_URL,
-                headers=headers,
-                files=files,
-                data=data,
-                timeout=90,
-                verify=certifi.where(),
-            )
-        except requests.exceptions.RequestException as exc:
-            payload = getattr(exc.response, "text", None)
-            raise ProviderError(
-                provider="elevenlabs",
-                message="Network failure while calling ElevenLabs STT",
-                payload=payload[:1000] if isinstance(payload, str) else payload,
-            ) from exc
-
-        if resp.status_code >= 400:
-            payload = _safe_payload(resp)
-            raise ProviderError(
-                provider="elevenlabs",
-                message="ElevenLabs STT returned an error response",
-                status_code=resp.status_code,
-                payload=payload,
-            )
 
-        result = resp.json()
-        text = (result.get("text") or "").strip()
-        if not text:
-            raise ProviderError(
-                provider="elevenlabs",
-                message="ElevenLabs STT returned an empty transcript",
-                status_code=resp.status_code,
-                payload=result,
+        async def _do_request() -> str:
+            body = MultipartFileBody(
+                file,
+                file_size=fingerprint.size,
+                filename=file.filename or "recording.webm",
+                content_type=file.content_type or "audio/webm",
+                fields={"model_id": self.model_id},
             )
-        return text
 
-    transcript = _retry_with_backoff(_do_request, operation="elevenlabs_transcription")
+            try:
+                resp = await provider_clients.get("elevenlabs").post(
+                    ELEVENLABS_STT_URL,
+                    headers={**headers, **body.headers},
+                    content=body,
+                    timeout=remaining_timeout(ELEVENLABS_TIMEOUT_SECONDS),
+                )
+            except httpx.HTTPError as exc:
+                raise ProviderError(
+                    provider="elevenlabs",
+                    message="Network failure while calling ElevenLabs STT",
+                    payload=repr(exc)[:1000],
+                ) from exc
+
+            if resp.status_code >= 400:
+                payload = _safe_payload(resp)
+                raise ProviderError(
+                    provider="elevenlabs",
+                    message="ElevenLabs STT returned an error response",
+                    status_code=resp.status_code,
+                    payload=payload,
+                )
+
+            result = resp.json()
+            text = (result.get("text") or "").strip()
+            if not text:
+                raise ProviderError(
+                    provider="elevenlabs",
+                    message="ElevenLabs STT returned an empty transcript",
+                    status_code=resp.status_code,
+                    payload=result,
+                )
+            return text
+
+        return await call_with_retries(
+            _do_request, provider="elevenlabs", operation="elevenlabs_transcription"
+        )
+
+
+stt_router.register(ElevenLabsSTT())
+
+
+async def transcribe_audio_data(file: UploadFile) -> str:
+    """Transcribe an uploaded audio file with the configured STT provider(s)."""
+    # Hash and size-check the spooled upload in chunks; never hold it all in memory.
+    fingerprint = await fingerprint_upload(file)
+    if not fingerprint.size:
+        raise RuntimeError("Empty audio file received from frontend")
+
+    async def _transcribe() -> str:
+        return await stt_router.transcribe(file, fingerprint)
+
+    # Duplicate uploads (double submit, browser retry) share one provider call.
+    cache_key = digest_cache_key(fingerprint.sha256, model_id=stt_router.primary.model_id)
+    transcript = await transcript_cache.get_or_compute(cache_key, _transcribe)
     logger.info(
         "voice_agent.transcription.success",
         extra={
             "event": "voice_agent.transcription.success",
-            "provider": "elevenlabs",
+            "provider": stt_router.primary_name,
             "char_length": len(transcript),
         },
     )
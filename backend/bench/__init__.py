@@ -0,0 +1 @@
+"""Offline load benchmark for the voice intake pipeline (``python -m bench.run``)."""
@@ -0,0 +1,145 @@
+"""Local stand-ins for the ElevenLabs STT and Gemini REST APIs.
+
+Both servers answer after a latency drawn from a log-normal distribution and
+fail a configurable fraction of requests with ``503``, so the benchmark can
+reproduce provider tail latency and flakiness without network access.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+_FIRST_NAMES = ("Alice", "Bruno", "Chloe", "Dmitri", "Elena", "Farid", "Grace", "Hiro")
+_LAST_NAMES = ("Nguyen", "Tremblay", "Okafor", "Rossi", "Kowalski", "Haddad", "Silva", "Berg")
+_STREETS = ("Maple Avenue", "Rue Saint-Denis", "Oak Street", "Park Road")
+_SINGLE_INPUT_RE = re.compile(r'Input text:\n"""(?P<text>.*?)"""', re.DOTALL)
+_BATCH_INPUT_RE = re.compile(r"Inputs:\n(?P<inputs>\[.*?\])\n\n", re.DOTALL)
+
+
+@dataclass
+class LatencyModel:
+    """Log-normal latency with a median in milliseconds plus an error rate."""
+
+    median_ms: float = 0.0
+    sigma: float = 0.0
+    error_rate: float = 0.0
+
+    def sample_seconds(self) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        return self.median_ms / 1000 * random.lognormvariate(0, self.sigma)
+
+    def fails(self) -> bool:
+        return random.random() < self.error_rate
+
+    async def wait(self) -> None:
+        delay = self.sample_seconds()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def transcript_for(audio: bytes) -> str:
+    """Deterministic scripted introduction derived from the audio bytes."""
+    digest = hashlib.sha256(audio).digest()
+    phone = "514" + "".join(str(byte % 10) for byte in digest[:7])
+    return (
+        f"My name is {_FIRST_NAMES[digest[7] % len(_FIRST_NAMES)]} "
+        f"{_LAST_NAMES[digest[8] % len(_LAST_NAMES)]}, my phone number is "
+        f"{phone[:3]} {phone[3:6]} {phone[6:]} and I live at "
+        f"{digest[9] + 1} {_STREETS[digest[10] % len(_STREETS)]}."
+    )
+
+
+def stt_app(latency: LatencyModel) -> Starlette:
+    """ElevenLabs-compatible ``POST /v1/speech-to-text``."""
+
+    async def speech_to_text(request: Request) -> JSONResponse:
+        body = await request.body()
+        await latency.wait()
+        if latency.fails():
+            return JSONResponse({"detail": "fake STT overloaded"}, status_code=503)
+        return JSONResponse({"text": transcript_for(body)})
+
+    return Starlette(routes=[Route("/v1/speech-to-text", speech_to_text, methods=["POST"])])
+
+
+def _extract(text: str) -> dict:
+    # Imported lazily: app modules read their settings from the environment at import.
+    from app.fast_extractor import extract_fast
+
+    return dict(extract_fast(text).fields)
+
+
+def gemini_app(latency: LatencyModel) -> Starlette:
+    """Gemini REST-compatible ``POST /v1beta/models/{model}:generateContent``."""
+
+    async def generate_content(request: Request) -> JSONResponse:
+        payload = await request.json()
+        prompt = payload["contents"][0]["parts"][0]["text"]
+        await latency.wait()
+        if latency.fails():
+            return JSONResponse({"error": {"code": 503, "message": "fake Gemini overloaded"}}, status_code=503)
+
+        batch = _BATCH_INPUT_RE.search(prompt)
+        if batch:
+            result = [{"id": item["id"], **_extract(item["text"])} for item in json.loads(batch["inputs"])]
+        else:
+            single = _SINGLE_INPUT_RE.search(prompt)
+            result = _extract(single["text"] if single else "")
+        return JSONResponse(
+            {"candidates": [{"content": {"parts": [{"text": json.dumps(result)}]}}]}
+        )
+
+    return Starlette(
+        routes=[Route("/v1beta/models/{model}:generateContent", generate_content, methods=["POST"])]
+    )
+
+
+class GeminiAPIError(RuntimeError):
+    """Mirrors google.api_core errors closely enough for the app's classification."""
+
+    def __init__(self, code: int, text: str) -> None:
+        super().__init__(f"{code}: {text}")
+        self.code = code
+        self.response = SimpleNamespace(text=text)
+
+
+def http_gemini_model(base_url: str):
+    """Build a ``GenerativeModel`` replacement that calls the fake Gemini server.
+
+    The app talks to Gemini through the SDK; the benchmark swaps the SDK model
+    class for this thin REST client so each extraction is a real HTTP round
+    trip to :func:`gemini_app`.
+    """
+    clients: dict[int, httpx.AsyncClient] = {}
+
+    class HttpGenerativeModel:
+        def __init__(self, model_name: str, generation_config: dict | None = None, **_: object) -> None:
+            self.model_name = model_name
+
+        async def generate_content_async(self, prompt: str):
+            loop_id = id(asyncio.get_running_loop())
+            client = clients.get(loop_id)
+            if client is None:
+                client = clients[loop_id] = httpx.AsyncClient(base_url=base_url, timeout=120)
+            resp = await client.post(
+                f"/v1beta/models/{self.model_name}:generateContent",
+                json={"contents": [{"parts": [{"text": prompt}]}]},
+            )
+            if resp.status_code >= 400:
+                raise GeminiAPIError(resp.status_code, resp.text)
+            text = resp.json()["candidates"][0]["content"]["parts"][0]["text"]
+            return SimpleNamespace(text=text)
+
+    return HttpGenerativeModel
@@ -0,0 +1,335 @@
+"""Drive the real app against fake providers at fixed concurrency levels.
+
+Usage (from ``backend/``)::
+
+    python -m bench.run --concurrency 1,8,32 --requests 100 --output bench/latest.json
+    python -m bench.run --baseline bench/baseline.json   # exit 1 on regression
+
+The app, the fake ElevenLabs server and the fake Gemini server each run in
+their own uvicorn thread; the load generator runs on the main thread. Each
+level reports client-side throughput and latency percentiles, per-stage and
+per-statement percentiles from the app's own metrics, and process memory.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import io
+import json
+import os
+import platform
+import resource
+import socket
+import sys
+import tempfile
+import threading
+import time
+import types
+import wave
+from pathlib import Path
+from typing import Any
+
+import httpx
+import numpy as np
+import uvicorn
+
+from .fake_providers import LatencyModel, gemini_app, http_gemini_model, stt_app
+
+PERCENTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+
+# -- servers ----------------------------------------------------------------
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class _ServerThread:
+    """Run an ASGI app under uvicorn in a background thread with its own loop."""
+
+    def __init__(self, app: Any, *, limit_concurrency: int | None = None) -> None:
+        self.port = _free_port()
+        config = uvicorn.Config(
+            app,
+            host="127.0.0.1",
+            port=self.port,
+            log_level="warning",
+            access_log=False,
+            limit_concurrency=limit_concurrency,
+        )
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "_ServerThread":
+        self.thread.start()
+        deadline = time.monotonic() + 15
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("benchmark server failed to start")
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def _load_app(workdir: Path, stt_url: str, gemini_url: str, fast_path: bool):
+    """Import ``app.main`` configured for the benchmark (env is read at import time)."""
+    os.environ.update(
+        {
+            "DATABASE_URL": f"sqlite:///{workdir / 'bench.db'}",
+            "ELEVENLABS_API_KEY": "bench",
+            "ELEVENLABS_STT_URL": f"{stt_url}/v1/speech-to-text",
+            "GEMINI_API_KEY": "bench",
+            "INTAKE_JOB_WORKERS": "0",
+            "INTAKE_JOB_STORAGE_DIR": str(workdir / "uploads"),
+            "FAST_PATH_ENABLED": "true" if fast_path else "false",
+            "BACKEND_LOG_LEVEL": os.environ.get("BACKEND_LOG_LEVEL", "WARNING"),
+        }
+    )
+    model_class = http_gemini_model(gemini_url)
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        # The SDK is only a transport here; provide just enough of its surface offline.
+        genai = types.ModuleType("google.generativeai")
+        genai.configure = lambda **_: None
+        google = sys.modules.setdefault("google", types.ModuleType("google"))
+        google.generativeai = genai
+        sys.modules["google.generativeai"] = genai
+    genai.GenerativeModel = model_class
+    return importlib.import_module("app.main").app
+
+
+# -- load generation ----------------------------------------------------------
+
+
+def _make_recordings(
+    count: int, *, seed: int, seconds: float = 2.0, rate: int = 16000
+) -> list[bytes]:
+    """Unique speech-like WAVs so neither the transcript cache nor the memo hits."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    recordings = []
+    for _ in range(count):
+        signal = envelope * 0.3 * np.sin(2 * np.pi * rng.uniform(120, 240) * t)
+        signal += rng.normal(0, 0.01, t.size)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(rate)
+            writer.writeframes((np.clip(signal, -1, 1) * 32767).astype("<i2").tobytes())
+        recordings.append(buffer.getvalue())
+    return recordings
+
+
+async def _drive(base_url: str, recordings: list[bytes], concurrency: int) -> dict[str, Any]:
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    queue: asyncio.Queue[bytes] = asyncio.Queue()
+    for recording in recordings:
+        queue.put_nowait(recording)
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while True:
+            try:
+                audio = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                resp = await client.post(
+                    "/voice-input", files={"file": ("bench.wav", audio, "audio/wav")}
+                )
+                status = str(resp.status_code)
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            elapsed = time.perf_counter() - started
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "201":
+                latencies.append(elapsed)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "requests": len(recordings),
+        "statuses": statuses,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "latency": {
+            name: round(ordered[min(int(q * len(ordered)), len(ordered) - 1)], 4) if ordered else None
+            for name, q in PERCENTILES.items()
+        },
+    }
+
+
+# -- reporting -------------------------------------------------------------------
+
+
+def _histogram_summary(histogram, group_by: str, **fixed: str) -> dict[str, dict[str, float | None]]:
+    summary = {}
+    for labels in histogram.label_sets():
+        if any(labels.get(name) != value for name, value in fixed.items()):
+            continue
+        summary[labels[group_by]] = {
+            name: _round(histogram.quantile(q, **labels)) for name, q in PERCENTILES.items()
+        }
+        summary[labels[group_by]]["count"] = histogram.count(**labels)
+    return summary
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 5)
+
+
+def _memory() -> dict[str, float]:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":  # pragma: no cover - bytes on macOS
+        peak_kb //= 1024
+    current_mb = None
+    try:
+        with open("/proc/self/statm") as statm:
+            current_mb = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:  # pragma: no cover - non-Linux
+        pass
+    return {"rss_mb": _round(current_mb), "peak_rss_mb": round(peak_kb / 1024, 2)}
+
+
+def compare(current: dict, baseline: dict, *, tolerance: float, min_delta: float = 0.005) -> list[str]:
+    """Return human-readable regressions of ``current`` against ``baseline``.
+
+    Throughput may drop and latencies may grow by ``tolerance`` (a fraction);
+    latency differences under ``min_delta`` seconds are treated as noise.
+    """
+    regressions = []
+    baseline_levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    for level in current["levels"]:
+        base = baseline_levels.get(level["concurrency"])
+        if base is None:
+            continue
+        prefix = f"c={level['concurrency']}"
+        if level["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{prefix} throughput {level['throughput_rps']} < {base['throughput_rps']} rps"
+            )
+
+        def check(label: str, now: float | None, before: float | None) -> None:
+            if now is None or before is None:
+                return
+            if now > before * (1 + tolerance) and now - before > min_delta:
+                regressions.append(f"{prefix} {label} {now:.4f}s > {before:.4f}s")
+
+        for name in PERCENTILES:
+            check(f"latency {name}", level["latency"][name], base["latency"][name])
+        for stage, stats in level["stages"].items():
+            check(f"stage {stage} p95", stats["p95"], base["stages"].get(stage, {}).get("p95"))
+    return regressions
+
+
+def _print_report(results: dict) -> None:
+    for level in results["levels"]:
+        latency = level["latency"]
+        print(
+            f"concurrency={level['concurrency']:>3}  {level['throughput_rps']:>8.2f} rps  "
+            f"p50={latency['p50']}s p95={latency['p95']}s p99={latency['p99']}s  "
+            f"statuses={level['statuses']}  peak_rss={level['memory']['peak_rss_mb']}MB"
+        )
+        for stage, stats in level["stages"].items():
+            print(f"    {stage:<14} p50={stats['p50']} p95={stats['p95']} p99={stats['p99']}")
+
+
+def run(args: argparse.Namespace) -> dict:
+    stt_latency = LatencyModel(args.stt_latency_ms, args.stt_sigma, args.stt_error_rate)
+    gemini_latency = LatencyModel(args.gemini_latency_ms, args.gemini_sigma, args.gemini_error_rate)
+    levels = [int(value) for value in args.concurrency.split(",")]
+
+    with tempfile.TemporaryDirectory(prefix="voice-bench-") as tmp, _ServerThread(
+        stt_app(stt_latency)
+    ) as stt_server, _ServerThread(gemini_app(gemini_latency)) as gemini_server:
+        app = _load_app(Path(tmp), stt_server.url, gemini_server.url, args.fast_path)
+        from app import metrics
+
+        with _ServerThread(app) as app_server:
+            results = {
+                "config": {
+                    key: value for key, value in vars(args).items()
+                    if key not in {"baseline", "output", "write_baseline"}
+                },
+                "environment": {"python": platform.python_version(), "platform": platform.platform()},
+                "levels": [],
+            }
+            for index, concurrency in enumerate(levels):
+                metrics.registry.reset()
+                recordings = _make_recordings(args.requests, seed=index)
+                level = {"concurrency": concurrency}
+                level.update(asyncio.run(_drive(app_server.url, recordings, concurrency)))
+                level["stages"] = _histogram_summary(metrics.STAGE_SECONDS, "stage", outcome="success")
+                level["providers"] = _histogram_summary(
+                    metrics.PROVIDER_REQUEST_SECONDS, "provider", outcome="success"
+                )
+                level["db"] = _histogram_summary(metrics.DB_QUERY_SECONDS, "statement")
+                level["memory"] = _memory()
+                results["levels"].append(level)
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline voice intake benchmark")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--stt-latency-ms", type=float, default=400)
+    parser.add_argument("--stt-sigma", type=float, default=0.4, help="Log-normal spread of STT latency")
+    parser.add_argument("--stt-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-latency-ms", type=float, default=600)
+    parser.add_argument("--gemini-sigma", type=float, default=0.4)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--fast-path", action="store_true", help="Let the rule-based extractor skip Gemini"
+    )
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Compare against this results JSON; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    parser.add_argument(
+        "--write-baseline", action="store_true", help="Also overwrite --baseline with these results"
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    _print_report(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+
+    status = 0
+    if args.baseline:
+        baseline_path = Path(args.baseline)
+        if args.write_baseline or not baseline_path.exists():
+            baseline_path.write_text(json.dumps(results, indent=2) + "\n")
+            print(f"Wrote baseline {baseline_path}")
+        else:
+            regressions = compare(
+                results, json.loads(baseline_path.read_text()), tolerance=args.tolerance
+            )
+            for line in regressions:
+                print(f"REGRESSION {line}")
+            status = 1 if regressions else 0
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,6 +13,8 @@ from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
 os.environ.setdefault("GEMINI_API_KEY", "test-key")
+# Tests drive intake jobs explicitly via ``run_once``; no background workers.
+os.environ.setdefault("INTAKE_JOB_WORKERS", "0")
 
 if "google.generativeai" not in sys.modules:
     google_module = types.ModuleType("google")
@@ -25,6 +27,9 @@ if "google.generativeai" not in sys.modules:
         def generate_content(self, *args, **kwargs):
             raise RuntimeError("Gemini model is stubbed for tests")
 
+        async def generate_content_async(self, *args, **kwargs):
+            raise RuntimeError("Gemini model is stubbed for tests")
+
     def _configure(**kwargs):
         return None
 
@@ -37,8 +42,11 @@ if "google.generativeai" not in sys.modules:
 
 deps_utils.ensure_multipart_is_installed = lambda: None  # type: ignore
 
+from app import db_writer
 from app.database import Base, get_db, init_db
+from app.db_writer import PatientWriter
 from app.main import app
+from app.patient_cache import patient_cache
 
 
 @pytest.fixture(scope="session")
@@ -71,10 +79,22 @@ def db_session(session_factory) -> Generator[Session, None, None]:
             session.execute(table.delete())
         session.commit()
         session.close()
+        # The cleanup above bypasses crud, and ids restart in the next test.
+        patient_cache.clear()
+
+
+@pytest.fixture()
+def patient_writer(session_factory, monkeypatch) -> Generator[PatientWriter, None, None]:
+    writer = PatientWriter(session_factory)
+    monkeypatch.setattr(db_writer, "patient_writer", writer)
+    try:
+        yield writer
+    finally:
+        writer.stop()
 
 
 @pytest.fixture()
-def client(db_session: Session) -> Generator[TestClient, None, None]:
+def client(db_session: Session, patient_writer: PatientWriter) -> Generator[TestClient, None, None]:
     def override_get_db():
         try:
             yield db_session
@@ -0,0 +1,131 @@
+import asyncio
+import gc
+import json
+
+import pytest
+
+from app import ai_parser
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+@pytest.fixture()
+def fake_gemini(monkeypatch):
+    calls = []
+
+    class _FakeModel:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        async def generate_content_async(self, prompt):
+            calls.append(prompt)
+            return _FakeResponse(
+                json.dumps(
+                    {
+                        "first_name": "Alice",
+                        "last_name": "Nguyen",
+                        "phone_number": "5145550100",
+                        "address": "123 Maple Avenue",
+                    }
+                )
+            )
+
+    monkeypatch.setattr(ai_parser.genai, "GenerativeModel", _FakeModel)
+    ai_parser.extraction_memo.clear()
+    yield calls
+    ai_parser.extraction_memo.clear()
+
+
+def test_normalize_transcript_collapses_whitespace():
+    assert ai_parser.normalize_transcript("  My  name\nis   Alice ") == "My name is Alice"
+
+
+def test_parse_patient_details_memoizes_normalized_transcript(fake_gemini):
+    first = asyncio.run(ai_parser.parse_patient_details("My name is Alice Nguyen"))
+    first["first_name"] = "mutated"
+    second = asyncio.run(ai_parser.parse_patient_details("  My name is   Alice Nguyen\n"))
+
+    assert len(fake_gemini) == 1
+    assert second["first_name"] == "Alice"
+    assert ai_parser.extraction_memo.stats()["hits"] == 1
+
+
+def test_extraction_memo_evicts_least_recently_used():
+    memo = ai_parser.ExtractionMemo(max_entries=1)
+    memo.put(memo.key("a"), {"first_name": "A"})
+    memo.put(memo.key("b"), {"first_name": "B"})
+
+    assert memo.get(memo.key("a")) is None
+    assert memo.get(memo.key("b")) == {"first_name": "B"}
+
+
+def _install_batch_model(monkeypatch, *, fail_batches=False):
+    prompts = []
+
+    class _FakeModel:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        async def generate_content_async(self, prompt):
+            prompts.append(prompt)
+            if "Inputs:\n" in prompt:
+                if fail_batches:
+                    raise RuntimeError("batch rejected")
+                items = json.loads(prompt.split("Inputs:\n", 1)[1].split("\n", 1)[0])
+                return _FakeResponse(
+                    json.dumps([{"id": item["id"], "first_name": item["text"]} for item in items])
+                )
+            text = prompt.split('"""')[1]
+            return _FakeResponse(json.dumps({"first_name": text}))
+
+    monkeypatch.setattr(ai_parser.genai, "GenerativeModel", _FakeModel)
+    return prompts
+
+
+def test_extraction_batcher_groups_concurrent_calls(monkeypatch):
+    prompts = _install_batch_model(monkeypatch)
+    batcher = ai_parser.ExtractionBatcher(window_seconds=0.01, max_batch_size=3)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(name) for name in ["a", "b", "c"]))
+
+    results = asyncio.run(scenario())
+
+    assert [r["first_name"] for r in results] == ["a", "b", "c"]
+    assert len(prompts) == 1
+    assert batcher.stats()["batches"] == 1
+
+
+def test_extraction_batcher_falls_back_to_single_calls(monkeypatch):
+    prompts = _install_batch_model(monkeypatch, fail_batches=True)
+    batcher = ai_parser.ExtractionBatcher(window_seconds=0.01, max_batch_size=8)
+
+    async def scenario():
+        return await asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+
+    results = asyncio.run(scenario())
+
+    assert [r["first_name"] for r in results] == ["a", "b"]
+    assert len(prompts) == 3
+    assert batcher.stats()["fallbacks"] == 2
+
+
+def test_extraction_batcher_keeps_batches_alive_until_done(monkeypatch):
+    _install_batch_model(monkeypatch)
+    batcher = ai_parser.ExtractionBatcher(window_seconds=0.01, max_batch_size=2)
+
+    async def scenario():
+        calls = asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+        await asyncio.sleep(0)
+        in_flight = batcher.stats()["in_flight"]
+        gc.collect()
+        return in_flight, await calls
+
+    in_flight, results = asyncio.run(scenario())
+
+    assert in_flight == 1
+    assert [r["first_name"] for r in results] == ["a", "b"]
+    assert batcher.stats()["in_flight"] == 0
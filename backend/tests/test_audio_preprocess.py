@@ -0,0 +1,83 @@
+import asyncio
+import io
+import wave
+
+import numpy as np
+from starlette.datastructures import Headers, UploadFile
+
+from app.audio_preprocess import decode_wav, encode_wav, preprocess_upload, trim_silence
+
+
+def make_wav(*, rate=48000, channels=2, silence_s=1.0, tone_s=1.0) -> bytes:
+    t = np.arange(int(rate * tone_s)) / rate
+    tone = 0.5 * np.sin(2 * np.pi * 440 * t)
+    silence = np.zeros(int(rate * silence_s))
+    mono = np.concatenate([silence, tone, silence])
+    frames = np.repeat(mono[:, None], channels, axis=1)
+    pcm = (frames * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def _upload(data: bytes, content_type: str, filename: str) -> UploadFile:
+    return UploadFile(
+        file=io.BytesIO(data),
+        filename=filename,
+        headers=Headers({"content-type": content_type}),
+    )
+
+
+def test_preprocess_wav_downmixes_resamples_and_trims():
+    original = make_wav()
+
+    result = asyncio.run(preprocess_upload(_upload(original, "audio/wav", "take.wav")))
+
+    assert result.stage == "wav"
+    assert result.bytes_in == len(original)
+    assert result.bytes_out < result.bytes_in / 6
+    processed = asyncio.run(result.file.read())
+    samples, rate = decode_wav(processed)
+    assert rate == 16000
+    assert samples.shape[1] == 1
+    assert 1.0 <= samples.shape[0] / rate < 1.5
+    assert result.file.filename == "take.wav"
+    asyncio.run(result.aclose())
+    assert result.file.file.closed
+
+
+def test_preprocess_result_leaves_the_original_upload_open(monkeypatch):
+    monkeypatch.setattr("app.audio_preprocess.shutil.which", lambda _: None)
+    upload = _upload(b"webm-bytes", "audio/webm", "take.webm")
+
+    async def scenario():
+        result = await preprocess_upload(upload)
+        await result.aclose()
+
+    asyncio.run(scenario())
+
+    assert not upload.file.closed
+
+
+def test_preprocess_passes_through_unsupported_formats(monkeypatch):
+    monkeypatch.setattr("app.audio_preprocess.shutil.which", lambda _: None)
+    upload = _upload(b"webm-bytes", "audio/webm", "take.webm")
+
+    result = asyncio.run(preprocess_upload(upload))
+
+    assert result.stage is None
+    assert result.file is upload
+    assert result.bytes_in == result.bytes_out == len(b"webm-bytes")
+
+
+def test_trim_silence_keeps_voiced_region():
+    rate = 16000
+    samples, _ = decode_wav(encode_wav(np.concatenate([np.zeros(rate), np.full(rate, 0.3)]), rate))
+
+    trimmed = trim_silence(samples[:, 0], rate, padding_ms=0)
+
+    assert abs(trimmed.size - rate) <= rate * 0.02
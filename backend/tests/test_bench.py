@@ -0,0 +1,57 @@
+import copy
+
+import pytest
+
+from app.fast_extractor import extract_fast
+from app.metrics import MetricsRegistry
+from bench.fake_providers import LatencyModel, transcript_for
+from bench.run import compare
+
+
+def _results(rps=10.0, p95=1.0, stage_p95=0.5):
+    return {
+        "levels": [
+            {
+                "concurrency": 4,
+                "throughput_rps": rps,
+                "latency": {"p50": 0.5, "p95": p95, "p99": p95},
+                "stages": {"transcription": {"p50": 0.2, "p95": stage_p95, "p99": stage_p95}},
+            }
+        ]
+    }
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = _results()
+
+    assert compare(copy.deepcopy(baseline), baseline, tolerance=0.1) == []
+    assert compare(_results(rps=9.5, p95=1.05), baseline, tolerance=0.1) == []
+
+    regressions = compare(_results(rps=8.0, p95=1.5, stage_p95=0.8), baseline, tolerance=0.1)
+    assert len(regressions) == 4
+    assert regressions[0].startswith("c=4 throughput")
+
+
+def test_fake_stt_transcripts_are_deterministic_and_parseable():
+    transcript = transcript_for(b"audio-1")
+
+    assert transcript == transcript_for(b"audio-1")
+    assert transcript != transcript_for(b"audio-2")
+    assert extract_fast(transcript).is_confident()
+
+
+def test_latency_model_median_and_errors():
+    assert LatencyModel().sample_seconds() == 0
+    model = LatencyModel(median_ms=100, sigma=0.0, error_rate=1.0)
+    assert model.sample_seconds() == pytest.approx(0.1)
+    assert model.fails()
+
+
+def test_histogram_quantile_interpolates_within_buckets():
+    histogram = MetricsRegistry().histogram("q_seconds", "Q.", buckets=(1, 2, 4))
+    for value in (0.5, 1.5, 1.5, 3):
+        histogram.observe(value)
+
+    assert histogram.quantile(0.5) == pytest.approx(1.5)
+    assert histogram.quantile(1.0) == pytest.approx(4)
+    assert MetricsRegistry().histogram("empty", "E.").quantile(0.5) is None
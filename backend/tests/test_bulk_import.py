@@ -0,0 +1,97 @@
+import io
+from concurrent.futures import Future
+
+from app.bulk_import import import_records
+
+
+def _rows(count: int) -> bytes:
+    return "".join(
+        f'{{"first_name":"A","last_name":"B","phone_number":"51455{i:05d}","address":"1 Main"}}\n'
+        for i in range(count)
+    ).encode()
+
+
+def _recording_writer(batches: list[list[dict]]):
+    def write(rows: list[dict]) -> Future:
+        batches.append(rows)
+        future: Future = Future()
+        future.set_result(len(rows))
+        return future
+
+    return write
+
+
+def test_import_records_writes_fixed_size_batches():
+    batches: list[list[dict]] = []
+
+    report = import_records(io.BytesIO(_rows(5)), "ndjson", _recording_writer(batches), batch_size=2)
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert report.imported == 5
+    assert batches[0][0]["phone_number"] == "5145500000"
+
+
+def test_import_records_reports_undecodable_ndjson_line():
+    report = import_records(
+        io.BytesIO(_rows(1) + b'{"first_name":"\xff"}\n'), "ndjson", _recording_writer([])
+    )
+
+    assert report.imported == 1
+    assert report.errors == [{"line": 2, "error": "invalid_row", "message": "invalid UTF-8"}]
+
+
+def test_import_records_reports_where_a_fatal_error_stopped_it():
+    batches: list[list[dict]] = []
+    body = io.BytesIO(
+        b"first_name,last_name,phone_number,address\n"
+        + b"".join(b"A,B,514555000%d,1 Main\n" % i for i in range(3))
+        + b"\xff,B,5145550002,1 Main\n"
+    )
+
+    report = import_records(body, "csv", _recording_writer(batches), batch_size=2)
+
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert report.imported == 3
+    assert report.aborted_at_line == 5
+    assert "Line 5" in report.fatal_error
+
+
+def test_import_records_caps_error_list():
+    body = io.BytesIO(b"{}\n" * 5)
+
+    report = import_records(body, "ndjson", _recording_writer([]), max_errors=2)
+
+    assert report.failed == 5
+    assert report.to_dict()["errors_truncated"] is True
+    assert len(report.errors) == 2
+
+
+def test_import_records_rejects_repeated_phone_within_a_batch():
+    batches: list[list[dict]] = []
+    body = io.BytesIO(_rows(1) + _rows(1).replace(b'"A"', b'"Z"'))
+
+    report = import_records(body, "ndjson", _recording_writer(batches))
+
+    assert [row["first_name"] for row in batches[0]] == ["A"]
+    assert report.errors == [{"line": 2, "error": "duplicate_phone", "first_line": 1}]
+
+
+def test_import_records_reports_a_failed_write_instead_of_raising():
+    batches: list[list[dict]] = []
+    record = _recording_writer(batches)
+
+    def write(rows: list[dict]) -> Future:
+        if batches:
+            future: Future = Future()
+            future.set_exception(RuntimeError("disk I/O error"))
+            batches.append(rows)
+            return future
+        return record(rows)
+
+    report = import_records(io.BytesIO(_rows(5)), "ndjson", write, batch_size=2)
+
+    assert [len(batch) for batch in batches] == [2, 2]
+    assert report.imported == 2
+    assert report.write_failed is True
+    assert report.aborted_at_line == 3
+    assert "disk I/O error" in report.fatal_error
@@ -1,4 +1,9 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
 from app import crud, schemas
+from app.database import init_db
 from . import factories
 
 
@@ -35,3 +40,146 @@ def test_list_patients_orders_by_newest(db_session):
 
     assert results[0].id == newer.id
     assert results[1].id == older.id
+
+
+def test_list_patients_page_walks_keyset_cursor(db_session):
+    created = [factories.create_patient(db_session) for _ in range(5)]
+    expected_ids = [patient.id for patient in reversed(created)]
+
+    first_page, cursor = crud.list_patients_page(db_session, limit=2)
+    second_page, cursor_2 = crud.list_patients_page(db_session, limit=2, cursor=cursor)
+    last_page, cursor_3 = crud.list_patients_page(db_session, limit=2, cursor=cursor_2)
+
+    seen = [p.id for p in first_page + second_page + last_page]
+    assert seen == expected_ids
+    assert cursor_3 is None
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        crud.decode_cursor("not-a-cursor")
+    assert crud.decode_cursor(crud.encode_cursor(42)) == 42
+
+
+def test_upsert_patient_keeps_details_when_asked(db_session):
+    payload = factories.patient_payload(first_name="Alice", phone_number="5145550000")
+    crud.create_patient(db_session, schemas.PatientCreate(**payload))
+
+    renamed = schemas.PatientCreate(**(payload | {"first_name": "Alicia"}))
+    saved = crud.upsert_patient(db_session, renamed, update_details=False)
+
+    assert saved.first_name == "Alice"
+    assert saved.new_patient is False
+
+
+def test_returning_visit_upsert_is_a_single_statement(db_session, engine):
+    payload = factories.patient_payload(phone_number="5145551111")
+    crud.create_patient(db_session, schemas.PatientCreate(**payload))
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        saved = crud.upsert_patient(db_session, schemas.PatientCreate(**payload), update_details=False)
+        assert saved.new_patient is False
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+    assert len(statements) == 1
+    assert statements[0].lstrip().upper().startswith("INSERT")
+
+
+def test_search_patients_matches_name_and_address_prefixes(db_session):
+    factories.create_patient(db_session, first_name="Hélène", last_name="Tremblay", address="12 Maple Ave")
+    factories.create_patient(db_session, first_name="Maple", last_name="Roy", address="9 Oak St")
+    factories.create_patient(db_session, first_name="Ben", last_name="Okafor", address="3 Pine Rd")
+
+    assert [p.first_name for p in crud.search_patients(db_session, "helene trem")] == ["Hélène"]
+    # The name match outranks the address match.
+    assert [p.first_name for p in crud.search_patients(db_session, "maple")] == ["Maple", "Hélène"]
+    assert crud.search_patients(db_session, "!!!") == []
+
+
+def test_search_index_follows_updates(db_session):
+    payload = factories.patient_payload(first_name="Olivia")
+    crud.create_patient(db_session, schemas.PatientCreate(**payload))
+    crud.create_patient(db_session, schemas.PatientCreate(**(payload | {"first_name": "Olive"})))
+
+    assert [p.first_name for p in crud.search_patients(db_session, "olive")] == ["Olive"]
+    assert crud.search_patients(db_session, "olivia") == []
+
+
+def test_search_patients_by_phone_prefix_pages_in_phone_order(db_session):
+    for suffix in ("03", "01", "02"):
+        factories.create_patient(db_session, phone_number=f"43855500{suffix}")
+    factories.create_patient(db_session, phone_number="4385560000")
+
+    first, cursor = crud.search_patients_page(db_session, "(438) 555-00", limit=2)
+    second, last_cursor = crud.search_patients_page(db_session, "438 555 00", limit=2, cursor=cursor)
+
+    assert [p.phone_number for p in first + second] == ["4385550001", "4385550002", "4385550003"]
+    assert last_cursor is None
+
+
+def test_broad_search_falls_back_to_newest_first(db_session, monkeypatch):
+    monkeypatch.setattr(crud, "SEARCH_RANK_LIMIT", 2)
+    created = [factories.create_patient(db_session, address=f"{n} Main St") for n in range(3)]
+
+    results = crud.search_patients(db_session, "main")
+
+    assert [p.id for p in results] == [p.id for p in reversed(created)]
+
+
+def test_change_seq_only_moves_when_a_row_changes(db_session):
+    payload = factories.patient_payload()
+    patient_id = crud.create_patient(db_session, schemas.PatientCreate(**payload)).id
+    factories.create_patient(db_session)
+    since = crud.current_change_seq(db_session)
+
+    # The first return visit flips new_patient; repeating it changes nothing.
+    flipped = crud.create_patient(db_session, schemas.PatientCreate(**payload)).change_seq
+    repeated = crud.create_patient(db_session, schemas.PatientCreate(**payload)).change_seq
+    added = factories.patient_payload()
+    crud.upsert_patients(db_session, [payload, added])
+    db_session.commit()
+
+    changes, next_since, has_more = crud.list_changes(db_session, since=since)
+    assert flipped == repeated == since + 1
+    added_id = crud.get_patient_by_phone(db_session, added["phone_number"]).id
+    assert [patient.id for patient in changes] == [patient_id, added_id]
+    assert next_since == crud.current_change_seq(db_session) == since + 2
+    assert has_more is False
+    assert crud.list_changes(db_session, since=next_since) == ([], next_since, False)
+
+
+def test_list_changes_pages_by_sequence(db_session):
+    patients = [factories.create_patient(db_session) for _ in range(3)]
+
+    page, next_since, has_more = crud.list_changes(db_session, since=0, limit=2)
+    rest, _, done = crud.list_changes(db_session, since=next_since, limit=2)
+
+    assert [p.id for p in page + rest] == [p.id for p in patients]
+    assert has_more is True and done is False
+
+
+def test_init_db_numbers_existing_rows_for_delta_sync():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE patients (id INTEGER PRIMARY KEY, first_name VARCHAR NOT NULL, "
+            "last_name VARCHAR NOT NULL, phone_number VARCHAR NOT NULL, address VARCHAR NOT NULL, "
+            "new_patient BOOLEAN NOT NULL)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO patients VALUES (7, 'Ada', 'Roy', '5145550000', '1 Main St', 1)"
+        )
+
+    init_db(engine_override=engine)
+
+    with Session(engine) as db:
+        changes, next_since, _ = crud.list_changes(db, since=0)
+        assert [patient.id for patient in changes] == [7]
+        assert next_since == 7
+    engine.dispose()
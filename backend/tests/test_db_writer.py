@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from app import schemas
+from app.database import configure_sqlite, init_db
+from app.db_writer import PatientWriter
+from . import factories
+
+
+@pytest.fixture()
+def writer(session_factory, db_session):
+    writer = PatientWriter(session_factory, max_batch_size=16, max_wait=0.05)
+    yield writer
+    writer.stop()
+
+
+def _patient(**overrides):
+    return schemas.PatientCreate(**factories.patient_payload(**overrides))
+
+
+def test_concurrent_upserts_share_one_commit(writer):
+    patients = [_patient() for _ in range(8)]
+
+    async def scenario():
+        return await asyncio.gather(*(writer.upsert(patient) for patient in patients))
+
+    rows = asyncio.run(scenario())
+
+    assert [row.phone_number for row in rows] == [patient.phone_number for patient in patients]
+    assert all(row.id and row.new_patient for row in rows)
+    assert writer.batches == 1
+    assert writer.stats()["avg_batch_size"] == 8
+
+
+def test_duplicate_phone_within_a_batch_is_a_returning_patient(writer):
+    first = _patient(first_name="First")
+    again = _patient(first_name="Again", phone_number=first.phone_number)
+
+    async def scenario():
+        return await asyncio.gather(
+            writer.upsert(first), writer.upsert(again, update_details=False)
+        )
+
+    created, returning = asyncio.run(scenario())
+
+    assert returning.id == created.id
+    assert returning.new_patient is False
+    assert returning.first_name == "First"
+
+
+def test_failing_write_does_not_abort_the_batch(writer, db_session):
+    def broken(db):
+        raise ValueError("bad row")
+
+    async def scenario():
+        return await asyncio.gather(
+            writer.run(broken), writer.upsert(_patient()), return_exceptions=True
+        )
+
+    error, row = asyncio.run(scenario())
+
+    assert isinstance(error, ValueError)
+    assert db_session.get(type(row), row.id) is not None
+
+
+def test_sqlite_connections_use_wal_and_busy_timeout(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'wal.db'}")
+    configure_sqlite(engine)
+
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    engine.dispose()
+
+
+def test_batch_is_committed_once_despite_per_request_savepoints(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'batch.db'}", connect_args={"check_same_thread": False}
+    )
+    configure_sqlite(engine)
+    init_db(engine_override=engine)
+    commits = []
+
+    @event.listens_for(engine, "commit")
+    def _record_commit(connection):
+        commits.append("COMMIT")
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _record_implicit_commit(connection, cursor, statement, *args):
+        # A savepoint opened outside a transaction commits when released.
+        released = statement.startswith("RELEASE SAVEPOINT")
+        if released and not connection.connection.dbapi_connection.in_transaction:
+            commits.append(statement)
+
+    writer = PatientWriter(sessionmaker(bind=engine), max_batch_size=16, max_wait=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(writer.upsert(_patient()) for _ in range(8)))
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        writer.stop()
+        engine.dispose()
+
+    assert writer.batches == 1
+    assert commits == ["COMMIT"]
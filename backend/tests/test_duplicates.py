@@ -0,0 +1,72 @@
+import asyncio
+
+from app import crud, duplicates, models, schemas
+from app.intake import save_intake
+from . import factories
+
+
+def test_soundex_matches_common_transcription_variants():
+    assert duplicates.soundex("Robert") == duplicates.soundex("Rupert") == "R163"
+    assert duplicates.soundex("Tymczak") == "T522"
+    assert duplicates.soundex("Pfister") == "P236"
+    assert duplicates.soundex("Hélène") == duplicates.soundex("Helene")
+    assert duplicates.soundex("42") == ""
+
+
+def test_phone_keys_share_a_key_within_one_edit():
+    base = duplicates.phone_keys("5145550123")
+    for near in ("5145550128", "5145551023", "514555012", "15145550123"):
+        assert base & duplicates.phone_keys(near), near
+    assert not base & duplicates.phone_keys("5145559876")
+
+
+def test_find_duplicates_needs_two_agreeing_signals(db_session):
+    original = factories.create_patient(
+        db_session, first_name="Catherine", last_name="Tremblay", phone_number="5145550123"
+    )
+    # A neighbour's number alone is not a duplicate.
+    factories.create_patient(db_session, first_name="Omar", last_name="Haddad", phone_number="5145550124")
+    intake = factories.create_patient(
+        db_session, first_name="Catharine", last_name="Tremblay", phone_number="5145550132"
+    )
+
+    found = duplicates.find_duplicates(db_session, intake)
+
+    assert [candidate.patient.id for candidate in found] == [original.id]
+    assert found[0].reasons == ("similar_phone", "similar_name", "same_address")
+
+
+def test_keys_follow_name_updates(db_session):
+    payload = factories.patient_payload(first_name="Amelie", last_name="Roy")
+    patient = crud.create_patient(db_session, schemas.PatientCreate(**payload))
+    crud.create_patient(db_session, schemas.PatientCreate(**(payload | {"last_name": "Gagnon"})))
+
+    keys = {
+        row.key
+        for row in db_session.query(models.PatientMatchKeyTable).filter_by(patient_id=patient.id)
+    }
+
+    assert duplicates.name_key("Amelie", "Gagnon") in keys
+    assert duplicates.name_key("Amelie", "Roy") not in keys
+
+
+def test_bulk_upserts_are_indexed(db_session):
+    rows = [factories.patient_payload(first_name="Noah", last_name="Cote", address="7 Rue Guy")]
+    crud.upsert_patients(db_session, rows)
+    db_session.commit()
+    intake = factories.create_patient(db_session, first_name="Noa", last_name="Côté", address="7 rue Guy")
+
+    assert len(duplicates.find_duplicates(db_session, intake)) == 1
+
+
+def test_save_intake_attaches_candidates(db_session, patient_writer):
+
+    factories.create_patient(db_session, first_name="Liam", last_name="Bouchard", phone_number="4385550101")
+    parsed = factories.patient_payload(first_name="Liam", last_name="Boucher", phone_number="4385550110")
+
+    patient = asyncio.run(save_intake(db_session, parsed))
+
+    assert patient.new_patient is True
+    assert [candidate["reasons"] for candidate in patient.possible_duplicates] == [
+        ["similar_phone", "partial_name", "same_address"]
+    ]
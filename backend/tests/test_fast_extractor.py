@@ -0,0 +1,78 @@
+from app.fast_extractor import extract_fast, spoken_digits_to_number
+
+
+def test_extract_fast_handles_scripted_transcript():
+    result = extract_fast(
+        "Hi, my name is Alice Nguyen, my phone number is 514-555-0100 "
+        "and I live at 123 Maple Avenue, Montreal."
+    )
+
+    assert result.fields == {
+        "first_name": "Alice",
+        "last_name": "Nguyen",
+        "phone_number": "5145550100",
+        "address": "123 Maple Avenue, Montreal",
+    }
+    assert result.is_confident()
+
+
+def test_extract_fast_normalizes_spoken_digits():
+    result = extract_fast(
+        "My name is Ben Clark. My number is four three eight, five five five, "
+        "oh one oh one. I live at 77 Crescent Street."
+    )
+
+    assert result.fields["phone_number"] == "4385550101"
+    assert result.is_confident()
+    assert spoken_digits_to_number("four three eight double five five oh one oh one") == (
+        "4385550101",
+        True,
+    )
+
+
+def test_extract_fast_is_not_confident_without_address():
+    result = extract_fast("Hello, this is Sofia Martinez calling about my appointment.")
+
+    assert result.fields["address"] is None
+    assert not result.is_confident()
+
+
+def test_extract_fast_scores_short_phone_low():
+    result = extract_fast(
+        "My name is Alice Nguyen, my phone number is 555 0100 and I live at 1 Main St."
+    )
+
+    assert not result.is_confident()
+
+
+def test_extract_fast_stops_address_at_phone_clause():
+    result = extract_fast(
+        "My name is Alice Nguyen and I live at 123 Maple Avenue, "
+        "my phone number is 514 555 0100."
+    )
+
+    assert result.fields["address"] == "123 Maple Avenue"
+    assert result.fields["phone_number"] == "5145550100"
+    assert result.is_confident()
+
+
+def test_extract_fast_distrusts_address_that_swallowed_a_clause():
+    result = extract_fast("My name is Alice Nguyen, I live at 123 Maple Avenue phone 514 555 0100.")
+
+    assert not result.is_confident()
+
+
+def test_extract_fast_defers_three_part_names_to_the_llm():
+    result = extract_fast(
+        "My name is Mary Ann Smith, my phone number is 514 555 0100, I live at 9 Elm Street."
+    )
+
+    assert not result.is_confident()
+
+
+def test_extract_fast_keeps_abbreviated_street_names_whole():
+    saint = extract_fast("My name is Alice Nguyen. I live at 123 St. Catherine Street West.")
+    mount = extract_fast("My name is Ben Clark. I live at 4500 Mt. Royal Ave., Apt. 4.")
+
+    assert saint.fields["address"] == "123 St. Catherine Street West"
+    assert mount.fields["address"] == "4500 Mt. Royal Ave., Apt. 4"
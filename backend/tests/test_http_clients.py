@@ -0,0 +1,45 @@
+import asyncio
+
+import httpx
+
+from app.http_clients import ProviderClients, ProviderClientSettings
+
+
+def _mock_factory(settings):
+    return httpx.MockTransport(lambda request: httpx.Response(200, json={"ok": True}))
+
+
+def test_provider_clients_share_one_client_per_provider():
+    clients = ProviderClients(ProviderClientSettings(), transport_factory=_mock_factory)
+
+    async def scenario():
+        first = clients.get("elevenlabs")
+        assert clients.get("elevenlabs") is first
+        assert clients.get("gemini") is not first
+        await clients.aclose()
+        assert first.is_closed
+        assert clients.get("elevenlabs") is not first
+        await clients.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_provider_clients_report_pool_utilization():
+    clients = ProviderClients(
+        ProviderClientSettings(max_connections=4),
+        transport_factory=_mock_factory,
+    )
+
+    async def scenario():
+        client = clients.get("elevenlabs")
+        await asyncio.gather(*(client.get("https://stt.test/") for _ in range(3)))
+        stats = clients.stats()["elevenlabs"]
+        await clients.aclose()
+        return stats
+
+    stats = asyncio.run(scenario())
+
+    assert stats["total_requests"] == 3
+    assert stats["in_flight"] == 0
+    assert stats["max_connections"] == 4
+    assert stats["utilization"] == 0
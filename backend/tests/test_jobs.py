@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+from fastapi import status
+
+from app import intake, models
+from app.exceptions import ProviderError
+from app.jobs import IntakeJobQueue, intake_jobs
+from . import factories
+
+
+@pytest.fixture()
+def job_queue(session_factory, tmp_path, monkeypatch):
+    queue = IntakeJobQueue(session_factory, storage_dir=tmp_path, max_attempts=2, base_delay=0)
+    monkeypatch.setattr(intake_jobs, "session_factory", session_factory)
+    monkeypatch.setattr(intake_jobs, "storage_dir", tmp_path)
+    return queue
+
+
+def _upload():
+    return {"file": ("patient_audio.webm", b"fake-audio", "audio/webm")}
+
+
+def _stub_pipeline(monkeypatch, parse):
+    async def fake_transcribe(file):
+        assert await file.read() == b"fake-audio"
+        return "transcript"
+
+    monkeypatch.setattr(intake, "transcribe_audio_data", fake_transcribe)
+    monkeypatch.setattr(intake, "parse_patient_details", parse)
+
+
+def test_enqueue_returns_202_and_processes_job(client, job_queue, monkeypatch):
+    payload = factories.patient_payload()
+
+    async def fake_parse(text):
+        return dict(payload)
+
+    _stub_pipeline(monkeypatch, fake_parse)
+
+    response = client.post("/voice-input/jobs", files=_upload())
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = response.json()
+    assert job["status"] == "queued"
+    assert response.headers["Location"] == f"/jobs/{job['id']}"
+
+    assert asyncio.run(job_queue.run_once()) is True
+    assert asyncio.run(job_queue.run_once()) is False
+
+    result = client.get(f"/jobs/{job['id']}").json()
+    assert result["status"] == "succeeded"
+    assert result["patient"]["phone_number"] == payload["phone_number"]
+    assert result["error"] is None
+
+
+def test_provider_failures_are_retried_then_failed(client, job_queue, monkeypatch):
+    async def failing_parse(text):
+        raise ProviderError(provider="gemini", message="Gemini is down")
+
+    _stub_pipeline(monkeypatch, failing_parse)
+    job_id = client.post("/voice-input/jobs", files=_upload()).json()["id"]
+
+    asyncio.run(job_queue.run_once())
+    retrying = client.get(f"/jobs/{job_id}").json()
+    assert retrying["status"] == "queued"
+    assert retrying["attempts"] == 1
+    assert retrying["error"]["error"] == "provider_error"
+
+    asyncio.run(job_queue.run_once())
+    failed = client.get(f"/jobs/{job_id}").json()
+    assert failed["status"] == "failed"
+    assert failed["attempts"] == 2
+
+
+def test_validation_failures_are_not_retried(client, job_queue, monkeypatch, tmp_path):
+    async def incomplete_parse(text):
+        return factories.patient_payload(address=None)
+
+    _stub_pipeline(monkeypatch, incomplete_parse)
+    job_id = client.post("/voice-input/jobs", files=_upload()).json()["id"]
+
+    asyncio.run(job_queue.run_once())
+
+    failed = client.get(f"/jobs/{job_id}").json()
+    assert failed["status"] == "failed"
+    assert failed["error"]["missing_fields"] == ["address"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_interrupted_jobs_are_requeued_on_start(client, db_session, job_queue):
+    job_id = client.post("/voice-input/jobs", files=_upload()).json()["id"]
+    db_session.query(models.IntakeJobTable).update({"status": "running"})
+    db_session.commit()
+
+    asyncio.run(job_queue.start(workers=0))
+
+    assert client.get(f"/jobs/{job_id}").json()["status"] == "queued"
+
+
+def test_get_unknown_job_returns_404(client):
+    assert client.get("/jobs/does-not-exist").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_enqueue_rejects_oversized_upload(client, job_queue, monkeypatch, tmp_path):
+    monkeypatch.setattr("app.jobs.MAX_UPLOAD_BYTES", 4)
+
+    response = client.post("/voice-input/jobs", files=_upload())
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert response.json()["detail"] == {"error": "upload_too_large", "limit_bytes": 4}
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,63 @@
+from sqlalchemy import create_engine, text
+
+from app.metrics import DB_QUERY_SECONDS, MetricsRegistry, STAGE_SECONDS, instrument_engine, registry
+from . import factories
+from .test_routes_voice import _stub_pipeline, _upload
+
+
+def test_histogram_renders_cumulative_buckets():
+    metrics = MetricsRegistry()
+    latency = metrics.histogram("demo_seconds", "Demo latency.", ["stage"], buckets=(0.1, 1))
+    latency.observe(0.05, stage="stt")
+    latency.observe(0.5, stage="stt")
+    latency.observe(5, stage="stt")
+
+    lines = metrics.render().splitlines()
+
+    assert "# TYPE demo_seconds histogram" in lines
+    assert 'demo_seconds_bucket{stage="stt",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="stt",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{stage="stt",le="+Inf"} 3' in lines
+    assert 'demo_seconds_sum{stage="stt"} 5.55' in lines
+    assert 'demo_seconds_count{stage="stt"} 3' in lines
+
+
+def test_counter_escapes_labels_and_disabled_registry_is_noop():
+    metrics = MetricsRegistry()
+    retries = metrics.counter("demo_total", "Demo.", ["provider"])
+    retries.inc(provider='say "hi"\n')
+    assert 'demo_total{provider="say \\"hi\\"\\n"} 1' in metrics.render()
+
+    disabled = MetricsRegistry(enabled=False)
+    ignored = disabled.counter("ignored_total", "Ignored.")
+    ignored.inc()
+    assert ignored.value() == 0
+
+
+def test_instrumented_engine_records_statement_timings():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    instrument_engine(engine)  # idempotent
+    before = DB_QUERY_SECONDS.count(statement="SELECT")
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    assert DB_QUERY_SECONDS.count(statement="SELECT") == before + 1
+
+
+def test_metrics_endpoint_exposes_stage_histograms(client, monkeypatch):
+    registry.reset()
+    _stub_pipeline(monkeypatch, factories.patient_payload(phone_number="5145550777"))
+    client.post("/voice-input", files=_upload())
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    for stage in ("transcription", "parsing", "validation", "persistence"):
+        assert STAGE_SECONDS.count(stage=stage, outcome="success") == 1
+        assert f'voice_intake_stage_seconds_count{{stage="{stage}",outcome="success"}} 1' in body
+    assert 'voice_intake_seconds_count{outcome="success"} 1' in body
+    assert "voice_intakes_in_flight 0" in body
@@ -0,0 +1,57 @@
+from app import crud, schemas
+from app.patient_cache import CachedResponse, PatientResponseCache, patient_cache
+from . import factories
+
+
+def _body(text: str) -> CachedResponse:
+    return CachedResponse.from_body(text.encode())
+
+
+def test_cache_evicts_least_recently_used_entries():
+    cache = PatientResponseCache(max_entries=2)
+
+    cache.get_or_load(("patient", 1), lambda: _body("one"))
+    cache.get_or_load(("patient", 2), lambda: _body("two"))
+    cache.get_or_load(("patient", 1), lambda: _body("stale"))
+    cache.get_or_load(("patient", 3), lambda: _body("three"))
+
+    assert cache.get_or_load(("patient", 1), lambda: _body("reloaded")).body == b"one"
+    assert cache.get_or_load(("patient", 2), lambda: _body("reloaded")).body == b"reloaded"
+    assert len(cache) == 2
+
+
+def test_load_racing_an_invalidation_is_not_stored():
+    cache = PatientResponseCache()
+
+    def load_while_writing():
+        cache.invalidate([1])  # a writer commits while the row is being read
+        return _body("before write")
+
+    cache.get_or_load(("patient", 1), load_while_writing)
+
+    assert cache.get_or_load(("patient", 1), lambda: _body("after write")).body == b"after write"
+
+
+def test_invalidation_drops_patient_and_every_page():
+    cache = PatientResponseCache()
+    for key in (("patient", 1), ("patient", 2), ("page", 50, None)):
+        cache.get_or_load(key, lambda: _body("cached"))
+
+    cache.invalidate([1])
+
+    assert cache.get_or_load(("patient", 2), lambda: _body("fresh")).body == b"cached"
+    assert cache.get_or_load(("patient", 1), lambda: _body("fresh")).body == b"fresh"
+    assert cache.get_or_load(("page", 50, None), lambda: _body("fresh")).body == b"fresh"
+
+
+def test_upsert_invalidates_again_when_the_transaction_ends(db_session):
+    patient = factories.create_patient(db_session)
+    payload = schemas.PatientCreate.model_validate(patient, from_attributes=True)
+
+    crud.upsert_patient(db_session, payload.model_copy(update={"address": "1 New St"}))
+    # Another connection still reads the committed row and caches it.
+    patient_cache.get_or_load(("patient", patient.id), lambda: _body("old address"))
+    db_session.commit()
+
+    reloaded = patient_cache.get_or_load(("patient", patient.id), lambda: _body("new address"))
+    assert reloaded.body == b"new address"
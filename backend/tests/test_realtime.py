@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+from app import intake, streaming_stt
+from app.fake_stt_server import FakeStreamingSTTSession, ScriptedTranscriber, serve_fake_stt
+from app.streaming_stt import WebSocketSTTSession
+
+TRANSCRIPT = (
+    "My name is Alice Nguyen, my phone number is 514 555 0123 "
+    "and I live at 123 Maple Avenue."
+)
+
+
+def _use_fake_stt(monkeypatch, transcript: str = TRANSCRIPT):
+    async def open_session():
+        return FakeStreamingSTTSession(
+            ScriptedTranscriber(transcript, bytes_per_word=4, segment_words=6)
+        )
+
+    monkeypatch.setattr(streaming_stt, "open_streaming_session", open_session)
+
+
+def _stream(client, chunks):
+    messages = []
+    with client.websocket_connect("/ws/voice-input") as ws:
+        for chunk in chunks:
+            ws.send_bytes(chunk)
+        ws.send_json({"type": "end"})
+        while True:
+            message = ws.receive_json()
+            messages.append(message)
+            if message["type"] in {"patient", "error"}:
+                return messages
+
+
+def test_realtime_intake_streams_partials_and_persists_patient(client, monkeypatch):
+    _use_fake_stt(monkeypatch)
+
+    messages = _stream(client, [b"\x00" * 8] * 10)
+
+    kinds = [message["type"] for message in messages]
+    assert "partial" in kinds
+    assert kinds.count("final") >= 2
+    assert messages[-2]["transcript"] == TRANSCRIPT
+    patient = messages[-1]["patient"]
+    assert (patient["first_name"], patient["phone_number"]) == ("Alice", "5145550123")
+    assert patient["address"] == "123 Maple Avenue"
+
+    listed = client.get("/patients").json()
+    assert [row["phone_number"] for row in listed] == ["5145550123"]
+
+
+def test_realtime_intake_reports_incomplete_transcript(client, monkeypatch):
+    _use_fake_stt(monkeypatch, "Hello there, I would like an appointment")
+
+    async def fake_parse(text):
+        return {"first_name": None, "last_name": None, "phone_number": None, "address": None}
+
+    monkeypatch.setattr(intake, "parse_patient_details", fake_parse)
+
+    messages = _stream(client, [b"\x00" * 64])
+
+    assert messages[-1]["type"] == "error"
+    assert messages[-1]["status_code"] == 422
+    assert messages[-1]["detail"]["error"] == "incomplete_patient_data"
+
+
+def test_realtime_intake_rejects_empty_stream(client, monkeypatch):
+    _use_fake_stt(monkeypatch, "")
+
+    messages = _stream(client, [])
+
+    assert messages == [
+        {"type": "error", "status_code": 422, "detail": {"error": "empty_transcript"}}
+    ]
+
+
+def test_websocket_session_against_fake_server():
+    async def scenario():
+        async with serve_fake_stt("127.0.0.1", 0, transcript=TRANSCRIPT, bytes_per_word=2) as server:
+            port = server.sockets[0].getsockname()[1]
+            session = await WebSocketSTTSession.connect(f"ws://127.0.0.1:{port}")
+            try:
+                await session.send_audio(b"\x00" * 10)
+                await session.finish()
+                return [event async for event in session.events()]
+            finally:
+                await session.aclose()
+
+    events = asyncio.run(scenario())
+
+    assert events[0].text == "My" and not events[0].is_final
+    assert " ".join(event.text for event in events if event.is_final) == TRANSCRIPT
+
+
+def test_realtime_intake_rejects_malformed_text_frame(client, monkeypatch):
+    _use_fake_stt(monkeypatch)
+
+    with client.websocket_connect("/ws/voice-input") as ws:
+        ws.send_bytes(b"\x00" * 8)
+        ws.send_text("not json")
+        messages = []
+        while (message := ws.receive())["type"] == "websocket.send":
+            messages.append(json.loads(message["text"]))
+
+    assert messages[-1] == {"type": "error", "status_code": 400, "detail": {"error": "invalid_message"}}
+    assert message == {"type": "websocket.close", "code": 1003, "reason": ""}
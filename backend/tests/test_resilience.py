@@ -0,0 +1,187 @@
+import asyncio
+import time
+
+import pytest
+
+from app import intake
+from app.exceptions import CircuitOpenError, DeadlineExceededError, ProviderError
+from app.resilience import (
+    CircuitBreaker,
+    ProviderLimits,
+    RetryPolicy,
+    call_with_retries,
+    circuit_breakers,
+    deadline_scope,
+    is_retryable,
+    provider_limits_scope,
+)
+from .test_routes_voice import _upload
+
+NO_WAIT = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _flaky(failures, status_code=503):
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise ProviderError(provider="test", message="boom", status_code=status_code)
+        return "ok"
+
+    return fn, calls
+
+
+def test_full_jitter_backoff_stays_within_cap():
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+    delays = [policy.backoff(attempt) for attempt in (1, 3, 6) for _ in range(200)]
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert max(policy.backoff(1) for _ in range(200)) <= 1.0
+
+
+def test_retryable_classification():
+    assert is_retryable(ProviderError(provider="p", message="network"))
+    assert is_retryable(ProviderError(provider="p", message="busy", status_code=429))
+    assert not is_retryable(ProviderError(provider="p", message="bad", status_code=400))
+    assert not is_retryable(ValueError("missing key"))
+
+
+def test_retries_transient_failures_until_success():
+    fn, calls = _flaky(2)
+    breaker = CircuitBreaker("test")
+
+    result = asyncio.run(
+        call_with_retries(fn, provider="test", operation="op", policy=NO_WAIT, breaker=breaker)
+    )
+
+    assert result == "ok"
+    assert len(calls) == 3
+    assert breaker.state == "closed"
+
+
+def test_client_errors_are_not_retried():
+    fn, calls = _flaky(5, status_code=401)
+
+    with pytest.raises(ProviderError):
+        asyncio.run(
+            call_with_retries(
+                fn, provider="test", operation="op", policy=NO_WAIT, breaker=CircuitBreaker("test")
+            )
+        )
+
+    assert len(calls) == 1
+
+
+def test_circuit_opens_fails_fast_and_recovers_after_probe():
+    clock = _Clock()
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=10, clock=clock)
+    failing, calls = _flaky(100)
+
+    def call(fn):
+        return asyncio.run(
+            call_with_retries(fn, provider="test", operation="op", policy=NO_WAIT, breaker=breaker)
+        )
+
+    with pytest.raises(ProviderError):
+        call(failing)
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError) as excinfo:
+        call(failing)
+    assert len(calls) == 3
+    assert excinfo.value.retry_after == pytest.approx(10)
+
+    clock.now = 11
+    assert breaker.state == "half_open"
+    healthy, _ = _flaky(0)
+    assert call(healthy) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_deadline_bounds_slow_calls_and_backoff():
+    async def slow():
+        await asyncio.sleep(5)
+
+    async def scenario():
+        with deadline_scope(0.05):
+            await call_with_retries(
+                slow,
+                provider="test",
+                operation="slow_op",
+                policy=NO_WAIT,
+                breaker=CircuitBreaker("test"),
+            )
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceededError) as excinfo:
+        asyncio.run(scenario())
+
+    assert time.monotonic() - started < 1
+    assert excinfo.value.stage == "slow_op"
+
+
+def test_nested_deadline_keeps_the_sooner_expiry():
+    with deadline_scope(1) as outer:
+        with deadline_scope(60) as inner:
+            assert inner is outer
+        with deadline_scope(0.5) as tighter:
+            assert tighter.expires_at < outer.expires_at
+
+
+def test_provider_limits_cap_concurrent_calls_per_provider():
+    limits = ProviderLimits.parse("2,gemini=1")
+    active = {"stt": 0, "gemini": 0}
+    peak = {"stt": 0, "gemini": 0}
+
+    def _call(provider):
+        async def fn():
+            active[provider] += 1
+            peak[provider] = max(peak[provider], active[provider])
+            await asyncio.sleep(0.01)
+            active[provider] -= 1
+
+        return call_with_retries(fn, provider=provider, operation="op", breaker=CircuitBreaker(provider))
+
+    async def run():
+        with provider_limits_scope(limits):
+            await asyncio.gather(*(_call(name) for name in ["stt", "gemini"] * 4))
+
+    asyncio.run(run())
+
+    assert limits.overrides == {"gemini": 1}
+    assert peak == {"stt": 2, "gemini": 1}
+
+
+def test_voice_input_reports_open_circuit_as_503(client, monkeypatch):
+    async def fake_transcribe(file):
+        raise CircuitOpenError(provider="elevenlabs", message="open", retry_after=12.5)
+
+    monkeypatch.setattr(intake, "transcribe_audio_data", fake_transcribe)
+
+    response = client.post("/voice-input", files=_upload())
+
+    assert response.status_code == 503
+    assert response.json()["detail"] == {
+        "error": "provider_unavailable",
+        "provider": "elevenlabs",
+        "retry_after": 12.5,
+    }
+
+
+def test_circuit_breaker_diagnostics(client):
+    circuit_breakers.reset()
+    circuit_breakers.get("gemini").record_failure()
+
+    response = client.get("/diagnostics/circuit-breakers")
+
+    assert response.json()["gemini"]["consecutive_failures"] == 1
+    assert response.json()["gemini"]["state"] == "closed"
+    circuit_breakers.reset()
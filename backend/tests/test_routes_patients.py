@@ -1,6 +1,10 @@
+import csv
+import io
+import json
+
 from fastapi import status
 
-from app import models
+from app import crud, models
 from app.demo_data import seed_demo_patients
 from . import factories
 
@@ -41,3 +45,201 @@ def test_post_patients_returns_existing_on_duplicate_phone(client, db_session):
 
     stored = db_session.query(models.PatientTable).all()
     assert len(stored) == 1
+
+
+def test_get_patients_paginates_with_cursor_header(client, db_session):
+    for _ in range(3):
+        factories.create_patient(db_session)
+
+    first = client.get("/patients", params={"limit": 2})
+    assert first.status_code == status.HTTP_200_OK
+    assert len(first.json()) == 2
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get("/patients", params={"limit": 2, "after": cursor})
+    assert len(second.json()) == 1
+    assert "X-Next-Cursor" not in second.headers
+    assert second.json()[0]["id"] < first.json()[-1]["id"]
+
+
+def test_get_patients_rejects_invalid_cursor(client):
+    response = client.get("/patients", params={"after": "???"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"]["error"] == "invalid_cursor"
+
+
+def test_export_patients_streams_ndjson(client, db_session):
+    seed_demo_patients(db_session)
+
+    response = client.get("/patients/export")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["first_name"] for row in lines] == ["Alice", "Benjamin", "Sofia"]
+    assert lines[0]["new_patient"] is True
+
+
+def test_export_patients_streams_csv(client, db_session):
+    seed_demo_patients(db_session)
+
+    response = client.get("/patients/export", params={"format": "csv"})
+
+    assert response.status_code == status.HTTP_200_OK
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id", "first_name", "last_name", "phone_number", "address", "new_patient"]
+    assert len(rows) == 4
+    assert rows[3][4] == "902 Sherbrooke Ouest, Montreal, QC"
+
+
+def test_bulk_import_csv_upserts_rows_and_reports_errors(client, db_session):
+    factories.create_patient(db_session, phone_number="5145550100", first_name="Old")
+    body = (
+        "first_name,last_name,phone_number,address\n"
+        "Ana,Lopez,(514) 555-0100,\"1 Rue Peel,\nMontreal\"\n"
+        "Ben,Okafor,555-01,2 Rue Guy\n"
+        "Chloe,Martin,5145550102,3 Rue Crescent\n"
+    )
+
+    response = client.post(
+        "/patients/bulk", content=body.encode(), headers={"Content-Type": "text/csv"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    report = response.json()
+    assert report["received"] == 3
+    assert report["imported"] == 2
+    assert report["errors"] == [{"line": 4, "error": "invalid_fields", "fields": ["phone_number"]}]
+    updated = crud.get_patient_by_phone(db_session, "5145550100")
+    db_session.refresh(updated)
+    assert updated.first_name == "Ana"
+    assert updated.new_patient is False
+    assert crud.get_patient_by_phone(db_session, "5145550102").new_patient is True
+
+
+def test_bulk_import_ndjson_reports_bad_lines(client, db_session):
+    lines = [
+        json.dumps(factories.patient_payload(phone_number=5145550200)),
+        "{not json",
+        json.dumps(factories.patient_payload(last_name="  ")),
+    ]
+
+    response = client.post(
+        "/patients/bulk", params={"format": "ndjson"}, content="\n".join(lines).encode()
+    )
+
+    report = response.json()
+    assert report["imported"] == 1
+    assert [error["line"] for error in report["errors"]] == [2, 3]
+    assert report["errors"][1]["fields"] == ["last_name"]
+    assert db_session.query(models.PatientTable).count() == 1
+
+
+def test_bulk_import_rejects_unknown_format_and_bad_header(client):
+    unknown = client.post("/patients/bulk", content=b"x", headers={"Content-Type": "text/plain"})
+    bad_header = client.post(
+        "/patients/bulk", content=b"name,phone\nA,5145550000\n", headers={"Content-Type": "text/csv"}
+    )
+
+    assert unknown.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    assert bad_header.status_code == status.HTTP_400_BAD_REQUEST
+    assert bad_header.json()["detail"]["error"] == "invalid_import"
+    assert bad_header.json()["detail"]["report"]["aborted_at_line"] == 1
+
+
+def test_bulk_import_returns_partial_report_when_aborted_midway(client, db_session):
+    body = (
+        b"first_name,last_name,phone_number,address\n"
+        b"Ana,Lopez,5145550300,1 Rue Peel\n"
+        b"\xff,Okafor,5145550301,2 Rue Guy\n"
+    )
+
+    response = client.post("/patients/bulk", content=body, headers={"Content-Type": "text/csv"})
+
+    assert response.status_code == status.HTTP_207_MULTI_STATUS
+    assert response.json()["imported"] == 1
+    assert response.json()["aborted_at_line"] == 3
+    assert db_session.query(models.PatientTable).count() == 1
+
+
+def test_search_patients_route_paginates_with_cursor_header(client, db_session):
+    for _ in range(3):
+        factories.create_patient(db_session, last_name="Gagnon")
+
+    first = client.get("/patients/search", params={"q": "gagnon", "limit": 2})
+    second = client.get(
+        "/patients/search", params={"q": "gagnon", "limit": 2, "after": first.headers["X-Next-Cursor"]}
+    )
+
+    assert first.status_code == status.HTTP_200_OK
+    assert len(first.json()) == 2
+    assert len(second.json()) == 1
+    assert "X-Next-Cursor" not in second.headers
+    assert client.get("/patients/search", params={"q": "x", "after": "???"}).status_code == 400
+
+
+def test_get_patient_sends_etag_and_honours_if_none_match(client, db_session):
+    patient = factories.create_patient(db_session)
+
+    first = client.get(f"/patients/{patient.id}")
+    etag = first.headers["ETag"]
+    cached = client.get(f"/patients/{patient.id}", headers={"If-None-Match": etag})
+
+    assert first.status_code == status.HTTP_200_OK
+    assert first.json()["id"] == patient.id
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+
+
+def test_patient_writes_invalidate_cached_reads(client, db_session):
+    payload = factories.patient_payload()
+    patient_id = client.post("/patients", json=payload).json()["id"]
+    before = client.get(f"/patients/{patient_id}")
+    page = client.get("/patients")
+
+    client.post("/patients", json=payload | {"address": "9 Rue Neuve"})
+    after = client.get(f"/patients/{patient_id}", headers={"If-None-Match": before.headers["ETag"]})
+    client.post(
+        "/patients/bulk",
+        content=json.dumps(factories.patient_payload()),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    new_page = client.get("/patients", headers={"If-None-Match": page.headers["ETag"]})
+
+    assert after.status_code == status.HTTP_200_OK
+    assert after.json()["address"] == "9 Rue Neuve"
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert new_page.status_code == status.HTTP_200_OK
+    assert len(new_page.json()) == 2
+
+
+def test_patient_changes_returns_only_rows_changed_since(client, db_session):
+    payload = factories.patient_payload()
+    client.post("/patients", json=payload)
+    factories.create_patient(db_session)
+    since = int(client.get("/patients").headers["X-Change-Seq"])
+
+    client.post("/patients", json=payload)
+    response = client.get("/patients/changes", params={"since": since})
+
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert [patient["phone_number"] for patient in body["patients"]] == [payload["phone_number"]]
+    assert body["patients"][0]["new_patient"] is False
+    assert body["next_since"] == since + 1
+    assert body["has_more"] is False
+    caught_up = client.get("/patients/changes", params={"since": body["next_since"]}).json()
+    assert caught_up == {"patients": [], "next_since": body["next_since"], "has_more": False}
+
+
+def test_cross_origin_reads_expose_sync_headers(client, db_session):
+    factories.create_patient(db_session)
+
+    response = client.get("/patients", headers={"Origin": "http://localhost:5173"})
+
+    exposed = response.headers["Access-Control-Expose-Headers"].lower().split(",")
+    exposed = {header.strip() for header in exposed}
+    assert {"x-next-cursor", "x-change-seq", "etag"} <= exposed
+    assert "X-Change-Seq" in response.headers
@@ -0,0 +1,175 @@
+import io
+import json
+import zipfile
+
+from fastapi import status
+from starlette.datastructures import Headers, UploadFile
+
+from app import batch_intake, intake
+from app.exceptions import UploadTooLargeError
+from . import factories
+from .test_audio_preprocess import make_wav
+
+
+def _upload():
+    return {"file": ("patient_audio.webm", b"fake-audio", "audio/webm")}
+
+
+def _stub_pipeline(monkeypatch, parsed: dict, transcript: str = "My name is Test Patient"):
+    async def fake_transcribe(file):
+        return transcript
+
+    async def fake_parse(text):
+        return dict(parsed)
+
+    monkeypatch.setattr(intake, "transcribe_audio_data", fake_transcribe)
+    monkeypatch.setattr(intake, "parse_patient_details", fake_parse)
+
+
+def test_voice_input_creates_new_patient(client, monkeypatch):
+    payload = factories.patient_payload(phone_number="(514) 555-4242")
+    _stub_pipeline(monkeypatch, payload)
+
+    response = client.post("/voice-input", files=_upload())
+
+    assert response.status_code == status.HTTP_201_CREATED
+    body = response.json()
+    assert body["phone_number"] == "5145554242"
+    assert body["new_patient"] is True
+
+
+def test_voice_input_marks_returning_patient(client, db_session, monkeypatch):
+    existing = factories.create_patient(db_session)
+    _stub_pipeline(monkeypatch, factories.patient_payload(phone_number=existing.phone_number))
+
+    response = client.post("/voice-input", files=_upload())
+
+    assert response.status_code == status.HTTP_201_CREATED
+    body = response.json()
+    assert body["id"] == existing.id
+    assert body["new_patient"] is False
+
+
+def test_voice_input_rejects_incomplete_data(client, monkeypatch):
+    _stub_pipeline(monkeypatch, factories.patient_payload(address=None))
+
+    response = client.post("/voice-input", files=_upload())
+
+    assert response.status_code == 422
+    assert response.json()["detail"]["missing_fields"] == ["address"]
+
+
+def test_voice_input_fast_path_skips_llm(client, monkeypatch):
+    transcript = (
+        "My name is Alice Nguyen, my phone number is 514 555 0199 "
+        "and I live at 123 Maple Avenue."
+    )
+    _stub_pipeline(monkeypatch, {}, transcript=transcript)
+
+    async def fail_parse(text):
+        raise AssertionError("LLM should not be called for a scripted transcript")
+
+    monkeypatch.setattr(intake, "parse_patient_details", fail_parse)
+
+    response = client.post("/voice-input", files=_upload())
+
+    assert response.status_code == status.HTTP_201_CREATED
+    body = response.json()
+    assert body["first_name"] == "Alice"
+    assert body["phone_number"] == "5145550199"
+    assert body["address"] == "123 Maple Avenue"
+
+
+def test_voice_input_rejects_oversized_upload(client, monkeypatch):
+    async def too_large(file):
+        raise UploadTooLargeError(limit_bytes=10)
+
+    monkeypatch.setattr(intake, "transcribe_audio_data", too_large)
+
+    response = client.post("/voice-input", files=_upload())
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert response.json()["detail"] == {"error": "upload_too_large", "limit_bytes": 10}
+
+
+def test_voice_input_rejects_silent_recording(client, monkeypatch):
+    async def fail_transcribe(file):
+        raise AssertionError("STT should not be called for a silent recording")
+
+    monkeypatch.setattr(intake, "transcribe_audio_data", fail_transcribe)
+    silent = make_wav(silence_s=2.0, tone_s=0.0)
+
+    response = client.post("/voice-input", files={"file": ("take.wav", silent, "audio/wav")})
+
+    assert response.status_code == 422
+    assert response.json()["detail"]["error"] == "no_speech_detected"
+
+
+def test_voice_input_batch_streams_results_for_files_and_archives(client, monkeypatch):
+    transcripts = {
+        "a.webm": "My name is Ana Lopez, my phone number is 514 555 0301 and I live at 1 Rue Peel.",
+        "b.webm": "My name is Ben Okafor, my phone number is 514 555 0302 and I live at 2 Rue Guy.",
+        "c.webm": "Hello?",
+    }
+
+    async def fake_transcribe(file):
+        return transcripts[file.filename]
+
+    async def fake_parse(text):
+        return {}
+
+    monkeypatch.setattr(intake, "transcribe_audio_data", fake_transcribe)
+    monkeypatch.setattr(intake, "parse_patient_details", fake_parse)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("backlog/b.webm", b"audio-b")
+        zf.writestr("__MACOSX/backlog/._b.webm", b"metadata")
+        zf.writestr("backlog/c.webm", b"audio-c")
+
+    response = client.post(
+        "/voice-input/batch",
+        files=[
+            ("files", ("a.webm", b"audio-a", "audio/webm")),
+            ("files", ("backlog.zip", archive.getvalue(), "application/zip")),
+        ],
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    results = sorted(lines[:-1], key=lambda result: result["index"])
+    assert [result["filename"] for result in results] == ["a.webm", "backlog/b.webm", "backlog/c.webm"]
+    assert [result["status_code"] for result in results] == [201, 201, 422]
+    assert results[1]["patient"]["phone_number"] == "5145550302"
+    assert lines[-1] == {"done": True, "total": 3, "succeeded": 2, "failed": 1}
+
+
+def test_voice_input_batch_reports_corrupt_archive(client):
+    response = client.post(
+        "/voice-input/batch",
+        files=[("files", ("broken.zip", b"not a zip", "application/zip"))],
+    )
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["error"] == {"error": "invalid_archive"}
+    assert lines[-1]["failed"] == 1
+
+
+def test_expand_uploads_defers_extraction_and_checks_declared_size(monkeypatch):
+    monkeypatch.setattr(batch_intake, "MAX_UPLOAD_BYTES", 16)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("small.webm", b"audio")
+        zf.writestr("huge.webm", b"x" * 64)
+    archive.seek(0)
+    opened = []
+    monkeypatch.setattr(zipfile.ZipFile, "open", lambda self, *args, **kwargs: opened.append(args))
+    upload = UploadFile(
+        file=archive, filename="backlog.zip", headers=Headers({"content-type": "application/zip"})
+    )
+
+    small, huge = batch_intake.expand_uploads([upload])
+
+    assert small.file is None and small.member.filename == "small.webm"
+    assert huge.error.detail == {"error": "upload_too_large", "limit_bytes": 16}
+    assert opened == []
+    batch_intake.close_items([small, huge])
@@ -0,0 +1,140 @@
+import asyncio
+import io
+import tempfile
+
+import pytest
+from starlette.datastructures import Headers, UploadFile
+
+from app.audio_upload import MultipartFileBody, UploadFingerprint
+from app.exceptions import ProviderError
+from app.stt_providers import LatencyHistogram, STTRouter
+
+FINGERPRINT = UploadFingerprint(sha256="0" * 64, size=4)
+
+
+class _FakeProvider:
+    def __init__(self, name, *, delay=0.0, text=None, error=None):
+        self.name = name
+        self.model_id = f"{name}-model"
+        self.delay = delay
+        self.text = text or f"from {name}"
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def transcribe(self, file, fingerprint):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return self.text
+
+
+def _router(*providers, **kwargs):
+    kwargs.setdefault("initial_hedge_delay", 0.05)
+    router = STTRouter(primary=providers[0].name, alternate=providers[-1].name, **kwargs)
+    for provider in providers:
+        router.register(provider)
+    return router
+
+
+def test_histogram_percentiles_track_rolling_window():
+    histogram = LatencyHistogram(window=100)
+    for _ in range(100):
+        histogram.observe(0.2)
+    assert histogram.percentile(0.95) == pytest.approx(0.2, rel=0.15)
+
+    for _ in range(100):
+        histogram.observe(3.0)
+    # The old fast samples have rolled out of the window.
+    assert histogram.percentile(0.5) == pytest.approx(3.0, rel=0.15)
+    assert len(histogram) == 100
+
+
+def test_fast_primary_is_not_hedged():
+    primary, alternate = _FakeProvider("a", delay=0), _FakeProvider("b")
+    router = _router(primary, alternate)
+
+    assert asyncio.run(router.transcribe(None, FINGERPRINT)) == "from a"
+    assert alternate.calls == 0
+    assert router.hedged == 0
+
+
+def test_slow_primary_is_hedged_and_loser_cancelled():
+    primary, alternate = _FakeProvider("a", delay=5), _FakeProvider("b", delay=0)
+    router = _router(primary, alternate)
+
+    assert asyncio.run(router.transcribe(None, FINGERPRINT)) == "from b"
+    assert (router.hedged, router.hedge_wins) == (1, 1)
+    assert primary.cancelled == 1
+
+
+def test_cancelled_hedge_loser_still_counts_toward_latency():
+    primary, alternate = _FakeProvider("a", delay=5), _FakeProvider("b", delay=0)
+    router = _router(primary, alternate)
+
+    asyncio.run(router.transcribe(None, FINGERPRINT))
+
+    assert len(router._latency["a"]) == 1
+    assert router._latency["a"].percentile(0.5) >= 0.04
+
+
+def test_failed_primary_fails_over_to_alternate():
+    primary = _FakeProvider("a", error=ProviderError(provider="a", message="down", status_code=503))
+    alternate = _FakeProvider("b")
+    router = _router(primary, alternate, initial_hedge_delay=1)
+
+    assert asyncio.run(router.transcribe(None, FINGERPRINT)) == "from b"
+    assert router.failovers == 1
+
+
+def test_hedge_delay_adapts_to_observed_p95():
+    primary = _FakeProvider("a")
+    router = _router(primary, min_samples=5, min_hedge_delay=0.1, max_hedge_delay=10)
+    assert router.hedge_delay() == 0.05
+
+    for _ in range(20):
+        router._latency["a"].observe(2.0)
+    assert router.hedge_delay() == pytest.approx(2.0, rel=0.15)
+
+    for _ in range(500):
+        router._latency["a"].observe(60.0)
+    assert router.hedge_delay() == 10
+
+
+@pytest.mark.parametrize("on_disk", [False, True])
+def test_concurrent_bodies_over_one_upload_are_independent(on_disk):
+    data = bytes(range(256)) * 64
+    if on_disk:
+        source = tempfile.TemporaryFile()
+        source.write(data)
+        source.seek(0)
+    else:
+        source = io.BytesIO(data)
+    upload = UploadFile(
+        file=source, filename="a.wav", headers=Headers({"content-type": "audio/wav"})
+    )
+
+    async def drain(body):
+        parts = []
+        async for chunk in body:
+            parts.append(chunk)
+            await asyncio.sleep(0)
+        return b"".join(parts)
+
+    async def scenario():
+        bodies = [
+            MultipartFileBody(
+                upload, file_size=len(data), filename="a.wav", content_type="audio/wav", chunk_size=100
+            )
+            for _ in range(2)
+        ]
+        return await asyncio.gather(*(drain(body) for body in bodies))
+
+    for body in asyncio.run(scenario()):
+        assert data in body
+    source.close()
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from app.transcript_cache import TranscriptCache, audio_cache_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_audio_cache_key_is_content_addressed():
+    assert audio_cache_key(b"abc", model_id="scribe_v1") == audio_cache_key(b"abc", model_id="scribe_v1")
+    assert audio_cache_key(b"abc", model_id="scribe_v1") != audio_cache_key(b"abd", model_id="scribe_v1")
+    assert audio_cache_key(b"abc", model_id="scribe_v1") != audio_cache_key(b"abc", model_id="other")
+
+
+def test_cache_evicts_least_recently_used_and_expired_entries():
+    clock = FakeClock()
+    cache = TranscriptCache(max_entries=2, ttl_seconds=60, clock=clock)
+
+    cache.put("a", "alpha")
+    cache.put("b", "bravo")
+    assert cache.get("a") == "alpha"
+    cache.put("c", "charlie")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "alpha"
+
+    clock.now += 61
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+def test_cache_respects_byte_budget():
+    cache = TranscriptCache(max_entries=10, max_bytes=10)
+
+    cache.put("a", "12345")
+    cache.put("b", "67890")
+    cache.put("c", "xyz")
+
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] <= 10
+
+
+def test_cache_persists_to_sqlite(tmp_path):
+    db_path = str(tmp_path / "transcripts.db")
+    TranscriptCache(db_path=db_path).put("key", "hello there")
+
+    reloaded = TranscriptCache(db_path=db_path)
+
+    assert reloaded.get("key") == "hello there"
+
+
+def test_get_or_compute_coalesces_concurrent_calls():
+    cache = TranscriptCache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "transcript"
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+
+    assert results == ["transcript"] * 5
+    assert calls == 1
+    assert cache.stats()["coalesced"] == 4
+    assert asyncio.run(cache.get_or_compute("k", compute)) == "transcript"
+    assert cache.hits == 1
+
+
+def test_get_or_compute_does_not_cache_failures():
+    cache = TranscriptCache()
+
+    async def boom():
+        raise RuntimeError("provider down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_compute("k", boom))
+    assert cache.get("k") is None
@@ -0,0 +1,77 @@
+import asyncio
+import io
+import tempfile
+
+import numpy as np
+from starlette.datastructures import Headers, UploadFile
+
+from app.audio_preprocess import encode_wav
+from app.voice_activity import analyze_pcm, measure_upload
+from .test_audio_preprocess import make_wav
+
+
+def _wav_upload(data: bytes) -> UploadFile:
+    return UploadFile(
+        file=io.BytesIO(data),
+        filename="take.wav",
+        headers=Headers({"content-type": "audio/wav"}),
+    )
+
+
+def test_analyze_pcm_measures_speech_duration():
+    rate = 16000
+    rng = np.random.default_rng(0)
+    noise = 0.001 * rng.standard_normal(rate * 2)
+    speech = 0.3 * np.sin(2 * np.pi * 220 * np.arange(rate) / rate)
+    signal = np.concatenate([noise[:rate], speech + noise[rate:], noise])
+
+    activity = analyze_pcm(signal.astype(np.float32), rate)
+
+    assert abs(activity.speech_seconds - 1.0) < 0.05
+    assert activity.total_seconds == 4.0
+
+
+def test_analyze_pcm_counts_continuous_speech_without_pauses():
+    rate = 16000
+    t = np.arange(rate * 2) / rate
+    envelope = 0.3 + 0.15 * np.sin(2 * np.pi * 3 * t)  # 0.15 .. 0.45, never quiet
+    speech = envelope * np.sin(2 * np.pi * 200 * t)
+
+    activity = analyze_pcm(speech.astype(np.float32), rate)
+
+    assert activity.speech_seconds > 1.9
+
+
+def test_measure_upload_reports_silence():
+    silent = make_wav(silence_s=1.0, tone_s=0.0)
+
+    activity = asyncio.run(measure_upload(_wav_upload(silent)))
+
+    assert activity.speech_seconds == 0.0
+
+
+def test_measure_upload_skips_undecodable_formats(monkeypatch):
+    monkeypatch.setattr("app.voice_activity.shutil.which", lambda _: None)
+    upload = UploadFile(
+        file=io.BytesIO(b"webm"),
+        filename="take.webm",
+        headers=Headers({"content-type": "audio/webm"}),
+    )
+
+    assert asyncio.run(measure_upload(upload)) is None
+
+
+def test_measure_upload_streams_spooled_wav_and_rewinds():
+    rate = 16000
+    t = np.arange(rate * 3) / rate
+    speech = np.where(t >= 1.0, 0.3 * np.sin(2 * np.pi * 220 * t), 0.0)
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024)
+    spooled.write(encode_wav(speech.astype(np.float32), rate))
+    spooled.seek(0)
+    upload = UploadFile(file=spooled, filename="take.wav", headers=Headers({"content-type": "audio/wav"}))
+
+    activity = asyncio.run(measure_upload(upload))
+
+    assert abs(activity.speech_seconds - 2.0) < 0.05
+    assert activity.total_seconds == 3.0
+    assert spooled.tell() == 0
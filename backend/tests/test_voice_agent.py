@@ -0,0 +1,85 @@
+import asyncio
+import io
+from email.parser import BytesParser
+from email.policy import HTTP
+
+import httpx
+import pytest
+from starlette.datastructures import Headers, UploadFile
+
+from app import voice_agent
+from app.audio_upload import MultipartFileBody, fingerprint_upload
+from app.exceptions import UploadTooLargeError
+from app.http_clients import ProviderClients, ProviderClientSettings
+from app.transcript_cache import transcript_cache
+
+
+def _upload(data: bytes) -> UploadFile:
+    return UploadFile(
+        file=io.BytesIO(data),
+        filename="patient_audio.webm",
+        headers=Headers({"content-type": "audio/webm"}),
+    )
+
+
+def _parse_multipart(content_type: str, body: bytes):
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    return {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+
+
+@pytest.fixture()
+def stt_requests(monkeypatch):
+    captured = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        captured.append(request)
+        return httpx.Response(200, json={"text": "My name is Alice Nguyen"})
+
+    clients = ProviderClients(
+        ProviderClientSettings(),
+        transport_factory=lambda settings: httpx.MockTransport(handler),
+    )
+    monkeypatch.setattr(voice_agent, "provider_clients", clients)
+    monkeypatch.setattr(voice_agent, "ELEVENLABS_API_KEY", "test-key")
+    transcript_cache.clear()
+    yield captured
+    transcript_cache.clear()
+
+
+def test_transcribe_streams_multipart_body_with_content_length(stt_requests):
+    audio = bytes(range(256)) * 1000
+
+    transcript = asyncio.run(voice_agent.transcribe_audio_data(_upload(audio)))
+
+    assert transcript == "My name is Alice Nguyen"
+    request = stt_requests[0]
+    body = request.read()
+    assert int(request.headers["Content-Length"]) == len(body)
+    assert "chunked" not in request.headers.get("Transfer-Encoding", "")
+    parts = _parse_multipart(request.headers["Content-Type"], body)
+    assert parts["model_id"].get_content().strip() == "scribe_v1"
+    assert parts["file"].get_payload(decode=True) == audio
+
+
+def test_fingerprint_upload_enforces_size_limit():
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(fingerprint_upload(_upload(b"x" * 11), max_bytes=10, chunk_size=4))
+
+    fingerprint = asyncio.run(fingerprint_upload(_upload(b"x" * 10), max_bytes=10, chunk_size=4))
+    assert fingerprint.size == 10
+
+
+def test_multipart_body_is_replayable():
+    upload = _upload(b"audio-bytes")
+    body = MultipartFileBody(upload, file_size=11, filename="a.webm", content_type="audio/webm")
+
+    async def collect():
+        return b"".join([chunk async for chunk in body])
+
+    first = asyncio.run(collect())
+    second = asyncio.run(collect())
+
+    assert first == second
+    assert len(first) == body.content_length
@@ -10,12 +10,27 @@ export default function PatientTable() {
   const [selected, setSelected] = useState(null);
   const [open, setOpen] = useState(false);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [query, setQuery] = useState("");
+  // Change-sequence high-water mark of the unfiltered list, for delta sync.
+  const [changeSeq, setChangeSeq] = useState(null);
+
+  // Search runs server-side (FTS index / phone prefix); an empty box lists everyone.
+  const listRequest = (params = {}) => {
+    const q = query.trim();
+    return q
+      ? axiosClient.get("/patients/search", { params: { q, ...params } })
+      : axiosClient.get("/patients", { params });
+  };
 
   const fetchPatients = async () => {
     try {
       setLoading(true);
-      const res = await axiosClient.get("/patients");
+      const res = await listRequest();
       setPatients(res.data);
+      setNextCursor(res.headers["x-next-cursor"] || null);
+      const seq = res.headers["x-change-seq"];
+      setChangeSeq(seq === undefined ? null : Number(seq));
     } catch (err) {
       console.error("Error fetching patients:", err);
     } finally {
@@ -23,9 +38,50 @@ export default function PatientTable() {
     }
   };
 
+  const fetchMore = async () => {
+    if (!nextCursor) return;
+    try {
+      const res = await listRequest({ after: nextCursor });
+      setPatients((prev) => [...prev, ...res.data]);
+      setNextCursor(res.headers["x-next-cursor"] || null);
+    } catch (err) {
+      console.error("Error fetching more patients:", err);
+    }
+  };
+
+  // Pull only rows changed since the last load and merge them in place;
+  // new patients go on top, rows on pages not loaded yet are skipped.
+  const syncChanges = async () => {
+    if (query.trim() || changeSeq === null) return fetchPatients();
+    try {
+      let since = changeSeq;
+      let changed = [];
+      for (;;) {
+        const res = await axiosClient.get("/patients/changes", { params: { since } });
+        changed = changed.concat(res.data.patients);
+        since = res.data.next_since;
+        if (!res.data.has_more) break;
+      }
+      setPatients((prev) => {
+        const byId = new Map(changed.map((p) => [p.id, p]));
+        const merged = prev.map((p) => byId.get(p.id) || p);
+        const newestId = prev.length ? prev[0].id : 0;
+        const known = new Set(prev.map((p) => p.id));
+        const added = [...byId.values()]
+          .filter((p) => !known.has(p.id) && p.id > newestId)
+          .sort((a, b) => b.id - a.id);
+        return [...added, ...merged];
+      });
+      setChangeSeq(since);
+    } catch (err) {
+      console.error("Error syncing patient changes:", err);
+    }
+  };
+
   useEffect(() => {
-    fetchPatients();
-  }, []);
+    const timer = setTimeout(fetchPatients, 250);
+    return () => clearTimeout(timer);
+  }, [query]);
 
   const handleRowClick = async (p) => {
     try {
@@ -47,6 +103,13 @@ export default function PatientTable() {
           <CardTitle>Patient Records</CardTitle>
         </CardHeader>
         <CardContent>
+          <input
+            type="search"
+            value={query}
+            onChange={(e) => setQuery(e.target.value)}
+            placeholder="Search by name, address or phone"
+            className="mb-4 w-full rounded-md border px-3 py-2 text-sm"
+          />
           {loading ? (
             <p className="text-gray-500 text-center py-6">Loading...</p>
           ) : patients.length === 0 ? (
@@ -85,12 +148,22 @@ export default function PatientTable() {
                   ))}
                 </tbody>
               </table>
+              {nextCursor && (
+                <div className="flex justify-center pt-4">
+                  <button
+                    onClick={fetchMore}
+                    className="text-sm text-blue-600 hover:underline"
+                  >
+                    Load more
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </CardContent>
       </Card>
 
-      <RecordButton onAdded={fetchPatients} />
+      <RecordButton onAdded={syncChanges} />
 
       {/* Dialog for selected patient */}
       <PatientDialog